@@ -0,0 +1,123 @@
+"""
+Times the parser on large generated feedback files, and compares the timings with the stored baselines.
+
+Run with python -m benchmarks.
+
+Usage:
+    benchmarks [options]
+
+Options:
+    --sizes SIZES       Comma-separated numbers of issues per generated file [default: 1000,10000]
+    --full              Also benchmark files with 100k and 1M issues
+    --only PATTERN      Only run benchmarks whose name contains PATTERN
+    --check             Exit with an error if a benchmark is slower than its baseline by more than the tolerance
+    --tolerance RATIO   How much slower than the baseline a benchmark may get before --check fails [default: 0.5]
+    --min-time SECONDS  Benchmarks that run faster than this are too noisy for --check to fail on [default: 0.05]
+    --repeat N          Keep the best of N runs of each benchmark [default: 5]
+    --update            Store the timings as the new baselines
+"""
+
+import gc
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from docopt import docopt
+from rich import print
+
+from benchmarks.parsing import benchmarks
+
+BASELINES = Path(__file__).parent / "baselines.json"
+
+
+def best_of(repeat: int, timed) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        timed()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibration() -> float:
+    """
+    Times a fixed workload of pure Python, so that timings taken on machines of different speeds can be compared
+    """
+
+    def workload():
+        counts: dict[str, int] = {}
+        for i in range(200_000):
+            word = f"word-{i % 997}"
+            counts[word] = counts.get(word, 0) + len(word.split("-"))
+        sorted(counts.items(), key=lambda item: item[1])
+
+    return best_of(5, workload)
+
+
+def run():
+    opts = docopt(__doc__)
+    sizes = [int(size) for size in opts["--sizes"].split(",")]
+    if opts["--full"]:
+        sizes += [100_000, 1_000_000]
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    tolerance = float(opts["--tolerance"])
+    min_time = float(opts["--min-time"])
+    repeat = int(opts["--repeat"])
+
+    # the machine's speed drifts during the run (CPU frequency, noisy neighbours on CI):
+    # calibrate between benchmarks and score everything against the median calibration
+    units = [calibration()]
+    timings: dict[str, float] = {}
+    for benchmark in benchmarks(sizes):
+        if opts["--only"] and opts["--only"] not in benchmark.name:
+            continue
+        timed = benchmark.prepare()
+        # a single run of the largest files takes long enough to be stable
+        timings[benchmark.name] = best_of(
+            1 if benchmark.size >= 1_000_000 else repeat, timed
+        )
+        units.append(calibration())
+
+    unit = statistics.median(units)
+    print(
+        f"Calibration workload took {unit * 1000:.1f}ms "
+        f"(median of {len(units)}, from {min(units) * 1000:.1f}ms to {max(units) * 1000:.1f}ms)"
+    )
+
+    # timings are stored in units of the calibration workload
+    scores: dict[str, float] = {}
+    regressions = []
+    for name, seconds in timings.items():
+        scores[name] = score = round(seconds / unit, 3)
+
+        line = f"{name:<45} {seconds * 1000:>10.1f}ms {score:>9.3f}"
+        if baseline := baselines.get(name):
+            change = score / baseline - 1
+            line += f"  {change:+.0%} vs baseline"
+            if seconds < min_time:
+                # a few milliseconds swing by tens of percents from one run to the next
+                line += " (too short to check)"
+            elif change > tolerance:
+                regressions.append(name)
+                line = f"[red]{line}[/red]"
+        print(line)
+
+    if opts["--update"]:
+        BASELINES.write_text(
+            json.dumps(baselines | scores, indent=2, sort_keys=True) + "\n"
+        )
+        print(f"Updated {len(scores)} baselines in {BASELINES}")
+
+    if opts["--check"] and regressions:
+        print(
+            f"[red]{len(regressions)} benchmarks are more than {tolerance:.0%} slower than their baseline:[/red] {', '.join(regressions)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
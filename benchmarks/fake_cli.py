@@ -0,0 +1,186 @@
+"""
+Fake gh and glab executables, that understand the commands issurge runs and send them to a MockForge.
+
+They are Python scripts put first on the PATH by install(), so submitting with them still pays
+for spawning one process per command, like with the real ones.
+"""
+
+import http.client
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, NoReturn
+from urllib.parse import quote, urlsplit
+
+LAUNCHER = """#!{python}
+import sys
+sys.path.insert(0, {root!r})
+from benchmarks.fake_cli import main
+main({name!r}, sys.argv[1:])
+"""
+
+
+def install(directory: Path) -> Path:
+    """
+    Writes gh and glab to directory, and returns it, to be put at the start of the PATH
+    """
+    root = str(Path(__file__).parent.parent)
+    for name in ("gh", "glab"):
+        executable = directory / name
+        executable.write_text(
+            LAUNCHER.format(python=sys.executable, root=root, name=name)
+        )
+        executable.chmod(0o755)
+    return directory
+
+
+def main(name: str, args: list[str]):
+    try:
+        (gh if name == "gh" else glab)(args)
+    except KeyError as e:
+        fail(f"{name}: missing flag or environment variable {e}")
+
+
+def fail(message: str) -> NoReturn:
+    sys.stderr.write(message + "\n")
+    sys.exit(1)
+
+
+def request(method: str, route: str, body: Any = None) -> Any:
+    url = urlsplit(os.environ["ISSURGE_FAKE_FORGE_URL"])
+    connection = http.client.HTTPConnection(url.hostname or "", url.port)
+    payload = None if body is None else json.dumps(body).encode("utf-8")
+    connection.request(
+        method,
+        route if route.startswith("/") else f"/{route}",
+        body=payload,
+        headers={"Content-Type": "application/json"},
+    )
+    response = connection.getresponse()
+    data = response.read().decode("utf-8")
+    if response.status >= 400:
+        message = json.loads(data or "{}").get("message", data)
+        fail(f"{message} (HTTP {response.status})")
+    return json.loads(data) if data else None
+
+
+def flags(args: list[str]) -> tuple[dict[str, list[str]], list[str]]:
+    """
+    Values of each -x flag, in order, and the arguments that are not flag values
+    """
+    values: dict[str, list[str]] = {}
+    positional = []
+    arguments = iter(args)
+    for argument in arguments:
+        if argument.startswith("-") and len(argument) == 2:
+            values.setdefault(argument, []).append(next(arguments, ""))
+        else:
+            positional.append(argument)
+    return values, positional
+
+
+def gh(args: list[str]):
+    match args:
+        case ["auth", "token"]:
+            print("fake-token")
+        case ["repo", "view", repository, *_] if not repository.startswith("-"):
+            repo = request("GET", f"/repos/{repository}")
+            print(
+                json.dumps(
+                    {
+                        "isInOrganization": repo["owner"]["type"] == "Organization",
+                        "owner": {"login": repo["owner"]["login"]},
+                        "name": repo["name"],
+                    }
+                )
+            )
+        case ["issue", "new", *rest]:
+            values, _ = flags(rest)
+            if "-R" not in values:
+                fail("gh: the fake gh needs -R, it does not read git remotes")
+            repository = values["-R"][-1]
+            body: dict[str, Any] = {
+                "title": values["-t"][-1],
+                "body": values.get("-b", [""])[-1],
+                "labels": values.get("-l", []),
+                "assignees": ["me" if a == "@me" else a for a in values.get("-a", [])],
+            }
+            if "-m" in values:
+                # the mock forge accepts milestone titles, where gh would look the number up first
+                body["milestone"] = values["-m"][-1]
+            created = request("POST", f"/repos/{repository}/issues", body)
+            print(f"\nCreating issue in {repository}\n\n{created['html_url']}")
+        case ["api", *rest]:
+            values, positional = flags(rest)
+            body = {}
+            for field in values.get("-F", []):
+                key, _, value = field.partition("=")
+                set_field(body, key, typed(value))
+            response = request(
+                values.get("-X", ["GET"])[-1], positional[0], body or None
+            )
+            print(json.dumps(response))
+        case _:
+            fail(f"gh: unsupported command {' '.join(args)!r}")
+
+
+def typed(value: str) -> Any:
+    """
+    Same conversions as gh api's -F
+    """
+    if value in ("true", "false", "null") or value.lstrip("-").isdigit():
+        return json.loads(value)
+    return value
+
+
+def set_field(body: dict[str, Any], key: str, value: Any):
+    """
+    Sets key[]=value and key[sub]=value fields like gh api does: a[][x]=1 a[][y]=2 makes a = [{x: 1, y: 2}]
+    """
+    name, _, path = key.partition("[")
+    parts = [name] + (path.removesuffix("]").split("][") if path else [])
+    container: Any = body
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "":
+            if last:
+                container.append(value)
+                return
+            following = parts[i + 1]
+            if not container or following in container[-1]:
+                container.append({})
+            container = container[-1]
+        elif last:
+            container[part] = value
+        else:
+            container = container.setdefault(part, [] if parts[i + 1] == "" else {})
+
+
+def glab(args: list[str]):
+    match args:
+        case ["config", "get", "token", *_]:
+            print("fake-token")
+        case ["issue", "new", *rest]:
+            values, _ = flags(rest)
+            if "-R" not in values:
+                fail("glab: the fake glab needs -R, it does not read git remotes")
+            project = urlsplit(values["-R"][-1]).path.strip("/")
+            body: dict[str, Any] = {
+                "title": values["-t"][-1],
+                "description": values.get("-d", [""])[-1],
+                "labels": ",".join(values.get("-l", [])),
+                "assignee_usernames": [
+                    a.removeprefix("@") for a in values.get("-a", [])
+                ],
+            }
+            if "-m" in values:
+                body["milestone_title"] = values["-m"][-1]
+            created = request(
+                "POST", f"/api/v4/projects/{quote(project, safe='')}/issues", body
+            )
+            print(
+                f"- Creating issue in {project}\n#{created['iid']}\n{created['web_url']}"
+            )
+        case _:
+            fail(f"glab: unsupported command {' '.join(args)!r}")
@@ -0,0 +1,444 @@
+"""
+A local stand-in for GitHub and GitLab, to measure how fast issues get submitted without touching a real forge.
+
+It implements the REST (and GraphQL) endpoints issurge uses, keeps created issues in memory,
+and can be made slow, flaky or rate-limited.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+# GitLab routes are served under this prefix, GitHub ones at the root, like api.github.com
+GITLAB_PREFIX = "/api/v4"
+
+
+class ForgeSettings(NamedTuple):
+    # seconds every request takes before being answered
+    latency: float = 0
+    # fraction of requests that fail with a 502
+    error_rate: float = 0
+    # number of requests allowed per rate_limit_window seconds, 0 for no limit
+    rate_limit: int = 0
+    rate_limit_window: float = 60
+    # number of createIssue mutations allowed in a single GraphQL document, 0 for no limit
+    max_batch: int = 0
+    seed: int = 0
+
+
+class Reply(NamedTuple):
+    status: int
+    body: Any
+    headers: dict[str, str] = {}
+
+
+class CreatedIssue(NamedTuple):
+    number: int
+    id: int
+    title: str
+    fields: dict[str, Any]
+
+
+NUMBERS = re.compile(r"/\d+")
+ISSUE_ROUTE = re.compile(r"issues/(?P<number>\d+)(?P<rest>/.*)?")
+
+GRAPHQL_STRING = r'"(?:[^"\\]|\\.)*"'
+GRAPHQL_SELECTION = re.compile(
+    rf"(?P<alias>n\d+): (?P<field>\w+)(?:\((?P<arguments>(?:[^()\"]|{GRAPHQL_STRING})*)\))?"
+)
+GRAPHQL_MUTATION = re.compile(r"\s*(?P<alias>\w+): createIssue\(input: ")
+
+
+class MockForge:
+    """
+    Serves a GitHub repository OWNER/REPO and a GitLab project at the same time, on a random local port.
+    """
+
+    def __init__(
+        self,
+        settings: ForgeSettings = ForgeSettings(),
+        owner="issurge",
+        repo="playground",
+        milestones: list[str] = [],
+        issue_types: list[str] = ["Bug", "Feature", "Task"],
+        gitlab_host="gitlab.test",
+    ):
+        self.settings = settings
+        self.owner = owner
+        self.repo = repo
+        self.milestones = list(milestones)
+        self.issue_types = list(issue_types)
+        self.gitlab_host = gitlab_host
+        self.issues: list[CreatedIssue] = []
+        # requests received, by method and route with numbers replaced by N
+        self.requests: Counter[str] = Counter()
+        self.rejected: Counter[int] = Counter()
+        self._random = random.Random(settings.seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        forge = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, don't let them wait for each other's ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                reply = forge.handle(
+                    self.command, self.path, json.loads(raw) if raw else None
+                )
+                payload = json.dumps(reply.body).encode("utf-8")
+                self.send_response(reply.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in reply.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "MockForge":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Environment variables that point issurge, and the fake gh and glab, to this forge
+        """
+        return {
+            "ISSURGE_GITHUB_API_URL": self.url,
+            "ISSURGE_GITLAB_API_URL": self.url + GITLAB_PREFIX,
+            "ISSURGE_FAKE_FORGE_URL": self.url,
+            "GH_TOKEN": "fake-token",
+            "GITLAB_TOKEN": "fake-token",
+        }
+
+    @property
+    def github_repo(self) -> str:
+        return f"{self.owner}/{self.repo}"
+
+    @property
+    def gitlab_repo(self) -> str:
+        return f"{self.gitlab_host}/{self.owner}/{self.repo}"
+
+    def handle(self, method: str, path: str, body: Any) -> Reply:
+        url = urlsplit(path)
+        self.requests[method + " " + NUMBERS.sub("/N", url.path)] += 1
+
+        if self.settings.latency:
+            time.sleep(self.settings.latency)
+
+        with self._lock:
+            reply = self._limit() or self._fail()
+            rate_headers = self._rate_limit_headers()
+
+        if not reply:
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                if url.path.startswith(GITLAB_PREFIX):
+                    reply = self.gitlab(
+                        method, url.path.removeprefix(GITLAB_PREFIX), query, body or {}
+                    )
+                else:
+                    reply = self.github(method, url.path, query, body or {})
+            except (KeyError, ValueError, TypeError) as e:
+                reply = Reply(422, {"message": f"Validation Failed: {e}"})
+
+        if reply.status >= 400:
+            self.rejected[reply.status] += 1
+        return reply._replace(headers=rate_headers | reply.headers)
+
+    def _limit(self) -> Reply | None:
+        if not self.settings.rate_limit:
+            return None
+        now = time.monotonic()
+        if now - self._window_start >= self.settings.rate_limit_window:
+            self._window_start, self._window_requests = now, 0
+        self._window_requests += 1
+        if self._window_requests <= self.settings.rate_limit:
+            return None
+        retry_after = self.settings.rate_limit_window - (now - self._window_start)
+        return Reply(
+            403,
+            {"message": "API rate limit exceeded"},
+            {"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+    def _fail(self) -> Reply | None:
+        if self._random.random() < self.settings.error_rate:
+            return Reply(502, {"message": "Server Error"})
+        return None
+
+    def _rate_limit_headers(self) -> dict[str, str]:
+        if not self.settings.rate_limit:
+            return {}
+        reset = time.time() + self.settings.rate_limit_window
+        reset -= time.monotonic() - self._window_start
+        return {
+            "X-RateLimit-Limit": str(self.settings.rate_limit),
+            "X-RateLimit-Remaining": str(
+                max(0, self.settings.rate_limit - self._window_requests)
+            ),
+            "X-RateLimit-Reset": str(int(reset)),
+        }
+
+    def create_issue(self, title: str, fields: dict[str, Any]) -> CreatedIssue:
+        if not title:
+            raise ValueError("title is missing")
+        with self._lock:
+            number = len(self.issues) + 1
+            issue = CreatedIssue(
+                number=number, id=100_000 + number, title=title, fields=fields
+            )
+            self.issues.append(issue)
+        return issue
+
+    def issue(self, number: int) -> CreatedIssue:
+        if not 0 < number <= len(self.issues):
+            raise KeyError(f"no issue #{number}")
+        return self.issues[number - 1]
+
+    def milestone_number(self, title: Any) -> int:
+        if isinstance(title, int):
+            return title
+        return self.milestones.index(title) + 1
+
+    def github(
+        self, method: str, path: str, query: dict[str, str], body: dict[str, Any]
+    ) -> Reply:
+        repository = f"/repos/{self.owner}/{self.repo}"
+        match method, path:
+            case "GET", "/user":
+                return Reply(200, {"login": "me", "id": 1})
+            case "GET", route if route == repository:
+                return Reply(
+                    200,
+                    {
+                        "name": self.repo,
+                        "owner": {"login": self.owner, "type": "Organization"},
+                    },
+                )
+            case "GET", route if route == f"/orgs/{self.owner}/issue-types":
+                return Reply(
+                    200,
+                    [
+                        {"id": i, "name": name}
+                        for i, name in enumerate(self.issue_types)
+                    ],
+                )
+            case "GET", route if route == f"/orgs/{self.owner}/issue-fields":
+                return Reply(200, [])
+            case "POST", "/graphql":
+                return self.graphql(body["query"])
+            case _, route if route.startswith(repository + "/"):
+                return self.github_repository(
+                    method, route.removeprefix(repository + "/"), body
+                )
+        return Reply(404, {"message": "Not Found"})
+
+    def github_repository(self, method: str, route: str, body: dict[str, Any]) -> Reply:
+        if method == "GET" and route == "milestones":
+            return Reply(
+                200,
+                [
+                    {"title": title, "number": i + 1}
+                    for i, title in enumerate(self.milestones)
+                ],
+            )
+
+        if method == "POST" and route == "issues":
+            if body.get("milestone") is not None:
+                body["milestone"] = self.milestone_number(body["milestone"])
+            if body.get("type") and body["type"] not in self.issue_types:
+                raise ValueError(f"unknown issue type {body['type']!r}")
+            issue = self.create_issue(body.get("title", ""), body)
+            return Reply(201, self.github_issue(issue))
+
+        if not (match := ISSUE_ROUTE.fullmatch(route)):
+            return Reply(404, {"message": "Not Found"})
+
+        issue = self.issue(int(match["number"]))
+        match method, match["rest"]:
+            case "GET" | "PATCH", None:
+                issue.fields.update(body)
+                return Reply(200, self.github_issue(issue))
+            case "PUT", "/issue-field-values":
+                return Reply(200, body["issue_field_values"])
+            case "POST", "/sub_issues":
+                self.issue(int(body["sub_issue_id"]) - 100_000)
+                return Reply(201, self.github_issue(issue))
+            case "POST", "/dependencies/blocked_by":
+                self.issue(int(body["issue_id"]) - 100_000)
+                return Reply(201, self.github_issue(issue))
+        return Reply(404, {"message": "Not Found"})
+
+    def github_issue(self, issue: CreatedIssue) -> dict[str, Any]:
+        return {
+            "number": issue.number,
+            "id": issue.id,
+            "title": issue.title,
+            "html_url": f"https://github.com/{self.owner}/{self.repo}/issues/{issue.number}",
+        }
+
+    def graphql(self, document: str) -> Reply:
+        if document.startswith("mutation"):
+            return self.graphql_mutation(document)
+
+        repository: dict[str, Any] = {"id": "R_1"}
+        data: dict[str, Any] = {"repository": repository}
+        for selection in GRAPHQL_SELECTION.finditer(document):
+            alias, field = selection["alias"], selection["field"]
+            arguments = selection["arguments"] or ""
+            match field:
+                case "label":
+                    repository[alias] = {"id": f"LA_{json.loads(string(arguments))}"}
+                case "milestones":
+                    repository[alias] = {
+                        "nodes": [
+                            {"id": f"MI_{i + 1}", "title": title}
+                            for i, title in enumerate(self.milestones)
+                        ]
+                    }
+                case "issueTypes":
+                    repository[alias] = {
+                        "nodes": [
+                            {"id": f"IT_{name}", "name": name}
+                            for name in self.issue_types
+                        ]
+                    }
+                case "viewer":
+                    data[alias] = {"id": "U_me"}
+                case "user":
+                    data[alias] = {"id": f"U_{json.loads(string(arguments))}"}
+        return Reply(200, {"data": data})
+
+    def graphql_mutation(self, document: str) -> Reply:
+        inputs: dict[str, dict[str, Any]] = {}
+        position = document.index("{") + 1
+        while match := GRAPHQL_MUTATION.match(document, position):
+            value, position = graphql_value(document, match.end())
+            inputs[match["alias"]] = value
+            # skip the selection set
+            position = document.index("} }", position) + 3
+
+        if self.settings.max_batch and len(inputs) > self.settings.max_batch:
+            return Reply(
+                200,
+                {
+                    "errors": [
+                        {
+                            "type": "MAX_NODE_LIMIT_EXCEEDED",
+                            "message": f"This query requests more than {self.settings.max_batch} issues",
+                        }
+                    ]
+                },
+            )
+
+        data = {}
+        for alias, input in inputs.items():
+            issue = self.create_issue(input.get("title", ""), input)
+            data[alias] = {
+                "issue": {
+                    "number": issue.number,
+                    "url": self.github_issue(issue)["html_url"],
+                    "databaseId": issue.id,
+                }
+            }
+        return Reply(200, {"data": data})
+
+    def gitlab(
+        self, method: str, path: str, query: dict[str, str], body: dict[str, Any]
+    ) -> Reply:
+        project = f"/projects/{self.owner}%2F{self.repo}"
+        match method, path:
+            case "GET", "/user":
+                return Reply(200, {"id": 1, "username": "me"})
+            case "GET", "/users":
+                return Reply(200, [{"id": 2, "username": query["username"]}])
+            case "GET", route if route == project + "/milestones":
+                return Reply(
+                    200,
+                    [
+                        {"id": i + 1, "title": title}
+                        for i, title in enumerate(self.milestones)
+                        if title == query.get("title", title)
+                    ],
+                )
+            case "POST", route if route == project + "/issues":
+                # glab sends the milestone title, the API is called with its ID
+                if body.get("milestone_title"):
+                    body["milestone_id"] = self.milestone_number(
+                        body.pop("milestone_title")
+                    )
+                issue = self.create_issue(body.get("title", ""), body)
+                return Reply(
+                    201,
+                    {
+                        "iid": issue.number,
+                        "id": issue.id,
+                        "web_url": f"https://{self.gitlab_host}/{self.owner}/{self.repo}/-/issues/{issue.number}",
+                    },
+                )
+        return Reply(404, {"message": "404 Not Found"})
+
+
+def string(arguments: str) -> str:
+    """
+    The first string literal of GraphQL arguments
+    """
+    match = re.search(GRAPHQL_STRING, arguments)
+    if not match:
+        raise ValueError(f"no string in {arguments!r}")
+    return match[0]
+
+
+def graphql_value(document: str, position: int) -> tuple[Any, int]:
+    """
+    Parses the GraphQL literal at position, as written by issurge.github.graphql_literal.
+    Returns it and the position right after it.
+    """
+    match document[position]:
+        case "{":
+            value: dict[str, Any] = {}
+            position += 1
+            while document[position] != "}":
+                key, _, _ = document[position:].partition(":")
+                item, position = graphql_value(document, position + len(key) + 2)
+                value[key.strip(", ")] = item
+                if document[position] == ",":
+                    position += 2
+            return value, position + 1
+        case "[":
+            items = []
+            position += 1
+            while document[position] != "]":
+                item, position = graphql_value(document, position)
+                items.append(item)
+                if document[position] == ",":
+                    position += 2
+            return items, position + 1
+        case _:
+            return json.JSONDecoder().raw_decode(document, position)
@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks import fake_cli
+from benchmarks.forge import ForgeSettings, MockForge
+from benchmarks.generate import references
+from benchmarks.throughput import measure
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    (tmp_path / "bin").mkdir()
+    fake_cli.install(tmp_path / "bin")
+    feedback = tmp_path / "feedback.issurge"
+    feedback.write_text(references(5), encoding="utf-8")
+    return tmp_path
+
+
+@pytest.mark.parametrize("mode", ["gh", "gh-http", "gh-batch", "glab", "glab-http"])
+def test_submits_every_issue(scratch, mode):
+    result = measure(
+        mode, 1, scratch / "feedback.issurge", ForgeSettings(), [], scratch
+    )
+    assert result.returncode == 0, result.output
+    assert result.issues == 5
+    assert result.rejected == 0
+
+
+def test_rate_limit():
+    with MockForge(ForgeSettings(rate_limit=2)) as forge:
+        assert forge.handle("GET", "/user", None).status == 200
+        assert (
+            forge.handle("GET", "/user", None).headers["X-RateLimit-Remaining"] == "0"
+        )
+
+        limited = forge.handle("GET", "/user", None)
+        assert limited.status == 403
+        assert int(limited.headers["Retry-After"]) > 0
+
+
+def test_graphql_batch_limit():
+    with MockForge(ForgeSettings(max_batch=1)) as forge:
+        one = 'issue0: createIssue(input: {repositoryId: "R_1", title: "A, \\"quoted\\" }"}) { issue { number url databaseId } }'
+        two = one + " " + one.replace("issue0", "issue1")
+
+        assert forge.graphql(f"mutation {{ {two} }}").body["errors"][0]["type"] == (
+            "MAX_NODE_LIMIT_EXCEEDED"
+        )
+        created = forge.graphql(f"mutation {{ {one} }}").body["data"]["issue0"]
+        assert created["issue"]["number"] == 1
+        assert forge.issues[0].title == 'A, "quoted" }'
@@ -0,0 +1,100 @@
+"""
+Generates synthetic feedback files, shaped like the ones issurge chokes on in practice.
+
+Usage: python -m benchmarks.generate <kind> <issues> > file
+"""
+
+import sys
+from typing import Callable
+
+WORDS = "the button on settings page does not work when clicking twice fast".split()
+
+
+def words(count: int, offset: int = 0) -> str:
+    return " ".join(WORDS[(offset + i) % len(WORDS)] for i in range(count))
+
+
+def wide(issues: int) -> str:
+    """
+    Many issues sharing labels, assignees and a milestone from a few parent lines
+    """
+    lines = []
+    for i in range(issues):
+        if i % 100 == 0:
+            lines.append(f"~bug ~client-{i // 100} @me %v{i // 1000}")
+        lines.append(f"\t{words(8, i)} ~triage")
+    return "\n".join(lines) + "\n"
+
+
+def deep(issues: int, depth: int = 50) -> str:
+    """
+    Issues below many levels of tab nesting, each level adding a label
+    """
+    lines = []
+    for i in range(issues):
+        if i % depth == 0:
+            lines += ["\t" * level + f"~level-{level}" for level in range(depth)]
+        lines.append("\t" * depth + words(6, i))
+    return "\n".join(lines) + "\n"
+
+
+def long_titles(issues: int, length: int = 200) -> str:
+    """
+    Titles pasted from client emails, with sigils sprinkled in the middle
+    """
+    return "".join(
+        f"~bug {words(length // 2, i)} @someone {words(length // 2, i + 1)} ~ui\n"
+        for i in range(issues)
+    )
+
+
+def long_descriptions(issues: int, length: int = 50) -> str:
+    """
+    Issues with multi-paragraph descriptions, including blank lines and nested bullets
+    """
+    lines = []
+    for i in range(issues):
+        lines.append(f"{words(6, i)} ~bug:")
+        for line in range(length):
+            if line % 10 == 9:
+                lines.append("")
+            indent = "\t\t" if line % 3 else "\t"
+            lines.append(f"{indent}- {words(12, i + line)}")
+    return "\n".join(lines) + "\n"
+
+
+def references(issues: int) -> str:
+    """
+    Chains of issues that refer to, depend on and nest under each other with #.N, >.N and ^.N
+    """
+    lines = []
+    for i in range(1, issues + 1):
+        line = f"#.{i} {words(6, i)}"
+        if i > 1:
+            line += f" >.{i - 1}"
+        if i > 10 and i % 10:
+            line += f" ^.{i - i % 10}"
+        if i == 1:
+            lines.append(line)
+            continue
+        # only refer to issues defined before, so that the file can be submitted
+        lines.append(line + ":")
+        lines.append(
+            f"\tSee #.{i - 1}, #.{max(1, i - 10)} and #.{i // 2}, blocked by >.{max(1, i - 2)}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+KINDS: dict[str, Callable[[int], str]] = {
+    "wide": wide,
+    "deep": deep,
+    "long-titles": long_titles,
+    "long-descriptions": long_descriptions,
+    "references": references,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in KINDS:
+        sys.exit(f"Usage: python -m benchmarks.generate {{{','.join(KINDS)}}} <issues>")
+    sys.stdout.write(KINDS[sys.argv[1]](int(sys.argv[2])))
@@ -0,0 +1,87 @@
+"""
+Benchmarks of the parser's hot paths, on each kind of generated file
+"""
+
+from typing import Callable, Iterator, NamedTuple
+
+from benchmarks.generate import KINDS
+from issurge.parser import Issue, Node, parse, process_description, reference_spans
+
+
+class Benchmark(NamedTuple):
+    name: str
+    size: int
+    # builds the input outside of the timed part, and returns what gets timed
+    prepare: Callable[[], Callable[[], object]]
+
+
+def title_lines(nodes: list[Node]) -> Iterator[str]:
+    """
+    The lines the parser reads as issues or as sigils inherited by their children, i.e. everything but descriptions
+    """
+    for node in nodes:
+        yield node.text
+        if not node.text.endswith(":"):
+            yield from title_lines(node.children)
+
+
+def raw_descriptions(text: str) -> list[str]:
+    return [
+        Node.source_text(node.children)
+        for node in Node.blocks(text.splitlines())
+        if node.children
+    ]
+
+
+def to_dict(text: str):
+    return lambda: Node.to_dict(text)
+
+
+def issue_parse(text: str):
+    lines = list(title_lines(Node.tree(text.splitlines()).children))
+    return lambda: [Issue.parse(line) for line in lines]
+
+
+def descriptions(text: str):
+    described = raw_descriptions(text)
+    return lambda: [process_description(description) for description in described]
+
+
+def resolve_references(text: str):
+    issues = list(parse(text))
+    resolutions = {issue.reference: 1000 + i for i, issue in enumerate(issues)}
+
+    def timed():
+        # otherwise every run after the first one only times cache hits
+        reference_spans.cache_clear()
+        return [issue.resolve_references(resolutions) for issue in issues]
+
+    return timed
+
+
+def end_to_end(text: str):
+    return lambda: list(parse(text))
+
+
+# which kinds of files each function is benchmarked on: there's no point in timing
+# process_description on files without descriptions
+SUITE: dict[str, tuple[Callable[[str], Callable[[], object]], tuple[str, ...]]] = {
+    "Node.to_dict": (to_dict, ("wide", "deep", "long-descriptions")),
+    "Issue.parse": (issue_parse, ("wide", "long-titles", "references")),
+    "process_description": (descriptions, ("long-descriptions", "references")),
+    "resolve_references": (resolve_references, ("references",)),
+    "parse": (end_to_end, tuple(KINDS)),
+}
+
+
+def benchmarks(sizes: list[int]) -> Iterator[Benchmark]:
+    for size in sizes:
+        for function, (prepare, kinds) in SUITE.items():
+            for kind in kinds:
+                yield Benchmark(
+                    name=f"{function} {kind} {size}",
+                    size=size,
+                    prepare=lambda prepare=prepare, kind=kind, size=size: prepare(
+                        KINDS[kind](size)
+                    ),
+                )
@@ -0,0 +1,162 @@
+"""
+Measures how many issues per second issurge submits in each submission mode, against a local mock forge.
+
+Run with python -m benchmarks.throughput.
+
+Usage:
+    throughput [options]
+
+Options:
+    --issues N              Number of issues to submit in each run [default: 100]
+    --kind KIND             Kind of generated file to submit, see benchmarks.generate [default: wide]
+    --modes MODES           Comma-separated submission modes to measure, among: gh, gh-http, gh-batch, glab, glab-http [default: gh,gh-http,gh-batch,glab,glab-http]
+    --jobs JOBS             Comma-separated values of --jobs to measure each mode with [default: 1,8]
+    --latency SECONDS       Time the forge takes to answer each request [default: 0.05]
+    --errors RATIO          Fraction of requests that fail with a server error [default: 0]
+    --rate-limit N          Number of requests allowed per rate limit window, 0 for no limit [default: 0]
+    --rate-limit-window S   Length of a rate limit window, in seconds [default: 60]
+    --max-batch N           Number of issues a single GraphQL request may create, 0 for no limit [default: 0]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from docopt import docopt
+from rich import print
+
+from benchmarks import fake_cli
+from benchmarks.forge import ForgeSettings, MockForge
+from benchmarks.generate import KINDS
+from issurge.parser import parse
+
+ROOT = Path(__file__).parent.parent
+
+
+class Mode(NamedTuple):
+    forge: str
+    options: list[str]
+
+
+MODES = {
+    "gh": Mode("github", []),
+    "gh-http": Mode("github", ["--http"]),
+    "gh-batch": Mode("github", ["--batch"]),
+    "glab": Mode("gitlab", []),
+    "glab-http": Mode("gitlab", ["--http"]),
+}
+
+
+class Measure(NamedTuple):
+    mode: str
+    jobs: int
+    issues: int
+    seconds: float
+    requests: int
+    rejected: int
+    returncode: int
+    output: str
+
+    @property
+    def issues_per_second(self) -> float:
+        return self.issues / self.seconds
+
+
+def measure(
+    mode: str,
+    jobs: int,
+    feedback: Path,
+    settings: ForgeSettings,
+    milestones: list[str],
+    scratch: Path,
+) -> Measure:
+    """
+    Submits feedback to a fresh mock forge with issurge, in its own process and with an empty cache, as a user would
+    """
+    forge, options = MODES[mode]
+    with MockForge(settings, milestones=milestones) as mock:
+        environment = os.environ | mock.environment
+        environment["PATH"] = f"{scratch / 'bin'}{os.pathsep}{environment['PATH']}"
+        environment["ISSURGE_CACHE_DIR"] = str(scratch / f"cache-{mode}-{jobs}")
+
+        start = time.perf_counter()
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from issurge.main import run; run()",
+                "--quiet",
+                f"--repo={mock.github_repo if forge == 'github' else mock.gitlab_repo}",
+                f"--forge={forge}",
+                f"--jobs={jobs}",
+                *options,
+                str(feedback),
+            ],
+            env=environment,
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        seconds = time.perf_counter() - start
+
+        return Measure(
+            mode=mode,
+            jobs=jobs,
+            issues=len(mock.issues),
+            seconds=seconds,
+            requests=mock.requests.total(),
+            rejected=mock.rejected.total(),
+            returncode=process.returncode,
+            output=process.stdout + process.stderr,
+        )
+
+
+def run():
+    opts = docopt(__doc__)
+    settings = ForgeSettings(
+        latency=float(opts["--latency"]),
+        error_rate=float(opts["--errors"]),
+        rate_limit=int(opts["--rate-limit"]),
+        rate_limit_window=float(opts["--rate-limit-window"]),
+        max_batch=int(opts["--max-batch"]),
+    )
+    modes = opts["--modes"].split(",")
+    if unknown := set(modes) - set(MODES):
+        sys.exit(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    text = KINDS[opts["--kind"]](int(opts["--issues"]))
+    issues = list(parse(text))
+    milestones = sorted({issue.milestone for issue in issues if issue.milestone})
+    print(f"Submitting {len(issues)} issues per run, to a forge with {settings}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        scratch = Path(directory)
+        (scratch / "bin").mkdir()
+        fake_cli.install(scratch / "bin")
+        feedback = scratch / "feedback.issurge"
+        feedback.write_text(text, encoding="utf-8")
+
+        for mode in modes:
+            # batches are submitted one after the other, --jobs does not apply
+            for jobs in (
+                [1] if mode == "gh-batch" else map(int, opts["--jobs"].split(","))
+            ):
+                result = measure(mode, jobs, feedback, settings, milestones, scratch)
+                line = (
+                    f"{mode:<10} --jobs={jobs:<3} {result.issues:>6} issues in {result.seconds:>7.2f}s"
+                    f" {result.issues_per_second:>8.1f} issues/s"
+                    f" {result.requests:>7} requests, {result.rejected} rejected"
+                )
+                if result.returncode or result.issues < len(issues):
+                    line = f"[red]{line}[/red]"
+                print(line)
+                if result.returncode:
+                    print("\n".join(result.output.strip().splitlines()[-20:]))
+
+
+if __name__ == "__main__":
+    run()
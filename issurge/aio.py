@@ -0,0 +1,149 @@
+import asyncio
+from typing import AsyncIterator, Iterable
+from urllib.parse import ParseResult
+
+from issurge import github
+from issurge.parser import (
+    Issue,
+    github_created_issue_from_output,
+    gitlab_issue_from_output,
+)
+from issurge.profiling import measuring, phase
+from issurge.scheduler import SubmissionPlan
+from issurge.session import Session, remote_url_from_origin
+from issurge.utils import dry_running, run_async, using_http
+
+
+async def remote_url() -> ParseResult:
+    process = await asyncio.create_subprocess_exec(
+        "git", "remote", "get-url", "origin", stdout=asyncio.subprocess.PIPE
+    )
+    origin, _ = await process.communicate()
+    if process.returncode:
+        raise ValueError(
+            "Could not determine remote url, make sure that you are inside of a git repository that has a remote named 'origin'"
+        )
+    return remote_url_from_origin(origin.decode())
+
+
+async def submit(
+    issue: Issue, submitter_args: list[str], session: Session
+) -> tuple[str | None, int | None]:
+    """
+    Same as Issue.submit, but does not block the event loop.
+    The HTTP backend is synchronous, so its calls run on the default executor.
+    """
+    with measuring(issue):
+        if session.forge != "github":
+            if using_http():
+                return await asyncio.to_thread(
+                    issue._gitlab_submit, submitter_args, session
+                )
+            with phase("create issue"):
+                return gitlab_issue_from_output(
+                    await run_async(
+                        issue._gitlab_create_command(submitter_args, session)
+                    )
+                )
+
+        github.use_session(session)
+        issue_type, issue_fields_to_add = issue._github_issue_type_and_fields()
+
+        with phase("create issue"):
+            if using_http():
+                created = await asyncio.to_thread(
+                    issue._github_create_with_http, issue_type, submitter_args
+                )
+            else:
+                created = github_created_issue_from_output(
+                    await run_async(
+                        issue._github_create_command(
+                            issue_type, submitter_args, session
+                        )
+                    )
+                )
+
+        if not created:
+            return None, None
+
+        # the issue IDs cache may wait on other runs' writes
+        if created.id:
+            await asyncio.to_thread(
+                github.remember_issue_id, created.number, created.id
+            )
+
+        ids = {
+            number: await github.issue_id_async(number)
+            for number in issue._github_issue_ids_needed(created)
+        }
+        for followup in issue._github_followups(
+            created, issue_type, issue_fields_to_add, ids.__getitem__
+        ):
+            with phase(followup.phase):
+                response = await github.call_repo_api_async(
+                    followup.method, followup.route, **followup.body
+                )
+            if response is None and not dry_running():
+                await asyncio.to_thread(github.forget_issue_ids, followup.uses_ids_of)
+
+        return created.url, created.number
+
+
+async def warm_up(issues: list[Issue], session: Session):
+    """
+    Fetches the repository metadata every submission needs once, before submitting concurrently
+    """
+    if session.forge != "github":
+        return
+
+    await asyncio.to_thread(github.repo_info)
+    await asyncio.to_thread(github.available_issue_types)
+    if any(issue.fields for issue in issues):
+        await asyncio.to_thread(github.available_issue_fields)
+
+
+async def submit_many(
+    issues: Iterable[Issue],
+    submitter_args: list[str] = [],
+    jobs: int = 4,
+    references_resolutions: dict[int, int] | None = None,
+    session: Session | None = None,
+) -> AsyncIterator[tuple[Issue, str | None, int | None]]:
+    """
+    Submits up to `jobs` issues at the same time, in the same order as submit_concurrently does, without blocking the event loop.
+    Yields issues as they get created, which might not be in file order.
+
+        async for issue, url, number in submit_many(parse(text)):
+            ...
+    """
+    plan = SubmissionPlan(
+        issues, {} if references_resolutions is None else references_resolutions
+    )
+    session = session or Session.from_remote_url(await remote_url())
+    if session.forge == "github":
+        github.use_session(session)
+    await warm_up(plan.issues, session)
+
+    running: dict[asyncio.Task[tuple[str | None, int | None]], int] = {}
+    try:
+        while plan.ready or running:
+            while plan.ready and len(running) < jobs:
+                i = plan.next_ready()
+                if issue := plan.start(i):
+                    task = asyncio.create_task(submit(issue, submitter_args, session))
+                    running[task] = i
+                else:
+                    yield plan.issues[i], None, None
+
+            if not running:
+                continue
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = running.pop(task)
+                url, number = task.result()
+                plan.finish(i, number)
+                yield plan.issues[i], url, number
+    finally:
+        for task in running:
+            task.cancel()
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from unittest.mock import patch
+from urllib.parse import urlparse
+
+import pytest
+
+import issurge.aio
+import issurge.cache
+import issurge.github
+from issurge.aio import submit_many
+from issurge.parser import parse
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    ran = []
+
+    async def run_async(command, bypass_dry_run=False):
+        ran.append(command)
+        number = 100 + sum(c[:3] == ["gh", "issue", "new"] for c in ran)
+        await asyncio.sleep(0)
+        if command[:3] == ["gh", "issue", "new"]:
+            return f"https://github.com/gwennlbh/gh-api-playground/issues/{number}\n"
+        if command[:2] == ["gh", "api"] and command[-1].startswith("/repos"):
+            return '{"id": 5000}'
+        return ""
+
+    async def remote_url():
+        return urlparse("https://github.com/gwennlbh/gh-api-playground")
+
+    monkeypatch.setattr(issurge.aio, "run_async", run_async)
+    monkeypatch.setattr(issurge.github, "run_async", run_async)
+    monkeypatch.setattr(issurge.aio, "remote_url", remote_url)
+
+    with (
+        patch("issurge.github.repo_info") as repo_info,
+        patch("issurge.github.available_issue_types") as available_issue_types,
+    ):
+        repo_info.return_value = issurge.github.OwnerInfo(
+            in_organization=True, owner="gwennlbh", repo="gh-api-playground"
+        )
+        available_issue_types.return_value = []
+        yield ran
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+def test_submit_many_resolves_references(commands):
+    resolutions = {}
+    submitted = asyncio.run(
+        collect(
+            submit_many(
+                parse("^.1 Child\n#.1 Parent"),
+                jobs=2,
+                references_resolutions=resolutions,
+            )
+        )
+    )
+
+    assert [(issue.title, number) for issue, _, number in submitted] == [
+        ("Parent", 101),
+        ("Child", 102),
+    ]
+    assert resolutions == {1: 101}
+    assert commands[-2:] == [
+        ["gh", "api", "/repos/gwennlbh/gh-api-playground/issues/102"],
+        [
+            "gh",
+            "api",
+            "-X",
+            "POST",
+            "/repos/gwennlbh/gh-api-playground/issues/101/sub_issues",
+            "-F",
+            "sub_issue_id=5000",
+            "-F",
+            "replace_parent=true",
+        ],
+    ]
+
+
+def test_submit_many_runs_issues_concurrently(commands, monkeypatch):
+    all_running = asyncio.Barrier(3)
+    run_async = issurge.aio.run_async
+
+    async def wait_for_others(command, bypass_dry_run=False):
+        await asyncio.wait_for(all_running.wait(), timeout=5)
+        return await run_async(command, bypass_dry_run)
+
+    monkeypatch.setattr(issurge.aio, "run_async", wait_for_others)
+
+    # would time out on the barrier if issues were not submitted 3 at a time
+    submitted = asyncio.run(collect(submit_many(parse("A\nB\nC"), jobs=3)))
+    assert sorted(number for _, _, number in submitted) == [101, 102, 103]
+
+
+def test_issue_ids_cache_is_used_off_the_event_loop(commands, monkeypatch):
+    threads = []
+
+    def load_issue_id(repository, number):
+        threads.append(threading.current_thread())
+        return None
+
+    def store_issue_id(repository, number, id):
+        threads.append(threading.current_thread())
+
+    monkeypatch.setattr(issurge.cache, "load_issue_id", load_issue_id)
+    monkeypatch.setattr(issurge.cache, "store_issue_id", store_issue_id)
+
+    asyncio.run(collect(submit_many(parse("Blocked >7"))))
+
+    # a lookup and a store for #7
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
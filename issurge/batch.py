@@ -0,0 +1,199 @@
+import subprocess
+import time
+from typing import Any, Iterable
+
+from rich import print
+
+from issurge import github
+from issurge.parser import Issue
+from issurge.profiling import attribute, measuring, phase
+from issurge.utils import debug, dry_running
+
+# Error types GitHub uses when it rejects a whole document for being too expensive, before running any of it
+COST_LIMIT_ERRORS = {"MAX_NODE_LIMIT_EXCEEDED", "RESOURCE_LIMITS_EXCEEDED"}
+
+
+class ChunkSizer:
+    """
+    Decides how many issues go in a single GraphQL document:
+    grows slowly while documents go through, halves as soon as one is rejected for its cost.
+    """
+
+    def __init__(self, initial=20, minimum=1, maximum=100):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def succeeded(self):
+        self.size = min(self.maximum, self.size + max(1, self.size // 4))
+
+    def too_expensive(self):
+        self.size = max(self.minimum, self.size // 2)
+
+
+def rejected_for_cost(response: dict[str, Any]) -> bool:
+    if response.get("data"):
+        return False
+    return any(
+        error.get("type") in COST_LIMIT_ERRORS
+        or "complexity" in error.get("message", "").lower()
+        for error in response.get("errors", [])
+    )
+
+
+type PreparedIssue = tuple[Issue, str | None, dict[int, str]]
+
+
+def needed_node_ids(prepared: PreparedIssue) -> set[tuple[github.NodeKind, str]]:
+    issue, issue_type, _ = prepared
+    needed: set[tuple[github.NodeKind, str]] = {("repository", "")}
+    needed |= {("label", l) for l in labels_without_type(issue, issue_type)}
+    needed |= {("user", a) for a in issue.assignees}
+    if issue.milestone:
+        needed.add(("milestone", issue.milestone))
+    if issue_type:
+        needed.add(("issue_type", issue_type))
+    return needed
+
+
+def labels_without_type(issue: Issue, issue_type: str | None) -> list[str]:
+    return [
+        l for l in issue.labels if not (issue_type and l.lower() == issue_type.lower())
+    ]
+
+
+def create_issues_document(
+    chunk: list[PreparedIssue], ids: dict[tuple[github.NodeKind, str], str]
+) -> str:
+    mutations = []
+    for i, (issue, issue_type, _) in enumerate(chunk):
+        input: dict[str, Any] = {
+            "repositoryId": ids["repository", ""],
+            "title": issue.title,
+            "body": issue.description or "",
+        }
+        if labels := labels_without_type(issue, issue_type):
+            input["labelIds"] = [ids["label", l] for l in labels]
+        if issue.assignees:
+            input["assigneeIds"] = [ids["user", a] for a in issue.assignees]
+        if issue.milestone:
+            input["milestoneId"] = ids["milestone", issue.milestone]
+        if issue_type:
+            input["issueTypeId"] = ids["issue_type", issue_type]
+
+        mutations.append(
+            f"issue{i}: createIssue(input: {github.graphql_literal(input)}) {{ issue {{ number url databaseId }} }}"
+        )
+
+    return f"mutation {{ {' '.join(mutations)} }}"
+
+
+def submit_batch(
+    issues: list[Issue], submitter_args: list[str], sizer: ChunkSizer
+) -> list[tuple[str | None, int | None]]:
+    """
+    Creates all of the given issues, with as few GraphQL requests as possible.
+    Returns the (url, number) of each issue, in order. Issues that failed to be created get (None, None).
+    """
+    if submitter_args:
+        print(
+            f"[yellow]Ignoring submitter args {subprocess.list2cmdline(submitter_args)!r}: they only apply to gh commands[/]"
+        )
+
+    prepared: list[PreparedIssue] = [
+        (issue, *issue._github_issue_type_and_fields()) for issue in issues
+    ]
+
+    if dry_running():
+        for issue, _, _ in prepared:
+            print(f"Would create {issue.display()}")
+        return [(None, None)] * len(prepared)
+
+    ids = github.node_ids(set().union(*map(needed_node_ids, prepared)))
+
+    results: list[tuple[str | None, int | None]] = []
+    remaining = prepared
+    while remaining:
+        chunk = remaining[: sizer.size]
+        debug(f"Creating {len(chunk)} issues in one GraphQL request")
+        start = time.perf_counter()
+        with phase("create batch"):
+            response = github.graphql(create_issues_document(chunk, ids))
+        seconds = time.perf_counter() - start
+
+        if response and rejected_for_cost(response) and len(chunk) > 1:
+            sizer.too_expensive()
+            debug(f"Request was too expensive, trying again with {sizer.size} issues")
+            continue
+
+        data = (response or {}).get("data") or {}
+        errors = (response or {}).get("errors", [])
+        for i, (issue, issue_type, issue_fields_to_add) in enumerate(chunk):
+            with measuring(issue):
+                attribute("create batch", seconds)
+                created = (data.get(f"issue{i}") or {}).get("issue")
+                if not created:
+                    reasons = [
+                        e.get("message", "")
+                        for e in errors
+                        if (e.get("path") or [None])[0] in (f"issue{i}", None)
+                    ]
+                    print(
+                        f"[red]Could not create {issue.display()}[/red]"
+                        + (f": {'; '.join(reasons)}" if reasons else "")
+                    )
+                    results.append((None, None))
+                    continue
+
+                created_issue = github.CreatedIssue(
+                    url=created["url"],
+                    number=created["number"],
+                    id=created["databaseId"],
+                    type_set=True,
+                )
+                issue._github_finish(created_issue, issue_type, issue_fields_to_add)
+                results.append((created_issue.url, created_issue.number))
+
+        if response and not errors:
+            sizer.succeeded()
+        remaining = remaining[len(chunk) :]
+
+    return results
+
+
+def submit_in_batches(
+    issues: Iterable[Issue],
+    references_resolutions: dict[int, int],
+    submitter_args: list[str],
+    sizer: ChunkSizer | None = None,
+) -> Iterable[tuple[Issue, str | None, int | None]]:
+    """
+    Groups consecutive issues into batches, and submits a batch when the next issue needs a reference defined in it,
+    when it's big enough to fill a GraphQL request, or when there are no more issues.
+    Issues are submitted in the same order as they come in.
+    """
+    sizer = sizer or ChunkSizer()
+    pending: list[Issue] = []
+    defined_by_pending: set[int] = set()
+
+    def flush():
+        results = submit_batch(pending, submitter_args, sizer)
+        for issue, (url, number) in zip(pending, results):
+            if issue.reference and number:
+                references_resolutions[issue.reference] = number
+            yield issue, url, number
+        pending.clear()
+        defined_by_pending.clear()
+
+    for issue in issues:
+        if issue.required_references & defined_by_pending or len(pending) >= sizer.size:
+            yield from flush()
+
+        pending.append(
+            issue.resolve_references(references_resolutions, strict=not dry_running())
+        )
+        if issue.reference:
+            defined_by_pending.add(issue.reference)
+
+    if pending:
+        yield from flush()
@@ -0,0 +1,152 @@
+import re
+from unittest.mock import patch
+
+import pytest
+
+import issurge.github
+from issurge.batch import ChunkSizer, submit_in_batches
+from issurge.parser import parse
+
+
+@pytest.fixture
+def graphql_api(stub_api, monkeypatch):
+    monkeypatch.setenv("ISSURGE_HTTP", "1")
+    monkeypatch.setenv("ISSURGE_GITHUB_API_URL", stub_api.url)
+    monkeypatch.setenv("GH_TOKEN", "sekrit")
+    issurge.github.client.cache_clear()
+    issurge.github.graphql_client.cache_clear()
+    issurge.github._node_ids.clear()
+
+    created = []
+
+    def graphql(request):
+        document = request.body["query"]
+        if document.startswith("query"):
+            return 200, {
+                "data": {
+                    "repository": {
+                        "id": "R_1",
+                        **{
+                            alias: {"id": f"L_{alias}"}
+                            for alias in re.findall(r"(n\d+): label", document)
+                        },
+                    },
+                    **{
+                        alias: {"id": "U_me"}
+                        for alias in re.findall(r"(n\d+): viewer", document)
+                    },
+                }
+            }
+
+        aliases = re.findall(r"(issue\d+): createIssue", document)
+        if len(aliases) > stub_api.max_issues_per_request:
+            return 200, {
+                "errors": [{"type": "MAX_NODE_LIMIT_EXCEEDED", "message": "Too big"}]
+            }
+
+        data = {}
+        for alias in aliases:
+            created.append(alias)
+            number = len(created)
+            data[alias] = {
+                "issue": {
+                    "number": number,
+                    "url": f"https://github.com/gwennlbh/gh-api-playground/issues/{number}",
+                    "databaseId": 1000 + number,
+                }
+            }
+        return 200, {"data": data}
+
+    stub_api.max_issues_per_request = 100
+    stub_api.routes[("POST", "/graphql")] = graphql
+    stub_api.routes[
+        ("POST", "/repos/gwennlbh/gh-api-playground/issues/1/sub_issues")
+    ] = (201, {})
+
+    with (
+        patch("issurge.github.repo_info") as repo_info,
+        patch("issurge.github.available_issue_types") as available_issue_types,
+        patch("issurge.github.available_issue_fields") as available_issue_fields,
+    ):
+        repo_info.return_value = issurge.github.OwnerInfo(
+            in_organization=True, owner="gwennlbh", repo="gh-api-playground"
+        )
+        available_issue_types.return_value = []
+        available_issue_fields.return_value = []
+        yield stub_api
+
+    issurge.github.client.cache_clear()
+    issurge.github.graphql_client.cache_clear()
+
+
+def mutations(stub_api) -> list[int]:
+    return [
+        len(re.findall(r"createIssue", r.body["query"]))
+        for r in stub_api.requests
+        if r.path == "/graphql" and r.body["query"].startswith("mutation")
+    ]
+
+
+def test_chunk_sizer():
+    sizer = ChunkSizer(initial=8, minimum=1, maximum=10)
+    sizer.succeeded()
+    assert sizer.size == 10
+    sizer.succeeded()
+    assert sizer.size == 10
+    sizer.too_expensive()
+    sizer.too_expensive()
+    sizer.too_expensive()
+    sizer.too_expensive()
+    sizer.too_expensive()
+    assert sizer.size == 1
+
+
+def test_independent_issues_are_created_in_one_request(graphql_api):
+    resolutions = {}
+    submitted = list(
+        submit_in_batches(parse("~bug\n\tFirst\n\tSecond @me\nThird"), resolutions, [])
+    )
+
+    assert [(issue.title, number) for issue, _, number in submitted] == [
+        ("First", 1),
+        ("Second", 2),
+        ("Third", 3),
+    ]
+    assert mutations(graphql_api) == [3]
+    [lookup] = [r for r in graphql_api.requests if r.body["query"].startswith("query")]
+    assert 'label(name: "bug")' in lookup.body["query"]
+    assert "viewer" in lookup.body["query"]
+
+
+def test_batches_are_split_on_references(graphql_api):
+    resolutions = {}
+    submitted = list(
+        submit_in_batches(
+            parse("#.1 Parent\nUnrelated\n^.1 Child\nAlso a child:\n\tSee #.1"),
+            resolutions,
+            [],
+        )
+    )
+
+    assert [(issue.title, number) for issue, _, number in submitted] == [
+        ("Parent", 1),
+        ("Unrelated", 2),
+        ("Child", 3),
+        ("Also a child", 4),
+    ]
+    assert resolutions == {1: 1}
+    assert mutations(graphql_api) == [2, 2]
+    assert submitted[3][0].description == "See #1\n"
+    [sub_issue] = [r for r in graphql_api.requests if r.path.endswith("sub_issues")]
+    assert sub_issue.body == {"sub_issue_id": 1003, "replace_parent": True}
+
+
+def test_chunks_shrink_when_too_expensive(graphql_api):
+    graphql_api.max_issues_per_request = 2
+    sizer = ChunkSizer(initial=5)
+    submitted = list(
+        submit_in_batches(parse("One\nTwo\nThree\nFour\nFive"), {}, [], sizer)
+    )
+
+    assert [number for _, _, number in submitted] == [1, 2, 3, 4, 5]
+    assert mutations(graphql_api) == [5, 2, 3, 1, 2]
@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from issurge.utils import debug
+
+# how long fetched metadata is trusted for, in seconds
+DEFAULT_TTL = 24 * 60 * 60
+
+# how many issue IDs are remembered, least recently used ones are forgotten first
+DEFAULT_ISSUE_IDS_CAPACITY = 10_000
+
+
+def directory() -> Path:
+    if path := os.environ.get("ISSURGE_CACHE_DIR"):
+        return Path(path)
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "issurge"
+
+
+def ttl() -> float:
+    return float(os.environ.get("ISSURGE_METADATA_TTL") or DEFAULT_TTL)
+
+
+def issue_ids_capacity() -> int:
+    return int(
+        os.environ.get("ISSURGE_ISSUE_ID_CACHE_SIZE") or DEFAULT_ISSUE_IDS_CAPACITY
+    )
+
+
+def refreshing() -> bool:
+    return os.environ.get("ISSURGE_REFRESH_METADATA") == "1"
+
+
+@contextmanager
+def connect() -> Iterator[sqlite3.Connection]:
+    """
+    Opens the cache database in a transaction, and closes it afterwards
+    """
+    directory().mkdir(parents=True, exist_ok=True)
+    # parallel runs wait on each other's writes instead of failing right away
+    connection = sqlite3.connect(directory() / "cache.sqlite3", timeout=10)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS issue_ids (repository TEXT NOT NULL, number INTEGER NOT NULL, id INTEGER NOT NULL, used_at REAL NOT NULL, PRIMARY KEY (repository, number))"
+        )
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def load(key: str) -> Any | None:
+    """
+    Returns the cached value for key, or None if there is none, it is too old or --refresh-metadata was passed
+    """
+    if refreshing():
+        return None
+    try:
+        with connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM metadata WHERE key = ? AND fetched_at > ?",
+                (key, time.time() - ttl()),
+            ).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        debug(f"Could not read {key!r} from the metadata cache: {e}")
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def store(key: str, value: Any):
+    try:
+        with connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO metadata (key, value, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+    except (sqlite3.Error, OSError) as e:
+        debug(f"Could not write {key!r} to the metadata cache: {e}")
+
+
+def load_issue_id(repository: str, number: int) -> int | None:
+    """
+    Issue IDs never change, so they don't expire: they are only forgotten when too many are stored, or when they stop working
+    """
+    try:
+        with connect() as connection:
+            row = connection.execute(
+                "UPDATE issue_ids SET used_at = ? WHERE repository = ? AND number = ? RETURNING id",
+                (time.time(), repository, number),
+            ).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        debug(f"Could not read the ID of #{number} from the cache: {e}")
+        return None
+    return row[0] if row else None
+
+
+def store_issue_id(repository: str, number: int, id: int):
+    try:
+        with connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO issue_ids (repository, number, id, used_at) VALUES (?, ?, ?, ?)",
+                (repository, number, id, time.time()),
+            )
+            connection.execute(
+                "DELETE FROM issue_ids WHERE rowid IN (SELECT rowid FROM issue_ids ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (issue_ids_capacity(),),
+            )
+    except (sqlite3.Error, OSError) as e:
+        debug(f"Could not write the ID of #{number} to the cache: {e}")
+
+
+def delete_issue_ids(repository: str, numbers: Iterable[int]):
+    try:
+        with connect() as connection:
+            connection.executemany(
+                "DELETE FROM issue_ids WHERE repository = ? AND number = ?",
+                [(repository, number) for number in numbers],
+            )
+    except (sqlite3.Error, OSError) as e:
+        debug(f"Could not remove issue IDs from the cache: {e}")
@@ -0,0 +1,165 @@
+import json
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+import issurge.github
+from issurge.cache import load, load_issue_id, store
+from issurge.github import (
+    CreatedIssue,
+    OwnerInfo,
+    available_issue_types,
+    issue_id,
+    repo_info,
+)
+from issurge.parser import Issue, IssueReference
+from issurge.session import Session
+
+
+@pytest.fixture
+def gh(monkeypatch):
+    monkeypatch.setattr(
+        issurge.github, "_session", Session.detect("gwennlbh/gh-api-playground")
+    )
+    run = Mock(
+        return_value=json.dumps(
+            {
+                "isInOrganization": True,
+                "owner": {"login": "gwennlbh"},
+                "name": "gh-api-playground",
+            }
+        )
+    )
+    monkeypatch.setattr(issurge.github, "run", run)
+    yield run
+
+
+def new_run():
+    for cached in (repo_info, available_issue_types):
+        cached.cache_clear()
+
+
+def test_metadata_is_remembered_across_runs(gh):
+    assert repo_info() == OwnerInfo(True, "gwennlbh", "gh-api-playground")
+    new_run()
+    assert repo_info() == OwnerInfo(True, "gwennlbh", "gh-api-playground")
+    assert gh.call_count == 1
+
+
+def test_metadata_is_fetched_again_when_too_old(gh, monkeypatch):
+    repo_info()
+    new_run()
+    monkeypatch.setenv("ISSURGE_METADATA_TTL", "0")
+    repo_info()
+    assert gh.call_count == 2
+
+
+def test_refresh_metadata(gh, monkeypatch):
+    repo_info()
+    new_run()
+    monkeypatch.setenv("ISSURGE_REFRESH_METADATA", "1")
+    repo_info()
+    monkeypatch.setenv("ISSURGE_REFRESH_METADATA", "")
+    new_run()
+    repo_info()
+    assert gh.call_count == 2
+
+
+def test_metadata_is_per_repository(gh, monkeypatch):
+    repo_info()
+    issurge.github.use_session(Session.detect("gwennlbh/issurge"))
+    repo_info()
+    assert gh.call_count == 2
+    assert gh.call_args.args[0][:4] == ["gh", "repo", "view", "gwennlbh/issurge"]
+
+
+def test_empty_metadata_is_not_remembered(gh, monkeypatch):
+    call_api = Mock(return_value=None)
+    monkeypatch.setattr(issurge.github, "call_api", call_api)
+    assert available_issue_types() == []
+    new_run()
+    assert available_issue_types() == []
+    assert call_api.call_count == 2
+
+
+def test_concurrent_writes():
+    def write(i):
+        for j in range(20):
+            store(f"key {i} {j}", [i, j])
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(load(f"key {i} 19") == [i, 19] for i in range(8))
+
+
+@pytest.fixture
+def issues_api(monkeypatch):
+    monkeypatch.setattr(
+        issurge.github,
+        "repo_info",
+        Mock(return_value=OwnerInfo(True, "gwennlbh", "gh-api-playground")),
+    )
+    call_repo_api = Mock(
+        side_effect=lambda method, route, **body: (
+            json.dumps({"id": 1000 + int(route.split("/")[-1])})
+            if method == "GET"
+            else "{}"
+        )
+    )
+    monkeypatch.setattr(issurge.github, "call_repo_api", call_repo_api)
+    yield call_repo_api
+
+
+def lookups(call_repo_api) -> list[str]:
+    return [c.args[1] for c in call_repo_api.call_args_list if c.args[0] == "GET"]
+
+
+def test_issue_ids_are_remembered_across_runs(issues_api):
+    assert issue_id(4) == 1004
+    assert issue_id(4) == 1004
+    assert lookups(issues_api) == ["issues/4"]
+
+
+def test_created_issues_ids_are_remembered(issues_api):
+    Issue(title="Epic")._github_finish(
+        CreatedIssue("https://github.com/gwennlbh/gh-api-playground/issues/7", 7, 42),
+        None,
+        {},
+    )
+    assert issue_id(7) == 42
+    assert lookups(issues_api) == []
+
+
+def test_least_recently_used_issue_ids_are_forgotten(issues_api, monkeypatch):
+    monkeypatch.setenv("ISSURGE_ISSUE_ID_CACHE_SIZE", "2")
+    issue_id(1)
+    issue_id(2)
+    issue_id(1)
+    issue_id(3)
+    issue_id(1)
+    issue_id(2)
+    assert lookups(issues_api) == ["issues/1", "issues/2", "issues/3", "issues/2"]
+
+
+def test_issue_ids_are_forgotten_when_they_do_not_work(issues_api):
+    issue_id(3)
+    issues_api.side_effect = lambda method, route, **body: None
+    Issue(title="Blocked", blocked_by=[IssueReference("direct", 3)])._github_finish(
+        CreatedIssue("https://github.com/gwennlbh/gh-api-playground/issues/8", 8),
+        None,
+        {},
+    )
+    assert load_issue_id("gwennlbh/gh-api-playground", 3) is None
+
+
+def test_metadata_is_not_remembered_without_a_repository(gh, monkeypatch):
+    monkeypatch.setattr(issurge.github, "_session", None)
+    repo_info()
+    new_run()
+    repo_info()
+    assert gh.call_count == 2
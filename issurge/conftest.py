@@ -0,0 +1,108 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, NamedTuple
+from urllib.parse import urlsplit
+
+import pytest
+
+from issurge import throttle
+
+
+class StubRequest(NamedTuple):
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: Any
+    client_port: int
+
+
+type StubReply = tuple[int, Any]
+
+
+class StubAPI:
+    """
+    Local HTTP server that answers JSON API calls from a table of canned responses,
+    and records every request it received.
+    """
+
+    def __init__(self):
+        self.routes: dict[
+            tuple[str, str], StubReply | Callable[[StubRequest], StubReply]
+        ] = {}
+        self.requests: list[StubRequest] = []
+        # close connections after each response without telling the client, like an idle timeout would
+        self.drop_connections = False
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                request = StubRequest(
+                    method=self.command,
+                    path=self.path,
+                    headers={k.lower(): v for k, v in self.headers.items()},
+                    body=json.loads(raw) if raw else None,
+                    client_port=self.client_address[1],
+                )
+                stub.requests.append(request)
+
+                route = stub.routes.get((self.command, urlsplit(self.path).path))
+                status, reply = (
+                    (404, {"message": "Not Found"})
+                    if route is None
+                    else route(request) if callable(route) else route
+                )
+
+                if stub.drop_connections:
+                    self.close_connection = True
+
+                payload = json.dumps(reply).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_api():
+    stub = StubAPI()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture(autouse=True)
+def metadata_cache(tmp_path, monkeypatch):
+    """
+    Keeps tests away from the user's cache directory, and from each other's cached metadata
+    """
+    monkeypatch.setenv("ISSURGE_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+@pytest.fixture(autouse=True)
+def fresh_throttle():
+    """
+    Keeps rate limits that a test ran into from slowing the next ones down
+    """
+    throttle.shared.cache_clear()
+    yield
+    throttle.shared.cache_clear()
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, NamedTuple
+
+from issurge import github, gitlab
+from issurge.parser import Issue
+from issurge.profiling import timed
+from issurge.session import Session
+from issurge.utils import NORMAL, PER_PAGE, log, pages
+
+
+class ExistingIssue(NamedTuple):
+    title: str
+    number: int
+    url: str
+    # None for open issues
+    closed_at: datetime | None = None
+
+
+def normalize_title(title: str) -> str:
+    """
+    Titles that only differ by case or whitespace are considered the same
+    """
+    return " ".join(title.casefold().split())
+
+
+def parse_date(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+def timestamp(date: datetime) -> str:
+    return date.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def github_issues(session: Session, since: datetime | None) -> Iterator[ExistingIssue]:
+    route = f"/repos/{session.owner}/{session.repo}/issues?per_page={PER_PAGE}"
+    queries = ["state=open"]
+    if since:
+        # since filters on the last update, and closing an issue updates it
+        queries.append(f"state=closed&since={timestamp(since)}")
+
+    for query in queries:
+        for issue in pages(
+            f"the issues of {session.slug}",
+            lambda page: github.call_api(
+                "GET", f"{route}&{query}&page={page}", bypass_dry_run=True
+            ),
+        ):
+            # the issues API lists pull requests too
+            if "pull_request" not in issue:
+                yield ExistingIssue(
+                    issue["title"],
+                    issue["number"],
+                    issue["html_url"],
+                    parse_date(issue.get("closed_at")),
+                )
+
+
+def gitlab_issues(session: Session, since: datetime | None) -> Iterator[ExistingIssue]:
+    queries = ["state=opened"]
+    if since:
+        queries.append(f"state=closed&updated_after={timestamp(since)}")
+
+    for query in queries:
+        for issue in pages(
+            f"the issues of {session.slug}",
+            lambda page: gitlab.call_project_api(
+                session.gitlab_project,
+                "GET",
+                f"issues?{query}&per_page={PER_PAGE}&page={page}",
+                bypass_dry_run=True,
+            ),
+        ):
+            yield ExistingIssue(
+                issue["title"],
+                issue["iid"],
+                issue["web_url"],
+                parse_date(issue.get("closed_at")),
+            )
+
+
+class ExistingIssues:
+    """
+    Index of the issues already in the repository by normalized title, for --skip-existing
+    """
+
+    def __init__(self, issues: Iterable[ExistingIssue]):
+        self.by_title: dict[str, ExistingIssue] = {}
+        for issue in issues:
+            # open issues come first, and win over closed ones with the same title
+            self.by_title.setdefault(normalize_title(issue.title), issue)
+        self.skipped = 0
+
+    @classmethod
+    @timed("fetch existing issues")
+    def fetch(
+        cls, session: Session, closed_within_days: float | None = None
+    ) -> "ExistingIssues":
+        """
+        Lists open issues, and those closed in the last closed_within_days days if given, in as few requests as possible
+        """
+        since = (
+            datetime.now(timezone.utc) - timedelta(days=closed_within_days)
+            if closed_within_days is not None
+            else None
+        )
+        fetch = github_issues if session.forge == "github" else gitlab_issues
+        return cls(
+            issue
+            for issue in fetch(session, since)
+            # issues closed long ago but updated since are listed too
+            if not (since and issue.closed_at and issue.closed_at < since)
+        )
+
+    def get(self, issue: Issue) -> ExistingIssue | None:
+        return self.by_title.get(normalize_title(issue.title))
+
+    def skip_existing(
+        self, issues: Iterable[Issue], references_resolutions: dict[int, int]
+    ) -> Iterator[Issue]:
+        """
+        Issues that don't exist yet. References to the ones that do resolve to the existing issue.
+        """
+        for issue in issues:
+            if existing := self.get(issue):
+                log(
+                    NORMAL,
+                    lambda: f"Skipping {issue.display()}: it already exists as #{existing.number} ({existing.url})",
+                )
+                if issue.reference:
+                    references_resolutions[issue.reference] = existing.number
+                self.skipped += 1
+                continue
+            yield issue
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from issurge import github, gitlab
+from issurge.existing import ExistingIssue, ExistingIssues
+from issurge.parser import parse
+from issurge.session import Session
+
+GITHUB = Session.detect("gwennlbh/gh-api-playground")
+GITLAB = Session.detect("git.inpt.fr/net7/website")
+
+
+@pytest.fixture
+def forges_over_http(stub_api, monkeypatch):
+    monkeypatch.setenv("ISSURGE_HTTP", "1")
+    monkeypatch.setenv("ISSURGE_GITHUB_API_URL", stub_api.url)
+    monkeypatch.setenv("ISSURGE_GITLAB_API_URL", f"{stub_api.url}/api/v4")
+    monkeypatch.setenv("GH_TOKEN", "sekrit")
+    monkeypatch.setenv("GITLAB_TOKEN", "sekrit")
+    monkeypatch.setattr("issurge.utils.PER_PAGE", 2)
+    for cached in (github.client, github.token, gitlab.client, gitlab.token):
+        cached.cache_clear()
+    yield stub_api
+    github.client.cache_clear()
+    gitlab.client.cache_clear()
+
+
+def paginated(items, number="number"):
+    def reply(request):
+        query = parse_qs(urlsplit(request.path).query)
+        state = query["state"][0].replace("opened", "open")
+        matching = [item for item in items if item["state"] == state]
+        page = int(query["page"][0])
+        return 200, matching[(page - 1) * 2 : page * 2]
+
+    return reply
+
+
+def ago(days: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def test_fetches_every_page_of_github_issues(forges_over_http):
+    def issue(number, title, state="open", closed_at=None, **extra):
+        return {
+            "number": number,
+            "title": title,
+            "state": state,
+            "closed_at": closed_at,
+            "html_url": f"https://github.com/gwennlbh/gh-api-playground/issues/{number}",
+            **extra,
+        }
+
+    forges_over_http.routes[("GET", "/repos/gwennlbh/gh-api-playground/issues")] = (
+        paginated(
+            [
+                issue(1, "One"),
+                issue(2, "A pull request", pull_request={}),
+                issue(3, "Three"),
+                issue(4, "Recently closed", "closed", ago(1)),
+                issue(5, "Closed long ago", "closed", ago(30)),
+            ]
+        )
+    )
+
+    existing = ExistingIssues.fetch(GITHUB, closed_within_days=7)
+
+    assert sorted(issue.number for issue in existing.by_title.values()) == [1, 3, 4]
+    assert [
+        (query["state"][0], query["page"][0])
+        for query in (
+            parse_qs(urlsplit(r.path).query) for r in forges_over_http.requests
+        )
+    ] == [("open", "1"), ("open", "2"), ("closed", "1"), ("closed", "2")]
+
+
+def test_fetches_open_gitlab_issues(forges_over_http):
+    forges_over_http.routes[("GET", "/api/v4/projects/net7%2Fwebsite/issues")] = (
+        paginated(
+            [
+                {
+                    "iid": 8,
+                    "title": "Eight",
+                    "state": "open",
+                    "web_url": "https://git.inpt.fr/net7/website/-/issues/8",
+                }
+            ]
+        )
+    )
+
+    assert ExistingIssues.fetch(GITLAB).by_title == {
+        "eight": ExistingIssue(
+            "Eight", 8, "https://git.inpt.fr/net7/website/-/issues/8"
+        )
+    }
+    assert len(forges_over_http.requests) == 1
+
+
+def test_skips_issues_with_an_existing_title():
+    existing = ExistingIssues(
+        [ExistingIssue("Fix  the Login page", 12, "https://github.com/o/r/issues/12")]
+    )
+    resolutions = {}
+
+    remaining = existing.skip_existing(
+        parse("#.1 fix the login   PAGE\nSomething new ^.1"), resolutions
+    )
+
+    assert [issue.title for issue in remaining] == ["Something new"]
+    assert resolutions == {1: 12}
+    assert existing.skipped == 1
+
+
+def test_a_failed_listing_stops_the_run(forges_over_http):
+    forges_over_http.routes[("GET", "/repos/gwennlbh/gh-api-playground/issues")] = (
+        401,
+        {"message": "Bad credentials"},
+    )
+
+    # an empty index would have every issue created again
+    with pytest.raises(Exception, match="Could not list the issues of"):
+        ExistingIssues.fetch(GITHUB)
@@ -1,11 +1,27 @@
 import json
-from functools import cache
+import os
+from functools import cache, wraps
 from itertools import chain
-from typing import Any, Literal, NamedTuple
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Literal, NamedTuple
 
 from rich import print
 
-from issurge.utils import run
+from issurge.profiling import timed
+from issurge.session import Session
+from issurge.utils import (
+    PER_PAGE,
+    HTTPMethod,
+    debug,
+    pages,
+    run,
+    run_async,
+    using_http,
+)
+
+# The metadata cache (sqlite3) and the HTTP transport (http.client, ssl) are imported when they are used,
+# so that runs that spawn gh don't pay for them.
+if TYPE_CHECKING:
+    from issurge.transport import HTTPClient
 
 
 class OwnerInfo(NamedTuple):
@@ -19,11 +35,98 @@ class OwnerInfo(NamedTuple):
         yield "repo", self.repo, ""
 
 
+class CreatedIssue(NamedTuple):
+    url: str
+    number: int
+    # REST API ID, when the creation response gave it to us
+    id: int | None = None
+    # whether the issue type was set while creating the issue
+    type_set: bool = False
+
+
+# where the current run submits to, once known
+_session: Session | None = None
+
+
+def use_session(session: Session):
+    """
+    Makes gh commands and API calls target the repository of session.
+    What was fetched about another repository is forgotten.
+    """
+    global _session
+    if session == _session:
+        return
+    _session = session
+    for fetched in (
+        repo_info,
+        available_issue_types,
+        available_issue_fields,
+        available_issue_field_shorthands,
+        milestone_numbers,
+        viewer_login,
+        token,
+        client,
+        graphql_client,
+    ):
+        fetched.cache_clear()
+    _node_ids.clear()
+
+
+def repository_key() -> str | None:
+    """
+    Identifies the repository gh commands run against, to remember its metadata across runs.
+    Metadata is not remembered when the repository is not known, e.g. when only parsing issues.
+    """
+    return _session.url if _session else None
+
+
+def persisted(scope: Callable[[], str | None], decode: Callable[[Any], Any]):
+    """
+    Remembers what the decorated function returns across runs, for each scope (e.g. a repository).
+    Nothing is remembered while the scope is None.
+    Values are stored as JSON, and turned back into what the function returns with decode.
+    Empty values are not remembered, as they usually come from failed API calls.
+    """
+
+    def decorator(fetch: Callable[[], Any]) -> Callable[[], Any]:
+        @wraps(fetch)
+        def cached():
+            if (current := scope()) is None:
+                return fetch()
+
+            from issurge.cache import load, store
+
+            key = f"{current} {fetch.__name__}"
+            if (value := load(key)) is not None:
+                debug(f"Using cached {key}")
+                return decode(value)
+
+            fetched = fetch()
+            if fetched:
+                store(key, fetched)
+            return fetched
+
+        return cached
+
+    return decorator
+
+
 @cache
+@timed("metadata: repository")
+@persisted(repository_key, decode=lambda fields: OwnerInfo(*fields))
 def repo_info():
+    # without a session, gh uses the repository of the current checkout
+    repository = [_session.slug] if _session else []
     response = json.loads(
         run(
-            ["gh", "repo", "view", "--json", "isInOrganization,owner,name"],
+            [
+                "gh",
+                "repo",
+                "view",
+                *repository,
+                "--json",
+                "isInOrganization,owner,name",
+            ],
             bypass_dry_run=True,
         )
         or "{}"
@@ -36,22 +139,25 @@ def repo_info():
 
 
 @cache
+@timed("metadata: issue types")
+@persisted(repository_key, decode=list)
 def available_issue_types() -> list[str]:
     repo = repo_info()
 
     if not repo.in_organization:
         return []
 
-    return json.loads(
+    issue_types = json.loads(
         call_api(
             "GET",
             f"/orgs/{repo.owner}/issue-types",
-            jq="[ .[].name ]",
             bypass_dry_run=True,
         )
         or "[]"
     )
 
+    return [issue_type["name"] for issue_type in issue_types]
+
 
 type IssueFieldType = Literal["number", "single_select", "text", "date"]
 
@@ -83,6 +189,10 @@ class IssueField(NamedTuple):
 
 
 @cache
+@timed("metadata: issue fields")
+@persisted(
+    repository_key, decode=lambda fields: [IssueField(*field) for field in fields]
+)
 def available_issue_fields() -> list[IssueField]:
     repo = repo_info()
 
@@ -93,28 +203,20 @@ def available_issue_fields() -> list[IssueField]:
         call_api(
             "GET",
             f"/orgs/{repo.owner}/issue-fields",
-            jq="""
-                
-                [
-                
-                .[] | {
-                    id: .id,
-                    name: .name,
-                    type: .data_type,
-                    options: [
-                        (.options // [])[].name
-                    ] 
-                }
-
-                ]
-                
-            """.replace("\n", "").strip(),
             bypass_dry_run=True,
         )
-        or "{}"
+        or "[]"
     )
 
-    return [IssueField(**field) for field in fields]
+    return [
+        IssueField(
+            name=field["name"],
+            id=field["id"],
+            type=field["data_type"],
+            options=[option["name"] for option in field.get("options") or []],
+        )
+        for field in fields
+    ]
 
 
 @cache
@@ -198,33 +300,229 @@ def resolve_issue_field_shorthand(shorthand: str) -> tuple[IssueField, str]:
     )
 
 
-@cache
 def issue_id(number: int):
-    issue_id = call_repo_api("GET", f"issues/{number}", jq=".id")
-    if not issue_id:
+    from issurge.cache import load_issue_id
+
+    if id := load_issue_id(repository_name(), number):
+        return id
+    return issue_id_from_response(number, call_repo_api("GET", f"issues/{number}"))
+
+
+async def issue_id_async(number: int):
+    import asyncio
+
+    from issurge.cache import load_issue_id
+
+    # the cache is an SQLite database, that may be locked by another run for a while
+    if id := await asyncio.to_thread(load_issue_id, repository_name(), number):
+        return id
+    response = await call_repo_api_async("GET", f"issues/{number}")
+    return await asyncio.to_thread(issue_id_from_response, number, response)
+
+
+def issue_id_from_response(number: int, response: str | None) -> int:
+    issue = json.loads(response or "null")
+    if not issue:
         raise Exception(f"Could not retrieve issue ID for issue #{number}")
-    return int(issue_id)
+    remember_issue_id(number, int(issue["id"]))
+    return int(issue["id"])
+
+
+def repository_name() -> str:
+    repo = repo_info()
+    return f"{repo.owner}/{repo.repo}"
+
+
+def remember_issue_id(number: int, id: int):
+    from issurge.cache import store_issue_id
+
+    store_issue_id(repository_name(), number, id)
+
+
+def forget_issue_ids(numbers: Iterable[int]):
+    """
+    For IDs that did not work, e.g. because the issue was deleted or transferred
+    """
+    from issurge.cache import delete_issue_ids
+
+    delete_issue_ids(repository_name(), numbers)
+
+
+@cache
+@timed("metadata: milestones")
+def milestone_numbers() -> dict[str, int]:
+    """
+    Maps milestone titles to their numbers, since the REST API only accepts the latter
+    """
+    repo = repo_info()
+    route = f"/repos/{repo.owner}/{repo.repo}/milestones?state=all&per_page={PER_PAGE}"
+    return {
+        milestone["title"]: milestone["number"]
+        for milestone in pages(
+            f"the milestones of {repo.owner}/{repo.repo}",
+            lambda page: call_api("GET", f"{route}&page={page}", bypass_dry_run=True),
+        )
+    }
+
+
+def milestone_number(title: str) -> int:
+    try:
+        return milestone_numbers()[title]
+    except KeyError:
+        raise KeyError(
+            f"No milestone named {title!r} exists in this repository. "
+            f"Available milestones: {', '.join(repr(t) for t in milestone_numbers())}"
+        )
+
+
+@cache
+@timed("metadata: viewer")
+def viewer_login() -> str:
+    """
+    Login of the authenticated user, to resolve the special @me assignee
+    """
+    viewer = json.loads(call_api("GET", "/user", bypass_dry_run=True) or "{}")
+    if "login" not in viewer:
+        raise KeyError("Could not get the login of the authenticated user")
+    return viewer["login"]
+
+
+def enterprise_host() -> str | None:
+    """
+    Host of the GitHub Enterprise Server instance the current run submits to, if any
+    """
+    return _session.host if _session and _session.host != "github.com" else None
+
+
+def api_url() -> str:
+    if url := os.environ.get("ISSURGE_GITHUB_API_URL"):
+        return url
+    if host := enterprise_host():
+        return f"https://{host}/api/v3"
+    return "https://api.github.com"
+
+
+def graphql_url() -> str:
+    """
+    GitHub Enterprise Server serves the GraphQL API at /api/graphql, next to the REST one at /api/v3
+    """
+    return api_url().removesuffix("/v3")
+
+
+@cache
+def token() -> str:
+    if enterprise_host():
+        token = os.environ.get("GH_ENTERPRISE_TOKEN") or os.environ.get(
+            "GITHUB_ENTERPRISE_TOKEN"
+        )
+    else:
+        token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+
+    out = run(["gh", "auth", "token", *hostname_flag()], bypass_dry_run=True)
+    if not out or not out.strip():
+        raise Exception(
+            "Could not get a GitHub token: set GH_TOKEN (GH_ENTERPRISE_TOKEN for GitHub Enterprise Server) or log in with `gh auth login`"
+        )
+    return out.strip().splitlines()[-1]
+
+
+@cache
+def client() -> "HTTPClient":
+    from issurge.transport import HTTPClient
+
+    return HTTPClient(
+        api_url(),
+        headers={
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {token()}",
+            "X-GitHub-Api-Version": "2022-11-28",
+        },
+    )
+
+
+@cache
+def graphql_client() -> "HTTPClient":
+    """
+    The same as client, unless the GraphQL API is not under the REST one, like on GitHub Enterprise Server
+    """
+    if graphql_url() == api_url():
+        return client()
+
+    from issurge.transport import HTTPClient
 
+    return HTTPClient(graphql_url(), headers=client().headers)
 
-type HTTPMethod = Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+def hostname_flag() -> list[str]:
+    """
+    gh commands that don't take a repository use github.com unless told otherwise
+    """
+    host = enterprise_host()
+    return ["--hostname", host] if host else []
 
 
 def call_api(
     method: HTTPMethod,
     route: str,
-    jq="",
     bypass_dry_run=False,
     **body_fields: Any,
-):
-    cmd = ["gh", "api"]
-    if method != "GET":
-        cmd += ["-X", method]
+) -> str | None:
+    """
+    Returns the raw JSON response body, or None if the call failed or was not made (dry-run)
+    """
+    bypass_dry_run = can_bypass_dry_run(method, route, bypass_dry_run)
 
+    if using_http():
+        from issurge.transport import call
+
+        return call(client, method, route, bypass_dry_run, body_fields)
+
+    return run(api_command(method, route, body_fields), bypass_dry_run=bypass_dry_run)
+
+
+async def call_api_async(
+    method: HTTPMethod,
+    route: str,
+    bypass_dry_run=False,
+    **body_fields: Any,
+) -> str | None:
+    """
+    Same as call_api, but does not block the event loop
+    """
+    bypass_dry_run = can_bypass_dry_run(method, route, bypass_dry_run)
+
+    if using_http():
+        import asyncio
+
+        from issurge.transport import call
+
+        # HTTPClient is synchronous, run its blocking socket I/O on the default executor
+        return await asyncio.to_thread(
+            call, client, method, route, bypass_dry_run, body_fields
+        )
+
+    return await run_async(
+        api_command(method, route, body_fields), bypass_dry_run=bypass_dry_run
+    )
+
+
+def can_bypass_dry_run(method: HTTPMethod, route: str, bypass_dry_run: bool) -> bool:
     if method != "GET" and bypass_dry_run:
         print(
             f"Will [bold]not[/] bypass dry-run for non-GET request [white bold]{method} {route}[/]"
         )
-        bypass_dry_run = False
+        return False
+    return bypass_dry_run
+
+
+def api_command(
+    method: HTTPMethod, route: str, body_fields: dict[str, Any]
+) -> list[str]:
+    cmd = ["gh", "api", *hostname_flag()]
+    if method != "GET":
+        cmd += ["-X", method]
 
     cmd += [route]
 
@@ -232,10 +530,116 @@ def call_api(
         for field in serialize_body_field(key, value):
             cmd += ["-F", field]
 
-    if jq:
-        cmd += ["--jq", jq]
+    return cmd
+
+
+def graphql(document: str) -> dict[str, Any] | None:
+    """
+    Returns the whole response (data and errors), or None if the call failed or was not made (dry-run).
+    Always goes over HTTP: gh exits with an error as soon as a response contains errors, which would lose the partial data.
+    """
+    from issurge.transport import call
+
+    response = call(graphql_client, "POST", "graphql", body={"query": document})
+    return json.loads(response) if response else None
+
+
+def graphql_literal(value: Any) -> str:
+    """
+    Inlines a value in a GraphQL document. JSON strings are valid GraphQL strings.
+    """
+    match value:
+        case dict():
+            return (
+                "{"
+                + ", ".join(f"{k}: {graphql_literal(v)}" for k, v in value.items())
+                + "}"
+            )
+        case list():
+            return "[" + ", ".join(graphql_literal(item) for item in value) + "]"
+        case _:
+            return json.dumps(value, ensure_ascii=False)
+
+
+type NodeKind = Literal["repository", "label", "milestone", "user", "issue_type"]
+
+_node_ids: dict[tuple[NodeKind, str], str] = {}
 
-    return run(cmd, bypass_dry_run=bypass_dry_run)
+
+def node_ids(wanted: set[tuple[NodeKind, str]]) -> dict[tuple[NodeKind, str], str]:
+    """
+    Resolves GraphQL node IDs of labels (by name), milestones (by title), users (by login, "me" is the viewer),
+    issue types (by name) and of the repository itself, with a single query for everything that is not known yet.
+    """
+    missing = sorted(w for w in wanted if w not in _node_ids)
+    if missing:
+        _node_ids.update(_query_node_ids(missing))
+
+    if unknown := [w for w in wanted if w not in _node_ids]:
+        raise KeyError(
+            "Could not find "
+            + ", ".join(f"{kind} {name!r}" for kind, name in sorted(unknown))
+        )
+
+    return {w: _node_ids[w] for w in wanted}
+
+
+def _query_node_ids(
+    missing: list[tuple[NodeKind, str]],
+) -> dict[tuple[NodeKind, str], str]:
+    repo = repo_info()
+    in_repository: list[str] = ["id"]
+    toplevel: list[str] = []
+    for i, (kind, name) in enumerate(missing):
+        match kind:
+            case "label":
+                in_repository.append(
+                    f"n{i}: label(name: {graphql_literal(name)}) {{ id }}"
+                )
+            case "milestone":
+                in_repository.append(
+                    f"n{i}: milestones(first: 100, states: [OPEN, CLOSED], query: {graphql_literal(name)}) {{ nodes {{ id title }} }}"
+                )
+            case "user" if name == "me":
+                toplevel.append(f"n{i}: viewer {{ id }}")
+            case "user":
+                toplevel.append(f"n{i}: user(login: {graphql_literal(name)}) {{ id }}")
+            case "issue_type":
+                in_repository.append(
+                    f"n{i}: issueTypes(first: 100) {{ nodes {{ id name }} }}"
+                )
+
+    response = graphql(
+        f"query {{ repository(owner: {graphql_literal(repo.owner)}, name: {graphql_literal(repo.repo)}) {{ {' '.join(in_repository)} }} {' '.join(toplevel)} }}"
+    )
+    data = (response or {}).get("data") or {}
+    repository = data.get("repository") or {}
+
+    found: dict[tuple[NodeKind, str], str] = {}
+    if repository.get("id"):
+        found["repository", ""] = repository["id"]
+
+    for i, (kind, name) in enumerate(missing):
+        match kind:
+            case "label":
+                result = repository.get(f"n{i}")
+            case "milestone" | "issue_type":
+                attribute = "title" if kind == "milestone" else "name"
+                result = next(
+                    (
+                        node
+                        for node in (repository.get(f"n{i}") or {}).get("nodes", [])
+                        if node[attribute].lower() == name.lower()
+                    ),
+                    None,
+                )
+            case _:
+                result = data.get(f"n{i}")
+
+        if result:
+            found[kind, name] = result["id"]
+
+    return found
 
 
 def serialize_body_field(key: str, value: Any) -> list[str]:
@@ -274,10 +678,18 @@ def serialize_body_field(key: str, value: Any) -> list[str]:
 def call_repo_api(
     method: HTTPMethod,
     route: str,
-    jq="",
     **body_fields: Any,
-):
+) -> str | None:
+    repo = repo_info()
+    return call_api(method, f"/repos/{repo.owner}/{repo.repo}/{route}", **body_fields)
+
+
+async def call_repo_api_async(
+    method: HTTPMethod,
+    route: str,
+    **body_fields: Any,
+) -> str | None:
     repo = repo_info()
-    return call_api(
-        method, f"/repos/{repo.owner}/{repo.repo}/{route}", jq=jq, **body_fields
+    return await call_api_async(
+        method, f"/repos/{repo.owner}/{repo.repo}/{route}", **body_fields
     )
@@ -2,11 +2,23 @@ from unittest.mock import patch
 
 import pytest
 
+import issurge.github
 from issurge.github import (
+    CreatedIssue,
     IssueField,
+    OwnerInfo,
+    api_command,
+    api_url,
     available_issue_field_shorthands,
+    client,
+    graphql_url,
+    milestone_numbers,
     serialize_body_field,
+    token,
+    viewer_login,
 )
+from issurge.parser import Issue, IssueReference, github_created_issue_from_output
+from issurge.session import Session
 
 
 def test_github_serialize_body_field():
@@ -34,8 +46,42 @@ def test_github_serialize_body_field():
     ]
 
 
+def test_gh_is_told_the_repository():
+    session = Session.detect("gwennlbh/elsewhere")
+    assert Issue(title="Do the thing")._github_create_command(None, [], session)[
+        :5
+    ] == [
+        "gh",
+        "issue",
+        "new",
+        "-R",
+        "gwennlbh/elsewhere",
+    ]
+
+
+def test_github_enterprise_server(monkeypatch):
+    monkeypatch.delenv("ISSURGE_GITHUB_API_URL", raising=False)
+    monkeypatch.setattr(
+        issurge.github, "_session", Session.detect("github.example.com/team/app")
+    )
+
+    assert api_url() == "https://github.example.com/api/v3"
+    assert graphql_url() == "https://github.example.com/api"
+    assert api_command("GET", "/user", {}) == [
+        "gh",
+        "api",
+        "--hostname",
+        "github.example.com",
+        "/user",
+    ]
+    assert github_created_issue_from_output(
+        "Creating issue in team/app\n\nhttps://github.example.com/team/app/issues/7\n"
+    ) == CreatedIssue("https://github.example.com/team/app/issues/7", 7)
+
+
 # Due to available_issue_fields
 
+
 @pytest.mark.serial
 def test_available_issue_field_shorthands():
     with patch("issurge.github.available_issue_fields") as fields:
@@ -66,3 +112,118 @@ def test_available_issue_field_shorthands():
             "Tah_small": (2, "Tah small"),
             "Vla_ioudj": (2, "Vla ioudj"),
         }
+
+
+@pytest.fixture
+def github_over_http(stub_api, monkeypatch):
+    monkeypatch.setenv("ISSURGE_HTTP", "1")
+    monkeypatch.setenv("ISSURGE_GITHUB_API_URL", stub_api.url)
+    monkeypatch.setenv("GH_TOKEN", "sekrit")
+    client.cache_clear()
+    token.cache_clear()
+    milestone_numbers.cache_clear()
+    viewer_login.cache_clear()
+    with (
+        patch("issurge.github.repo_info") as repo_info,
+        patch("issurge.github.available_issue_types") as available_issue_types,
+        patch("issurge.github.available_issue_fields") as available_issue_fields,
+    ):
+        repo_info.return_value = OwnerInfo(
+            in_organization=True, owner="gwennlbh", repo="gh-api-playground"
+        )
+        available_issue_types.return_value = ["Bug", "Feature"]
+        available_issue_fields.return_value = []
+        yield stub_api
+    client.cache_clear()
+
+
+def test_submit_over_http(github_over_http):
+    stub_api = github_over_http
+    repo = "/repos/gwennlbh/gh-api-playground"
+    stub_api.routes |= {
+        ("GET", "/user"): (200, {"login": "gwennlbh"}),
+        ("GET", f"{repo}/milestones"): (200, [{"title": "v2", "number": 3}]),
+        ("POST", f"{repo}/issues"): (
+            201,
+            {
+                "number": 12,
+                "id": 100012,
+                "html_url": "https://github.com/gwennlbh/gh-api-playground/issues/12",
+            },
+        ),
+        ("POST", f"{repo}/issues/45/sub_issues"): (201, {}),
+    }
+
+    issue = Issue(
+        title="Do the thing",
+        labels={"feature"},
+        assignees={"me"},
+        milestone="v2",
+        parent=IssueReference("direct", 45),
+    )
+
+    assert issue._github_submit([], Session.detect("gwennlbh/gh-api-playground")) == (
+        "https://github.com/gwennlbh/gh-api-playground/issues/12",
+        12,
+    )
+
+    assert [(r.method, r.path.split("?")[0], r.body) for r in stub_api.requests] == [
+        ("GET", "/user", None),
+        ("GET", f"{repo}/milestones", None),
+        (
+            "POST",
+            f"{repo}/issues",
+            {
+                "title": "Do the thing",
+                "body": "",
+                "assignees": ["gwennlbh"],
+                "labels": [],
+                "milestone": 3,
+                "type": "Feature",
+            },
+        ),
+        (
+            "POST",
+            f"{repo}/issues/45/sub_issues",
+            {"sub_issue_id": 100012, "replace_parent": True},
+        ),
+    ]
+    assert all(r.headers["authorization"] == "Bearer sekrit" for r in stub_api.requests)
+    assert len({r.client_port for r in stub_api.requests}) == 1
+
+
+def test_milestones_are_looked_up_on_every_page(github_over_http):
+    stub_api = github_over_http
+    repo = "/repos/gwennlbh/gh-api-playground"
+
+    def milestones(request):
+        if request.path.endswith("&page=1"):
+            return 200, [{"title": f"v0.{i}", "number": i} for i in range(100)]
+        return 200, [{"title": "v2", "number": 103}]
+
+    stub_api.routes |= {
+        ("GET", f"{repo}/milestones"): milestones,
+        ("POST", f"{repo}/issues"): (
+            201,
+            {
+                "number": 12,
+                "id": 100012,
+                "html_url": "https://github.com/gwennlbh/gh-api-playground/issues/12",
+            },
+        ),
+    }
+    session = Session.detect("gwennlbh/gh-api-playground")
+
+    assert Issue(title="Later", milestone="v2")._github_submit([], session) == (
+        "https://github.com/gwennlbh/gh-api-playground/issues/12",
+        12,
+    )
+    # only this issue fails
+    assert Issue(title="Never", milestone="v3")._github_submit([], session) == (
+        None,
+        None,
+    )
+
+    assert [r.body["milestone"] for r in stub_api.requests if r.method == "POST"] == [
+        103
+    ]
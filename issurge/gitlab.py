@@ -0,0 +1,144 @@
+import json
+import os
+from functools import cache
+from typing import TYPE_CHECKING, Any, NamedTuple
+from urllib.parse import quote
+
+from issurge.utils import HTTPMethod, run
+
+if TYPE_CHECKING:
+    from issurge.transport import HTTPClient
+
+
+class ProjectInfo(NamedTuple):
+    host: str
+    # full path with namespace, e.g. group/subgroup/project
+    path: str
+
+    def __rich_repr__(self):
+        yield "host", self.host
+        yield "path", self.path
+
+    @property
+    def api_route(self) -> str:
+        return f"/projects/{quote(self.path, safe='')}"
+
+
+def api_url(host: str) -> str:
+    return os.environ.get("ISSURGE_GITLAB_API_URL", f"https://{host}/api/v4")
+
+
+@cache
+def token(host: str) -> str:
+    if token := os.environ.get("GITLAB_TOKEN") or os.environ.get("GL_TOKEN"):
+        return token
+
+    out = run(["glab", "config", "get", "token", "--host", host], bypass_dry_run=True)
+    if not out or not out.strip():
+        raise Exception(
+            f"Could not get a GitLab token for {host}: set GITLAB_TOKEN or log in with `glab auth login`"
+        )
+    return out.strip().splitlines()[-1]
+
+
+@cache
+def client(host: str) -> "HTTPClient":
+    from issurge.transport import HTTPClient
+
+    return HTTPClient(api_url(host), headers={"PRIVATE-TOKEN": token(host)})
+
+
+def call_api(
+    host: str,
+    method: HTTPMethod,
+    route: str,
+    bypass_dry_run=False,
+    **body_fields: Any,
+) -> str | None:
+    """
+    Returns the raw JSON response body, or None if the call failed or was not made (dry-run)
+    """
+    from issurge.transport import call
+
+    return call(lambda: client(host), method, route, bypass_dry_run, body_fields)
+
+
+def call_project_api(
+    project: ProjectInfo,
+    method: HTTPMethod,
+    route: str,
+    bypass_dry_run=False,
+    **body_fields: Any,
+) -> str | None:
+    return call_api(
+        project.host,
+        method,
+        f"{project.api_route}/{route}",
+        bypass_dry_run,
+        **body_fields,
+    )
+
+
+@cache
+def user_id(host: str, username: str) -> int:
+    """
+    Assignees are set by user ID in the REST API. The special username "me" resolves to the authenticated user.
+    """
+    if username == "me":
+        user = json.loads(call_api(host, "GET", "/user", bypass_dry_run=True) or "{}")
+        if "id" not in user:
+            raise KeyError(f"Could not get the authenticated user of {host}")
+        return user["id"]
+
+    users = json.loads(
+        call_api(host, "GET", f"/users?username={quote(username)}", bypass_dry_run=True)
+        or "[]"
+    )
+    if not users:
+        raise KeyError(f"No user named {username!r} exists on {host}")
+    return users[0]["id"]
+
+
+@cache
+def milestone_id(project: ProjectInfo, title: str) -> int:
+    milestones = json.loads(
+        call_project_api(
+            project,
+            "GET",
+            f"milestones?title={quote(title)}&include_ancestors=true",
+            bypass_dry_run=True,
+        )
+        or "[]"
+    )
+    if not milestones:
+        raise KeyError(
+            f"No milestone named {title!r} exists in {project.path} or its groups"
+        )
+    return milestones[0]["id"]
+
+
+def create_issue(
+    project: ProjectInfo,
+    title: str,
+    description: str,
+    labels: set[str],
+    assignees: set[str],
+    milestone: str,
+) -> tuple[str, int] | None:
+    """
+    Returns the URL and IID (the project-scoped number) of the created issue
+    """
+    body: dict[str, Any] = {"title": title, "description": description}
+    if labels:
+        body["labels"] = ",".join(sorted(labels))
+    if assignees:
+        body["assignee_ids"] = [user_id(project.host, a) for a in sorted(assignees)]
+    if milestone:
+        body["milestone_id"] = milestone_id(project, milestone)
+
+    response = call_project_api(project, "POST", "issues", **body)
+    if not response:
+        return None
+
+    created = json.loads(response)
+    return created["web_url"], created["iid"]
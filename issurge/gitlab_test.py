@@ -0,0 +1,64 @@
+import pytest
+
+from issurge.gitlab import ProjectInfo, client, milestone_id, token, user_id
+from issurge.parser import Issue
+from issurge.session import Session
+
+
+def test_project_api_route_is_url_encoded():
+    assert ProjectInfo("gitlab.com", "a/b/c").api_route == "/projects/a%2Fb%2Fc"
+
+
+@pytest.fixture
+def gitlab_over_http(stub_api, monkeypatch):
+    monkeypatch.setenv("ISSURGE_HTTP", "1")
+    monkeypatch.setenv("ISSURGE_GITLAB_API_URL", f"{stub_api.url}/api/v4")
+    monkeypatch.setenv("GITLAB_TOKEN", "sekrit")
+    for cached in (client, token, user_id, milestone_id):
+        cached.cache_clear()
+    yield stub_api
+    client.cache_clear()
+
+
+def test_submit_over_http(gitlab_over_http):
+    stub_api = gitlab_over_http
+    project = "/api/v4/projects/net7%2Fwebsite"
+    stub_api.routes |= {
+        ("GET", "/api/v4/user"): (200, {"id": 1, "username": "gwennlbh"}),
+        ("GET", "/api/v4/users"): (200, [{"id": 2, "username": "someone"}]),
+        ("GET", f"{project}/milestones"): (200, [{"id": 30, "title": "v2"}]),
+        ("POST", f"{project}/issues"): (
+            201,
+            {"iid": 12, "web_url": "https://git.inpt.fr/net7/website/-/issues/12"},
+        ),
+    }
+
+    issue = Issue(
+        title="Do the thing",
+        description="Please",
+        labels={"bug", "ui"},
+        assignees={"me", "someone"},
+        milestone="v2",
+    )
+
+    assert issue._gitlab_submit([], Session.detect("git.inpt.fr/net7/website")) == (
+        "https://git.inpt.fr/net7/website/-/issues/12",
+        12,
+    )
+
+    *lookups, creation = stub_api.requests
+    assert {r.path for r in lookups} == {
+        "/api/v4/user",
+        "/api/v4/users?username=someone",
+        f"{project}/milestones?title=v2&include_ancestors=true",
+    }
+    assert creation.path == f"{project}/issues"
+    assert creation.body == {
+        "title": "Do the thing",
+        "description": "Please",
+        "labels": "bug,ui",
+        "assignee_ids": [1, 2],
+        "milestone_id": 30,
+    }
+    assert all(r.headers["private-token"] == "sekrit" for r in stub_api.requests)
+    assert len({r.client_port for r in stub_api.requests}) == 1
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, TextIO
+
+from issurge.parser import Issue
+from issurge.session import Session
+from issurge.utils import DEBUG, debug, log
+
+
+class Entry(NamedTuple):
+    hash: str
+    number: int
+    url: str | None
+    reference: int | None
+    title: str
+
+
+def path(session: Session, input_path: str) -> Path:
+    """
+    Where the journal of submitting input_path to session's repository is kept
+    """
+    from issurge import cache
+
+    source = "-" if input_path == "-" else str(Path(input_path).resolve())
+    key = hashlib.sha256(f"{session.url} {source}".encode("utf-8")).hexdigest()
+    return cache.directory() / "journals" / f"{key[:16]}.jsonl"
+
+
+def fingerprint(issue: Issue) -> str:
+    """
+    Identifies an issue across runs, as it is written in the file: computed before its references get resolved,
+    and carried along with the issue once they are, see Journal.skip_created.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            [
+                issue.title,
+                issue.description,
+                issue.reference,
+                str(issue.parent) if issue.parent else None,
+                sorted(str(ref) for ref in issue.blocked_by),
+                sorted(issue.labels),
+                sorted(issue.assignees),
+                issue.milestone,
+                sorted(issue.fields.items()),
+            ],
+            ensure_ascii=False,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def load(journal: Path) -> list[Entry]:
+    """
+    Issues created by previous runs. A line cut short by a crash is ignored, its issue was not confirmed to be created.
+    """
+    entries = []
+    try:
+        with open(journal, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entries.append(Entry(**json.loads(line)))
+                except (json.JSONDecodeError, TypeError) as e:
+                    debug(f"Ignoring journal line {line!r}: {e}")
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+class Journal:
+    """
+    Append-only record of the issues created by a run, written to disk as soon as each issue is created
+    so that the run can be resumed with --resume after a crash or a failure
+    """
+
+    def __init__(self, path: Path | None, entries: Iterable[Entry] = ()):
+        # None to not write the journal anywhere
+        self.path = path
+        self.entries = list(entries)
+        self.file: TextIO | None = None
+        # issues skipped by skip_created
+        self.skipped = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def references_resolutions(self) -> dict[int, int]:
+        return {
+            entry.reference: entry.number
+            for entry in self.entries
+            if entry.reference is not None
+        }
+
+    def skip_created(self, issues: Iterable[Issue]) -> Iterator[Issue]:
+        """
+        Issues that were not created by previous runs, with their fingerprint.
+        Identical issues are told apart by how many of them were created.
+        """
+        remaining = Counter(entry.hash for entry in self.entries)
+        numbers = {entry.hash: entry.number for entry in self.entries}
+        for issue in issues:
+            key = fingerprint(issue)
+            issue = issue._replace(fingerprint=key)
+            if remaining[key]:
+                remaining[key] -= 1
+                log(
+                    DEBUG,
+                    lambda: f"Skipping {issue.display()}, created as #{numbers[key]}",
+                )
+                self.skipped += 1
+                continue
+            yield issue
+
+    def append(self, issue: Issue, url: str | None, number: int):
+        entry = Entry(
+            issue.fingerprint or fingerprint(issue),
+            number,
+            url,
+            issue.reference,
+            issue.title,
+        )
+        self.entries.append(entry)
+        if self.path is None:
+            return
+        if self.file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(json.dumps(entry._asdict(), ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def delete(self):
+        self.close()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
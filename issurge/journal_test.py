@@ -0,0 +1,64 @@
+from issurge.journal import Journal, fingerprint, load, path
+from issurge.parser import parse
+from issurge.session import Session
+
+GITHUB = Session.detect("gwennlbh/gh-api-playground")
+
+
+def test_fingerprint_is_kept_when_references_get_resolved(tmp_path):
+    text = "Uses #.1 ~bug:\n\tSee #.1\n#.1 Defined"
+    referencing, defining = Journal(tmp_path / "journal.jsonl").skip_created(
+        parse(text)
+    )
+    resolved = referencing.resolve_references({1: 12}, strict=True)
+
+    assert resolved.description == "See #12\n"
+    assert resolved.fingerprint == fingerprint(next(iter(parse(text))))
+    assert defining.fingerprint != referencing.fingerprint
+
+
+def test_children_of_different_parents_are_told_apart(tmp_path):
+    text = "#.1 Epic one\n#.2 Epic two\nWrite tests ^.1\nWrite tests ^.2"
+    with Journal(tmp_path / "journal.jsonl") as journal:
+        one, two, _, second_child = journal.skip_created(parse(text))
+        journal.append(one, None, 4)
+        journal.append(two, None, 5)
+        journal.append(second_child.resolve_references({1: 4, 2: 5}), None, 7)
+
+    resumed = Journal(tmp_path / "journal.jsonl", load(tmp_path / "journal.jsonl"))
+
+    assert [
+        (issue.title, str(issue.parent)) for issue in resumed.skip_created(parse(text))
+    ] == [("Write tests", ".1")]
+
+
+def test_path_depends_on_repository_and_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert path(GITHUB, "issues") == path(GITHUB, str(tmp_path / "issues"))
+    assert path(GITHUB, "issues") != path(GITHUB, "other")
+    assert path(GITHUB, "issues") != path(Session.detect("gitlab.com/a/b"), "issues")
+
+
+def test_resuming_skips_created_issues(tmp_path):
+    first, _, duplicate, _ = parse("#.1 First\nSame\nSame\nLast >.1")
+    with Journal(tmp_path / "journal.jsonl") as journal:
+        journal.append(first, "https://github.com/o/r/issues/4", 4)
+        journal.append(duplicate, "https://github.com/o/r/issues/5", 5)
+
+    resumed = Journal(tmp_path / "journal.jsonl", load(tmp_path / "journal.jsonl"))
+
+    assert resumed.references_resolutions == {1: 4}
+    assert [
+        issue.title
+        for issue in resumed.skip_created(parse("#.1 First\nSame\nSame\nLast >.1"))
+    ] == ["Same", "Last"]
+    assert resumed.skipped == 2
+
+
+def test_load_ignores_a_line_cut_short(tmp_path):
+    (tmp_path / "journal.jsonl").write_text(
+        '{"hash": "a", "number": 1, "url": null, "reference": null, "title": "A"}\n{"hash": "b", "num'
+    )
+
+    assert [entry.number for entry in load(tmp_path / "journal.jsonl")] == [1]
+    assert load(tmp_path / "missing.jsonl") == []
@@ -6,14 +6,32 @@ Usage:
     issurge --help
     issurge --help-syntax
 
+Use - as the <file> to read issues from the standard input. Issues are submitted as soon as their top-level block ends.
+
 issurge new <words>... acts like echo <words>... | issurge /dev/stdin, but also asks for a description if the issue ends with `:'.
 
 <submitter-args> contains arguments that will be passed as-is to the end of all `glab' commands
 
 Options:
+    -h --help   Show this help
     --dry-run   Don't actually post the issues
     --debug     Print debug information
     --open      Open every created issue in the browser
+    --http      Call the GitHub/GitLab API directly over HTTP instead of spawning gh/glab for every request
+    --batch     Create many GitHub issues per request with the GraphQL API (implies --http)
+    --jobs=<n>  Submit up to <n> issues at the same time [default: 1]
+    --repo=<repo>    Submit to this [HOST/]OWNER/REPO instead of the origin remote of the current git repository
+    --forge=<forge>  Either github or gitlab. Guessed from the host by default
+    --refresh-metadata  Fetch repository metadata (issue types, issue fields...) again instead of using the cached one
+    --quiet     Only print errors and a summary at the end
+    --profile   Print how much time went to parsing, fetching metadata, creating issues and follow-up API calls
+    --profile-dump=<file>  Also write cProfile statistics of the main thread to <file>, for python -m pstats (implies --profile)
+    --report=<file>  Write a JSON line for each issue to <file>, with its number, URL, and how long it took to submit
+    --resume    Skip the issues that an interrupted or failed run on the same file already created
+    --skip-existing  Skip issues whose title is already used by an open issue of the repository
+    --skip-closed=<days>  Also skip issues whose title is used by an issue closed in the last <days> days (implies --skip-existing)
+    --preflight  Check that every label, milestone and assignee exists before submitting anything
+    --create-missing  Create missing labels and milestones before submitting anything (implies --preflight)
 
 Syntax:
 
@@ -24,57 +42,254 @@ Use --help-syntax for the full help.
 issurge v{version}
 """
 
-import importlib.resources
 import os
-import webbrowser
-from importlib.metadata import version
-from pathlib import Path
+import sys
+from contextlib import nullcontext
+from functools import cache
+from typing import ContextManager, Iterable, TextIO
 
 from docopt import docopt
 from rich import print
-from rich.markdown import Markdown
-from rich.text import Text
-
-from issurge import interactive
-from issurge.parser import parse
-from issurge.utils import debug, dry_running, lines_between, render_to_ansi
 
-assets = importlib.resources.files(__package__)
-syntax_help = (assets / "SYNTAX.md").read_text(encoding="utf-8")
-quick_syntax_help = "\n".join(
-    lines_between("<!-- cli-help -->", "<!-- /cli-help -->", syntax_help)
+from issurge import github, journal
+from issurge.parser import Issue, parse_lines
+from issurge.profiling import profiled, timed_iterator
+from issurge.report import open_report, write_entry
+from issurge.session import Session
+from issurge.utils import (
+    NORMAL,
+    debug,
+    deferring_interrupts,
+    dry_running,
+    lines_between,
+    log,
+    render_to_ansi,
 )
 
+# Modules that are only needed for some options are imported when these options are used,
+# so that one-shot runs (e.g. issurge new from an editor) start quickly.
 
-def run(opts=None):
-    opts = opts or docopt(
-        (__doc__ or "").format(
-            version=Text(version("issurge")).stylize("blue"),
-            quick_syntax_help=render_to_ansi(Markdown(quick_syntax_help)),
-        )
+
+@cache
+def syntax_help() -> str:
+    import importlib.resources
+
+    assets = importlib.resources.files(__package__)
+    return (assets / "SYNTAX.md").read_text(encoding="utf-8")
+
+
+def full_usage() -> str:
+    """
+    Rendering the syntax help takes a while, so this is only done when --help is passed
+    """
+    from importlib.metadata import version
+
+    from rich.markdown import Markdown
+    from rich.text import Text
+
+    quick_syntax_help = "\n".join(
+        lines_between("<!-- cli-help -->", "<!-- /cli-help -->", syntax_help())
     )
+    return (__doc__ or "").format(
+        version=Text(version("issurge")).stylize("blue"),
+        quick_syntax_help=render_to_ansi(Markdown(quick_syntax_help)),
+    )
+
+
+def run(opts=None):
+    opts = opts or docopt(__doc__ or "", help=False)
+    if opts["--help"]:
+        sys.stdout.write(full_usage().strip("\n") + "\n")
+        return
 
     os.environ["ISSURGE_DEBUG"] = "1" if opts["--debug"] else ""
     os.environ["ISSURGE_DRY_RUN"] = "1" if opts["--dry-run"] else ""
+    os.environ["ISSURGE_QUIET"] = "1" if opts["--quiet"] else ""
+    os.environ["ISSURGE_HTTP"] = "1" if opts["--http"] or opts["--batch"] else ""
+    os.environ["ISSURGE_REFRESH_METADATA"] = "1" if opts["--refresh-metadata"] else ""
+    os.environ["ISSURGE_REPORT"] = "1" if opts["--report"] else ""
+    os.environ["ISSURGE_PROFILE"] = (
+        "1" if opts["--profile"] or opts["--profile-dump"] else ""
+    )
 
     debug(f"Running with options: {opts}")
     if opts["--help-syntax"]:
-        print(Markdown(syntax_help))
-    elif opts["new"]:
-        issue = interactive.create_issue(" ".join(opts["<words>"]))
-        debug(f"Submitting {issue.display()}")
-        number, url = issue.submit(opts["<submitter-args>"])
-        print(f"Created issue #{number}: {url}")
-    else:
-        print("Submitting issues...")
-        references_resolutions: dict[int, int] = {}
-        for issue in parse(Path(opts["<file>"]).read_text(encoding="utf-8")):
-            issue = issue.resolve_references(
-                references_resolutions, strict=not dry_running()
-            )
-            url, number = issue.submit(opts["<submitter-args>"])
+        from rich.markdown import Markdown
+
+        print(Markdown(syntax_help()))
+        return
+
+    with profiled(opts["--profile-dump"]):
+        session = Session.detect(opts["--repo"], opts["--forge"])
+        debug(f"Submitting to {session!r}")
+        if session.forge == "github":
+            github.use_session(session)
+
+        if opts["new"]:
+            from issurge import interactive
+
+            issue = interactive.create_issue(" ".join(opts["<words>"]))
+            debug(f"Submitting {issue.display()}")
+            number, url = issue.submit(opts["<submitter-args>"], session)
             print(f"Created issue #{number}: {url}")
-            if issue.reference and number:
-                references_resolutions[issue.reference] = number
-            if opts["--open"] and url:
-                webbrowser.open(url)
+        else:
+            # runs on the standard input can't be told apart, they would all share the same journal:
+            # only keep one when asked to resume
+            journal_path = (
+                journal.path(session, opts["<file>"])
+                if opts["<file>"] != "-" or opts["--resume"]
+                else None
+            )
+            previous = (
+                journal.load(journal_path) if journal_path and opts["--resume"] else []
+            )
+            if (
+                journal_path
+                and not opts["--resume"]
+                and not dry_running()
+                and journal_path.exists()
+            ):
+                print(
+                    f"[red]A previous run on {opts['<file>']} did not finish.[/red] "
+                    f"Pass --resume to skip the issues it created, or delete {journal_path} to submit everything again"
+                )
+                sys.exit(1)
+
+            log(NORMAL, "Submitting issues...")
+            with (
+                open_input(opts["<file>"]) as lines,
+                open_report(opts["--report"]) as report,
+                journal.Journal(journal_path, previous) as submissions,
+            ):
+                references_resolutions = submissions.references_resolutions
+                # issues are submitted while the rest of the file is still being read,
+                # except with --jobs, which needs to know about every issue to order them
+                issues = submissions.skip_created(
+                    timed_iterator("parse", parse_lines(lines))
+                )
+
+                existing = None
+                if opts["--skip-existing"] or opts["--skip-closed"]:
+                    from issurge.existing import ExistingIssues
+
+                    existing = ExistingIssues.fetch(
+                        session,
+                        (
+                            float(opts["--skip-closed"])
+                            if opts["--skip-closed"]
+                            else None
+                        ),
+                    )
+                    issues = existing.skip_existing(issues, references_resolutions)
+
+                if opts["--preflight"] or opts["--create-missing"]:
+                    from issurge import preflight
+
+                    # every issue needs to be known before the first one is submitted
+                    issues = list(issues)
+                    if not preflight.check(
+                        issues, session, create_missing=opts["--create-missing"]
+                    ):
+                        sys.exit(1)
+
+                batching = opts["--batch"]
+                if batching and session.forge != "github":
+                    print("[yellow]--batch is only supported on GitHub, ignoring it[/]")
+                    batching = False
+
+                if batching:
+                    from issurge import batch
+
+                    submitted = batch.submit_in_batches(
+                        issues, references_resolutions, opts["<submitter-args>"]
+                    )
+                elif int(opts["--jobs"]) > 1:
+                    from issurge import scheduler
+
+                    submitted = scheduler.submit_concurrently(
+                        issues,
+                        references_resolutions,
+                        opts["<submitter-args>"],
+                        jobs=int(opts["--jobs"]),
+                        session=session,
+                    )
+                else:
+                    submitted = submit_in_order(
+                        issues,
+                        references_resolutions,
+                        opts["<submitter-args>"],
+                        session,
+                    )
+
+                created, failed = 0, 0
+                try:
+                    for issue, url, number in submitted:
+                        if number:
+                            created += 1
+                            if not dry_running():
+                                submissions.append(issue, url, number)
+                        else:
+                            failed += 1
+                        log(NORMAL, lambda: f"Created issue #{number}: {url}")
+                        if report:
+                            write_entry(report, issue, url, number)
+                        if opts["--open"] and url:
+                            import webbrowser
+
+                            webbrowser.open(url)
+                except KeyboardInterrupt:
+                    submissions.close()
+                    hint = (
+                        " Run again with --resume to submit the rest"
+                        if journal_path
+                        else ""
+                    )
+                    print(
+                        f"[red]Interrupted[/red] after creating {created} issues.{hint}"
+                    )
+                    sys.exit(130)
+
+                skipped = ""
+                if submissions.skipped:
+                    skipped += f", skipped {submissions.skipped} already created"
+                if existing and existing.skipped:
+                    skipped += f", skipped {existing.skipped} that already exist"
+                if dry_running():
+                    print(f"Would have submitted {created + failed} issues{skipped}")
+                elif failed:
+                    hint = (
+                        " Run again with --resume to retry them" if journal_path else ""
+                    )
+                    print(
+                        f"Created {created} issues{skipped}, [red]{failed} could not be created[/red].{hint}"
+                    )
+                else:
+                    print(f"Created {created} issues{skipped}")
+                    submissions.delete()
+
+
+def submit_in_order(
+    issues: Iterable[Issue],
+    references_resolutions: dict[int, int],
+    submitter_args: list[str],
+    session: Session | None = None,
+) -> Iterable[tuple[Issue, str | None, int | None]]:
+    for issue in issues:
+        issue = issue.resolve_references(
+            references_resolutions, strict=not dry_running()
+        )
+        # an issue can't be stopped halfway through being created:
+        # hand it out first, so that it is known to be created, then stop
+        with deferring_interrupts() as interrupted:
+            url, number = issue.submit(submitter_args, session)
+        if issue.reference and number:
+            references_resolutions[issue.reference] = number
+        yield issue, url, number
+        if interrupted.is_set():
+            raise KeyboardInterrupt
+
+
+def open_input(path: str) -> ContextManager[TextIO]:
+    if path == "-":
+        return nullcontext(sys.stdin)
+    return open(path, encoding="utf-8")
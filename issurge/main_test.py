@@ -1,4 +1,9 @@
+import io
+import json
 import os
+import pstats
+import signal
+import sys
 import webbrowser
 from pathlib import Path
 from unittest.mock import Mock, patch
@@ -7,8 +12,9 @@ from urllib.parse import urlparse
 import pytest
 
 import issurge.github
-from issurge.main import run
-from issurge.parser import Issue, subprocess
+import issurge.session
+from issurge.main import run, submit_in_order
+from issurge.parser import Issue, parse, subprocess
 from issurge.utils import debugging, dry_running
 
 
@@ -33,7 +39,7 @@ Another ~issue to submit @me"""
         )
     )
     webbrowser.open = Mock()
-    Issue._get_remote_url = Mock(
+    issurge.session.origin_remote_url = Mock(
         return_value=urlparse("https://github.com/gwennlbh/gh-api-playground")
     )
     with (
@@ -53,6 +59,11 @@ Another ~issue to submit @me"""
     Path("test_some_issues").unlink()
     del os.environ["ISSURGE_DEBUG"]
     del os.environ["ISSURGE_DRY_RUN"]
+    del os.environ["ISSURGE_HTTP"]
+    del os.environ["ISSURGE_REFRESH_METADATA"]
+    del os.environ["ISSURGE_QUIET"]
+    del os.environ["ISSURGE_PROFILE"]
+    del os.environ["ISSURGE_REPORT"]
 
 
 @pytest.fixture
@@ -65,7 +76,23 @@ def default_opts():
         "--dry-run": False,
         "--debug": False,
         "--open": False,
-        "--help-syntax": False
+        "--help": False,
+        "--help-syntax": False,
+        "--http": False,
+        "--batch": False,
+        "--jobs": "1",
+        "--repo": None,
+        "--forge": None,
+        "--refresh-metadata": False,
+        "--quiet": False,
+        "--profile": False,
+        "--profile-dump": None,
+        "--report": None,
+        "--resume": False,
+        "--skip-existing": False,
+        "--skip-closed": None,
+        "--preflight": False,
+        "--create-missing": False,
     }
 
 
@@ -102,6 +129,8 @@ def test_issues_are_submitted_when_dry_run_is_not_passed_with_github_provider(
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "An issue to submit",
             "-b",
@@ -117,6 +146,8 @@ def test_issues_are_submitted_when_dry_run_is_not_passed_with_github_provider(
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "Another issue to submit",
             "-b",
@@ -129,6 +160,165 @@ def test_issues_are_submitted_when_dry_run_is_not_passed_with_github_provider(
     ]
 
 
+def test_issues_are_read_from_stdin(setup, default_opts, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("First\nSecond ~bug\n"))
+    run(opts={**default_opts, "<file>": "-"})
+    assert [call.args[0][3:7] for call in subprocess.run.mock_calls] == [
+        ["-R", "gwennlbh/gh-api-playground", "-t", "First"],
+        ["-R", "gwennlbh/gh-api-playground", "-t", "Second"],
+    ]
+
+
+def test_failed_runs_on_stdin_do_not_block_the_next_ones(
+    setup, default_opts, monkeypatch, capsys
+):
+    subprocess.run.return_value = MockedSubprocessOutput("", "Failed")
+    monkeypatch.setattr("sys.stdin", io.StringIO("First\n"))
+    run(opts={**default_opts, "<file>": "-", "--quiet": True})
+    assert "1 could not be created" in capsys.readouterr().out
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("Unrelated\n"))
+    run(opts={**default_opts, "<file>": "-", "--quiet": True})
+    assert [call.args[0][6] for call in subprocess.run.mock_calls] == [
+        "First",
+        "Unrelated",
+    ]
+
+
+def test_quiet_only_prints_a_summary(setup, default_opts, capsys):
+    run(opts={**default_opts, "<file>": "test_some_issues", "--quiet": True})
+    assert capsys.readouterr().out == "Created 2 issues\n"
+
+
+def test_failed_runs_can_be_resumed(setup, default_opts, capsys):
+    created = MockedSubprocessOutput(
+        "https://github.com/gwennlbh/gh-api-playground/issues/5\n", ""
+    )
+    subprocess.run.side_effect = [created, MockedSubprocessOutput("", "Failed")]
+    opts = {**default_opts, "<file>": "test_some_issues", "--quiet": True}
+    run(opts=opts)
+    assert "1 could not be created" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exit:
+        run(opts=opts)
+    assert exit.value.code == 1
+    assert "--resume" in capsys.readouterr().out
+
+    subprocess.run.reset_mock(side_effect=True)
+    run(opts={**opts, "--resume": True})
+    assert [call.args[0][6] for call in subprocess.run.mock_calls] == [
+        "Another issue to submit"
+    ]
+    assert capsys.readouterr().out == "Created 1 issues, skipped 1 already created\n"
+
+    # the journal is gone once every issue is created
+    run(opts=opts)
+    assert capsys.readouterr().out == "Created 2 issues\n"
+
+
+def test_interrupting_finishes_the_issue_being_submitted(monkeypatch):
+    submitted = []
+
+    def submit(self, submitter_args, session=None):
+        submitted.append(self.title)
+        # Ctrl-C while the issue is being created
+        os.kill(os.getpid(), signal.SIGINT)
+        return "https://github.com/gwennlbh/gh-api-playground/issues/2", 2
+
+    monkeypatch.setattr(Issue, "submit", submit)
+
+    handed_out = []
+    with pytest.raises(KeyboardInterrupt):
+        for issue, _, number in submit_in_order(parse("First\nSecond"), {}, []):
+            handed_out.append((issue.title, number))
+
+    assert handed_out == [("First", 2)]
+    assert submitted == ["First"]
+    assert signal.getsignal(signal.SIGINT) is signal.default_int_handler
+
+
+def test_skip_existing_only_submits_new_titles(setup, default_opts, capsys):
+    created = subprocess.run.return_value
+    listed = MockedSubprocessOutput(
+        json.dumps(
+            [
+                {
+                    "number": 3,
+                    "title": "an issue to submit",
+                    "html_url": "https://github.com/gwennlbh/gh-api-playground/issues/3",
+                }
+            ]
+        ),
+        "",
+    )
+    subprocess.run.side_effect = lambda command, **_: (
+        listed if command[:2] == ["gh", "api"] else created
+    )
+
+    run(
+        opts={
+            **default_opts,
+            "<file>": "test_some_issues",
+            "--quiet": True,
+            "--skip-existing": True,
+        }
+    )
+
+    assert [call.args[0][:7] for call in subprocess.run.mock_calls] == [
+        [
+            "gh",
+            "api",
+            "/repos/gwennlbh/gh-api-playground/issues?per_page=100&state=open&page=1",
+        ],
+        [
+            "gh",
+            "issue",
+            "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
+            "-t",
+            "Another issue to submit",
+        ],
+    ]
+    assert capsys.readouterr().out == "Created 1 issues, skipped 1 that already exist\n"
+
+
+def test_profile_prints_time_spent_in_each_phase(setup, default_opts, capsys, tmp_path):
+    dump = tmp_path / "issurge.pstats"
+    run(
+        opts={
+            **default_opts,
+            "<file>": "test_some_issues",
+            "--quiet": True,
+            "--profile-dump": str(dump),
+        }
+    )
+
+    phases = {
+        line[:45].strip(): line[45:].split()
+        for line in capsys.readouterr().out.splitlines()
+    }
+    assert phases["parse"][0] == "3"
+    assert phases["create issue"][0] == "2"
+    assert phases["gh issue new"][0] == "2"
+    assert phases["total"][0] == "1"
+    assert pstats.Stats(str(dump)).total_calls > 0
+
+
+def test_report_has_a_line_for_each_issue(setup, default_opts, tmp_path):
+    report = tmp_path / "report.jsonl"
+    run(opts={**default_opts, "<file>": "test_some_issues", "--report": str(report)})
+
+    entries = [json.loads(line) for line in report.read_text().splitlines()]
+    assert [
+        (entry["line"], entry["title"], entry["number"], entry["subprocesses"])
+        for entry in entries
+    ] == [(2, "An issue to submit", 5, 1), (3, "Another issue to submit", 5, 1)]
+    assert all(entry["create_seconds"] <= entry["seconds"] for entry in entries)
+    assert entries[0]["url"] == "https://github.com/gwennlbh/gh-api-playground/issues/5"
+    assert entries[0]["follow_ups"] == []
+
+
 def test_issues_are_submitted_when_dry_run_is_not_passed_with_gitlab_provider(
     setup, default_opts
 ):
@@ -138,7 +328,7 @@ def test_issues_are_submitted_when_dry_run_is_not_passed_with_gitlab_provider(
             "Some unrelated stuff haha",
         )
     )
-    Issue._get_remote_url = Mock(
+    issurge.session.origin_remote_url = Mock(
         return_value=urlparse("https://gitlab.com/gwennlbh/gh-api-playground")
     )
     run(opts={**default_opts, "<file>": "test_some_issues"})
@@ -208,6 +398,8 @@ def test_issues_are_submitted_when_dry_run_is_not_passed_in_interactive_mode_git
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "testing this issue",
             "-b",
@@ -229,7 +421,7 @@ def test_issues_are_submitted_when_dry_run_is_not_passed_in_interactive_mode_git
             "Some unrelated stuff haha",
         )
     )
-    Issue._get_remote_url = Mock(
+    issurge.session.origin_remote_url = Mock(
         return_value=urlparse("https://gitlab.com/gwennlbh/gh-api-playground")
     )
     run(
@@ -267,6 +459,8 @@ def test_issues_are_opened_when_open_is_passed_github_provider(setup, default_op
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "An issue to submit",
             "-b",
@@ -282,6 +476,8 @@ def test_issues_are_opened_when_open_is_passed_github_provider(setup, default_op
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "Another issue to submit",
             "-b",
@@ -301,7 +497,7 @@ def test_issues_are_opened_when_open_is_passed_gitlab_provider(setup, default_op
             "Some unrelated stuff haha",
         )
     )
-    Issue._get_remote_url = Mock(
+    issurge.session.origin_remote_url = Mock(
         return_value=urlparse("https://gitlab.com/gwennlbh/gh-api-playground")
     )
     run(opts={**default_opts, "<file>": "test_some_issues", "--open": True})
@@ -387,6 +583,8 @@ def test_set_issue_type(setup, default_opts):
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "testing this feature wow",
             "-b",
@@ -432,6 +630,8 @@ def test_set_issue_parent_direct_style(setup, default_opts):
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "testing this issue",
             "-b",
@@ -480,6 +680,8 @@ def test_set_issue_blocked_by(setup, default_opts):
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "testing this issue",
             "-b",
@@ -581,6 +783,8 @@ def test_set_issue_fields(setup, default_opts):
             "gh",
             "issue",
             "new",
+            "-R",
+            "gwennlbh/gh-api-playground",
             "-t",
             "Remove dead links",
             "-b",
@@ -602,3 +806,48 @@ def test_set_issue_fields(setup, default_opts):
             "issue_field_values[][value]=High",
         ],
     ]
+
+
+@pytest.mark.parametrize("flag", ["-h", "--help"])
+def test_help_is_shown_with_both_flags(flag):
+    # subprocess.run is mocked by other tests
+    process = subprocess.Popen(
+        [sys.executable, "-c", "from issurge.main import run; run()", flag],
+        stdout=subprocess.PIPE,
+        cwd=Path(__file__).parent.parent,
+        text=True,
+    )
+    output = process.communicate()[0]
+
+    assert process.returncode == 0
+    assert "Options:" in output
+    assert "Use --help-syntax for the full help." in output
+
+
+def test_startup_does_not_import_what_it_does_not_need():
+    # subprocess.run is mocked by other tests
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import sys, issurge.main; print(*sys.modules)"],
+        stdout=subprocess.PIPE,
+        cwd=Path(__file__).parent.parent,
+        text=True,
+    )
+    imported = set(process.communicate()[0].split())
+
+    assert "issurge.main" in imported
+    assert not imported & {
+        "asyncio",
+        "http.client",
+        "importlib.metadata",
+        "importlib.resources",
+        "issurge.batch",
+        "issurge.cache",
+        "issurge.existing",
+        "issurge.preflight",
+        "issurge.scheduler",
+        "issurge.transport",
+        "rich.markdown",
+        "sqlite3",
+        "ssl",
+        "webbrowser",
+    }
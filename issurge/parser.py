@@ -1,56 +1,122 @@
+import json
 import re
 import subprocess
-from sys import exit
-from typing import Any, Iterable, Literal, NamedTuple
-from urllib.parse import urlparse
+from functools import lru_cache
+from sys import exit, intern
+from typing import Any, Callable, Iterable, Iterator, Literal, NamedTuple
 
 from rich import print
 
-from issurge import github
-from issurge.utils import NEWLINE, TAB, debug, run
+from issurge import github, gitlab, utils
+from issurge.profiling import measuring, phase
+from issurge.session import Session
+from issurge.utils import (
+    DEBUG,
+    NEWLINE,
+    NORMAL,
+    TAB,
+    HTTPMethod,
+    debug,
+    dry_running,
+    run,
+    using_http,
+)
 
 
 class Node:
-    def __init__(self, indented_line):
-        self.children = []
+    def __init__(
+        self, indented_line, source: list[str] | None = None, line_number: int = 0
+    ):
+        self.children: list[Node] = []
         self.level = len(indented_line) - len(indented_line.lstrip())
         self.text = indented_line.strip()
+        # lines of the top-level block this line is part of, blank ones included, and the index of this line in them
+        self.source = source if source is not None else [indented_line]
+        self.index = len(self.source) - 1 if source is not None else 0
+        # in the whole file, starting at 1
+        self.line_number = line_number
 
-    def add_children(self, nodes):
-        childlevel = nodes[0].level
-        while nodes:
-            node = nodes.pop(0)
-            if node.level == childlevel:  # add node as a child
-                self.children.append(node)
-            elif (
-                node.level > childlevel
-            ):  # add nodes as grandchildren of the last child
-                nodes.insert(0, node)
-                self.children[-1].add_children(nodes)
-            elif node.level <= self.level:  # this node is a sibling, no more children
-                nodes.insert(0, node)
-                return
+    @staticmethod
+    def tree(lines: Iterable[str]) -> "Node":
+        """
+        Builds the tree of indented lines in a single pass, keeping their order and duplicate lines.
+        A line is a child of the closest line above it that is less indented.
+        """
+        root = Node("root")
+        root.children = list(Node.blocks(lines))
+        return root
+
+    @staticmethod
+    def blocks(lines: Iterable[str]) -> Iterator["Node"]:
+        """
+        Yields the top-level nodes of the tree of indented lines, each one as soon as it is complete:
+        when the next top-level line comes in, or when there are no more lines.
+        """
+        root = Node("root")
+        root.level = -1
+        # the last line seen at each level of nesting
+        ancestors = [root]
+        source: list[str] = []
+        for line_number, line in enumerate(lines, start=1):
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                if root.children:
+                    source.append(line)
+                continue
+            level = len(line) - len(line.lstrip())
+            while ancestors[-1].level >= level:
+                ancestors.pop()
+            if len(ancestors) == 1 and root.children:
+                yield root.children.pop()
+                source = []
+            source.append(line)
+            node = Node(line, source, line_number)
+            ancestors[-1].children.append(node)
+            ancestors.append(node)
+        if root.children:
+            yield root.children.pop()
+
+    @property
+    def last_index(self) -> int:
+        """
+        Index in the source of the last line of this node and its descendants
+        """
+        node = self
+        while node.children:
+            node = node.children[-1]
+        return node.index
+
+    @staticmethod
+    def source_text(nodes: list["Node"]) -> str:
+        """
+        The lines of the given sibling nodes and their descendants as they are in the source,
+        blank lines between them included, without their common indentation.
+        """
+        indentation = min(node.level for node in nodes)
+        lines = nodes[0].source[nodes[0].index : nodes[-1].last_index + 1]
+        return "".join(
+            (line[indentation:] if line[:indentation].isspace() else line.lstrip())
+            + NEWLINE
+            for line in lines
+        )
 
     def as_dict(self) -> dict[str, Any]:
-        if len(self.children) > 1:
-            child_dicts = {}
-            for node in self.children:
-                child_dicts |= node.as_dict()
-            return {self.text: child_dicts}
-        elif len(self.children) == 1:
-            return {self.text: self.children[0].as_dict()}
-        else:
+        if not self.children:
             return {self.text: None}
+        return {
+            self.text: {
+                k: v for node in self.children for k, v in node.as_dict().items()
+            }
+        }
 
     @staticmethod
     def to_dict(to_parse: str) -> dict[str, Any]:
+        """
+        Nested dicts of lines. Duplicate sibling lines are merged, use Node.tree to keep them.
+        """
         if not to_parse.strip():
             return {}
-        root = Node("root")
-        root.add_children(
-            [Node(line) for line in to_parse.splitlines() if line.strip()]
-        )
-        return root.as_dict()["root"]
+        return Node.tree(to_parse.splitlines()).as_dict()["root"]
 
 
 # type IssueReference = tuple[Literal["reference", "direct"], int]
@@ -79,18 +145,71 @@ class IssueReference(NamedTuple):
         return None
 
 
+REFERENCE = re.compile(r"#\.(?P<num>\d+)\b")
+
+
+@lru_cache(maxsize=4096)
+def reference_spans(description: str) -> tuple[tuple[int, int, int], ...]:
+    """
+    (start, end, number) of each #.N in the description.
+    Remembered for recent descriptions, as the same issue's references are needed many times before it is submitted.
+    """
+    return tuple(
+        (match.start(), match.end(), int(match.group("num")))
+        for match in REFERENCE.finditer(description)
+    )
+
+
+def shared_union(inherited: frozenset, added: frozenset) -> frozenset:
+    """
+    Reuses one of the sets instead of making a new one when the other one brings nothing new
+    """
+    if added <= inherited:
+        return inherited
+    if not inherited:
+        return frozenset(added)
+    return inherited | added
+
+
+class FollowUp(NamedTuple):
+    """
+    An API call to make after creating an issue on GitHub
+    """
+
+    method: HTTPMethod
+    route: str
+    body: dict[str, Any]
+    # numbers of the issues whose ID is in the body
+    uses_ids_of: set[int] = set()
+
+    @property
+    def phase(self) -> str:
+        """
+        What --profile times this call as, the same for every issue
+        """
+        return f"follow-up {self.method} {ISSUE_NUMBER.sub('N', self.route)}"
+
+
+ISSUE_NUMBER = re.compile(r"\d+")
+
+
+# Collections are frozen, so that issues that inherit them from a parent line can share them instead of copying them
 class Issue(NamedTuple):
     title: str = ""
     description: str = ""
-    labels: set[str] = set()
-    # None means the field was entered with a shorthand
+    labels: frozenset[str] = frozenset()
+    # None means the field was entered with a shorthand. Not modified once the issue is created
     fields: dict[str, str | None] = {}
-    assignees: set[str] = set()
+    assignees: frozenset[str] = frozenset()
     milestone: str = ""
     reference: int | None = None
     # Direct means that the number refers to an actual github issue, where as reference means that it refers to a .N issue reference, in the same way that #.N references work in descriptions.
     parent: IssueReference | None = None
-    blocked_by: set[IssueReference] = set()
+    blocked_by: frozenset[IssueReference] = frozenset()
+    # line of the file the issue's title is on, starting at 1. 0 for issues that don't come from a file
+    line: int = 0
+    # identifies the issue across runs, set before its references get resolved, see journal.fingerprint
+    fingerprint: str = ""
 
     def __rich_repr__(self):
         yield self.title
@@ -103,6 +222,7 @@ class Issue(NamedTuple):
         yield "references", self.references, set()
         yield "parent", self.parent, None
         yield "blocked_by", self.blocked_by, set()
+        yield "line", self.line, 0
 
     def __str__(self) -> str:
         result = ""
@@ -129,13 +249,18 @@ class Issue(NamedTuple):
         return Issue(
             title=new_data.title or self.title,
             description=new_data.description or self.description,
-            labels=self.labels | new_data.labels,
-            fields=self.fields | new_data.fields,
-            assignees=self.assignees | new_data.assignees,
+            labels=shared_union(self.labels, new_data.labels),
+            fields=(
+                self.fields | new_data.fields
+                if new_data.fields and self.fields
+                else new_data.fields or self.fields
+            ),
+            assignees=shared_union(self.assignees, new_data.assignees),
             milestone=new_data.milestone or self.milestone,
             reference=new_data.reference or self.reference,
             parent=new_data.parent or self.parent,
-            blocked_by=new_data.blocked_by | self.blocked_by,
+            blocked_by=shared_union(self.blocked_by, new_data.blocked_by),
+            line=new_data.line or self.line,
         )
 
     def display(self) -> str:
@@ -169,68 +294,70 @@ class Issue(NamedTuple):
 
     @property
     def references(self) -> set[int]:
-        # find all #\.(\d+)\b in description
-        references = set()
-        for match in re.finditer(
-            r"#\.(?P<num>\d+)(\b|$)", self.description, flags=re.MULTILINE
-        ):
-            references.add(int(match.group("num")))
+        return {number for _, _, number in reference_spans(self.description)}
 
-        return references
+    @property
+    def required_references(self) -> set[int]:
+        """
+        References (#.N, ^.N and >.N) that need to be resolved before this issue can be submitted
+        """
+        required = set(self.references)
+        if self.parent and self.parent.type == "reference":
+            required.add(self.parent.number)
+        required |= {ref.number for ref in self.blocked_by if ref.type == "reference"}
+        return required
 
     def resolve_references(
         self, resolution_map: dict[int, int], strict=False
     ) -> "Issue":
-        resolved_description = self.description
-        for reference in self.references:
+        parts = []
+        copied_until = 0
+        for start, end, reference in reference_spans(self.description):
             if resolved := resolution_map.get(reference):
-                resolved_description = resolved_description.replace(
-                    f"#.{reference}", f"#{resolved}"
-                )
+                parts += [self.description[copied_until:start], f"#{resolved}"]
+                copied_until = end
             elif strict:
                 raise Exception(f"Could not resolve reference #.{reference}")
+        resolved_description = "".join(parts) + self.description[copied_until:]
 
         parent = self.parent.resolved(resolution_map, strict) if self.parent else None
 
-        blocked_by = {ref.resolved(resolution_map, strict) for ref in self.blocked_by}
-        blocked_by = {ref for ref in blocked_by if ref is not None}
+        blocked_by = self.blocked_by
+        if any(ref.type == "reference" for ref in blocked_by):
+            resolved_refs = (ref.resolved(resolution_map, strict) for ref in blocked_by)
+            blocked_by = frozenset(ref for ref in resolved_refs if ref is not None)
 
-        return Issue(
-            **(
-                self._asdict()
-                | {
-                    "description": resolved_description,
-                    "parent": parent,
-                    "blocked_by": blocked_by,
-                }
-            )
+        return self._replace(
+            description=resolved_description, parent=parent, blocked_by=blocked_by
         )
 
-    def submit(self, submitter_args: list[str]) -> tuple[str | None, int | None]:
-        remote_url = self._get_remote_url()
-        if remote_url.hostname == "github.com":
-            return self._github_submit(submitter_args)
-        else:
-            return self._gitlab_submit(submitter_args)
-
-    def _get_remote_url(self):
-        try:
-            origin = subprocess.run(
-                ["git", "remote", "get-url", "origin"], capture_output=True
-            ).stdout.decode()
-            # fake an HTTPs URL from a SSH one
-            if origin.startswith("git@"):
-                origin = origin.replace(":", "/").replace("git@", "https://")
-            return urlparse(origin)
-        except subprocess.CalledProcessError as e:
-            raise ValueError(
-                "Could not determine remote url, make sure that you are inside of a git repository that has a remote named 'origin'"
-            ) from e
+    def submit(
+        self, submitter_args: list[str], session: Session | None = None
+    ) -> tuple[str | None, int | None]:
+        session = session or Session.detect()
+        with measuring(self):
+            if session.forge == "github":
+                return self._github_submit(submitter_args, session)
+            else:
+                return self._gitlab_submit(submitter_args, session)
 
     def _gitlab_submit(
-        self, submitter_args: list[str]
+        self, submitter_args: list[str], session: Session
     ) -> tuple[str | None, int | None]:
+        with phase("create issue"):
+            if using_http():
+                return self._gitlab_submit_with_http(submitter_args, session)
+
+            return gitlab_issue_from_output(
+                run(self._gitlab_create_command(submitter_args, session))
+            )
+
+    def _gitlab_create_command(
+        self, submitter_args: list[str], session: Session
+    ) -> list[str]:
         command = ["glab", "issue", "new"]
+        if not session.from_remote:
+            command += ["-R", session.url]
         if self.title:
             command += ["-t", self.title]
         command += ["-d", self.description or ""]
@@ -241,17 +368,53 @@ class Issue(NamedTuple):
         if self.milestone:
             command += ["-m", self.milestone]
         command.extend(submitter_args)
-        out = run(command)
-        # parse issue number from command output url: https://.+/-/issues/(\d+)
-        if out and (url := re.search(r"https://.+/-/issues/(\d+)", out)):
-            return url.group(0), int(url.group(1))
+        return command
 
-        # raise Exception(f"Could not parse issue number from {out!r}")
-        return None, None
+    def _gitlab_submit_with_http(
+        self, submitter_args: list[str], session: Session
+    ) -> tuple[str | None, int | None]:
+        if submitter_args:
+            print(
+                f"[yellow]Ignoring submitter args {subprocess.list2cmdline(submitter_args)!r}: they only apply to glab commands[/]"
+            )
+
+        try:
+            created = gitlab.create_issue(
+                session.gitlab_project,
+                title=self.title,
+                description=self.description or "",
+                labels=self.labels,
+                assignees=self.assignees,
+                milestone=self.milestone,
+            )
+        except KeyError as e:
+            self._lookup_failed(e)
+            return None, None
+        if not created:
+            return None, None
+        return created
 
     def _github_submit(
-        self, submitter_args: list[str]
+        self, submitter_args: list[str], session: Session
     ) -> tuple[str | None, int | None]:
+        github.use_session(session)
+        issue_type, issue_fields_to_add = self._github_issue_type_and_fields()
+
+        with phase("create issue"):
+            if using_http():
+                created = self._github_create_with_http(issue_type, submitter_args)
+            else:
+                created = self._github_create_with_cli(
+                    issue_type, submitter_args, session
+                )
+
+        if not created:
+            return None, None
+
+        self._github_finish(created, issue_type, issue_fields_to_add)
+        return created.url, created.number
+
+    def _github_issue_type_and_fields(self) -> tuple[str | None, dict[int, str]]:
         available_issue_types = github.available_issue_types()
         issue_types_to_add = [
             t
@@ -275,7 +438,113 @@ class Issue(NamedTuple):
             field.id: normalized_value for (field, normalized_value) in issue_fields
         }
 
-        command = ["gh", "issue", "new"]
+        return issue_type, issue_fields_to_add
+
+    def _github_finish(
+        self,
+        created: github.CreatedIssue,
+        issue_type: str | None,
+        issue_fields_to_add: dict[int, str],
+    ):
+        """
+        Sets everything that could not be set while creating the issue
+        """
+        if created.id:
+            github.remember_issue_id(created.number, created.id)
+
+        for followup in self._github_followups(
+            created, issue_type, issue_fields_to_add, github.issue_id
+        ):
+            with phase(followup.phase):
+                response = github.call_repo_api(
+                    followup.method, followup.route, **followup.body
+                )
+            if response is None and not dry_running():
+                github.forget_issue_ids(followup.uses_ids_of)
+
+    def _github_followups(
+        self,
+        created: github.CreatedIssue,
+        issue_type: str | None,
+        issue_fields_to_add: dict[int, str],
+        issue_id: Callable[[int], int],
+    ) -> Iterable[FollowUp]:
+        """
+        Repository API calls needed to set everything that could not be set while creating the issue.
+        issue_id is used to get the REST API ID of issues from their number.
+        """
+        number = created.number
+
+        if issue_type and not created.type_set:
+            yield FollowUp("PATCH", f"issues/{number}", {"type": issue_type})
+
+        if issue_fields_to_add:
+            yield FollowUp(
+                "PUT",
+                f"issues/{number}/issue-field-values",
+                {
+                    "issue_field_values": [
+                        {"field_id": k, "value": v}
+                        for k, v in issue_fields_to_add.items()
+                    ]
+                },
+            )
+
+        match self.parent:
+            case None:
+                pass
+            case IssueReference("reference", _):
+                raise Exception(
+                    "Cannot set a reference-style parent on GitHub, only direct-style"
+                )
+
+            case IssueReference("direct", parent_number):
+                yield FollowUp(
+                    "POST",
+                    f"issues/{parent_number}/sub_issues",
+                    {
+                        "sub_issue_id": created.id or issue_id(number),
+                        "replace_parent": True,
+                    },
+                    uses_ids_of={number},
+                )
+
+        if self.blocked_by:
+            if any(ref.type == "reference" for ref in self.blocked_by):
+                raise Exception(
+                    "Cannot set reference-style blocked_on on GitHub, only direct-style"
+                )
+
+            for ref in self.blocked_by:
+                yield FollowUp(
+                    "POST",
+                    f"issues/{number}/dependencies/blocked_by",
+                    {"issue_id": issue_id(ref.number)},
+                    uses_ids_of={ref.number},
+                )
+
+    def _github_issue_ids_needed(self, created: github.CreatedIssue) -> set[int]:
+        """
+        Numbers of the issues _github_followups will need the REST API ID of
+        """
+        needed = {ref.number for ref in self.blocked_by if ref.type == "direct"}
+        if self.parent and not created.id:
+            needed.add(created.number)
+        return needed
+
+    def _github_create_with_cli(
+        self, issue_type: str | None, submitter_args: list[str], session: Session
+    ) -> github.CreatedIssue | None:
+        return github_created_issue_from_output(
+            run(self._github_create_command(issue_type, submitter_args, session))
+        )
+
+    def _github_create_command(
+        self, issue_type: str | None, submitter_args: list[str], session: Session
+    ) -> list[str]:
+        # always tell gh the repository: it may not be the one of the current checkout,
+        # and even there, gh may pick another remote than origin
+        command = ["gh", "issue", "new", "-R", session.slug]
         if self.title:
             command += ["-t", self.title]
         command += ["-b", self.description or ""]
@@ -290,63 +559,60 @@ class Issue(NamedTuple):
         if self.milestone:
             command += ["-m", self.milestone]
         command.extend(submitter_args)
-        out = run(command)
-        # parse issue number from command output url: https://github.com/.+/issues/(\d+)
-        pattern = re.compile(r"https:\/\/github\.com\/.+\/issues\/(\d+)")
-
-        if out and (url := pattern.search(out)):
-            number = int(url.group(1))
-
-            if issue_type:
-                github.call_repo_api(
-                    "PATCH",
-                    f"issues/{number}",
-                    type=issue_type,
-                )
+        return command
 
-            if issue_fields_to_add:
-                github.call_repo_api(
-                    "PUT",
-                    f"issues/{number}/issue-field-values",
-                    issue_field_values=[
-                        {"field_id": k, "value": v}
-                        for k, v in issue_fields_to_add.items()
-                    ],
-                )
+    def _github_create_with_http(
+        self, issue_type: str | None, submitter_args: list[str]
+    ) -> github.CreatedIssue | None:
+        if submitter_args:
+            print(
+                f"[yellow]Ignoring submitter args {subprocess.list2cmdline(submitter_args)!r}: they only apply to gh commands[/]"
+            )
 
-            match self.parent:
-                case None:
-                    pass
-                case IssueReference("reference", _):
-                    raise Exception(
-                        "Cannot set a reference-style parent on GitHub, only direct-style"
-                    )
-
-                case IssueReference("direct", parent_number):
-                    github.call_repo_api(
-                        "POST",
-                        f"issues/{parent_number}/sub_issues",
-                        sub_issue_id=github.issue_id(number),
-                        replace_parent=True,
-                    )
-
-            if self.blocked_by:
-                if any(ref.type == "reference" for ref in self.blocked_by):
-                    raise Exception(
-                        "Cannot set reference-style blocked_on on GitHub, only direct-style"
-                    )
-
-                for ref in self.blocked_by:
-                    github.call_repo_api(
-                        "POST",
-                        f"issues/{number}/dependencies/blocked_by",
-                        issue_id=github.issue_id(ref.number),
-                    )
-
-            return url.group(0), number
-
-        # raise Exception(f"Could not parse issue number from {out!r}, looked for regex {pattern}")
-        return None, None
+        try:
+            assignees = [
+                a if a != "me" else github.viewer_login() for a in self.assignees
+            ]
+            milestone = (
+                github.milestone_number(self.milestone) if self.milestone else None
+            )
+        except KeyError as e:
+            self._lookup_failed(e)
+            return None
+
+        body: dict[str, Any] = {
+            "title": self.title,
+            "body": self.description or "",
+            "assignees": assignees,
+            "labels": [
+                l
+                for l in self.labels
+                if not (issue_type and l.lower() == issue_type.lower())
+            ],
+        }
+        if milestone is not None:
+            body["milestone"] = milestone
+        # the REST API accepts the issue type directly, no need for a follow-up PATCH
+        if issue_type:
+            body["type"] = issue_type
+
+        response = github.call_repo_api("POST", "issues", **body)
+        if not response:
+            return None
+
+        created = json.loads(response)
+        return github.CreatedIssue(
+            url=created["html_url"],
+            number=created["number"],
+            id=created["id"],
+            type_set=True,
+        )
+
+    def _lookup_failed(self, error: KeyError):
+        """
+        A milestone or assignee that does not exist only fails this issue, like with gh and glab
+        """
+        print(f"[red]Could not create[/red] {self.display()}: {error.args[0]}")
 
     @staticmethod
     def _word_and_sigil(raw_word: str) -> tuple[str, str]:
@@ -379,7 +645,7 @@ class Issue(NamedTuple):
             expects_description = True
             raw = raw[:-1].strip()
 
-        title = ""
+        title: list[str] = []
         parent: IssueReference | None = None
         description = ""
         labels: set[str] = set()
@@ -390,27 +656,28 @@ class Issue(NamedTuple):
         reference: int | None = None
         # only labels/milestones/assignees at the beginning or end of the line are not added to the title as words
         add_to_title = False
-        remaining_words = [word.strip() for word in raw.split(" ") if word.strip()]
-        _debug_sigils = []
-
-        while remaining_words:
-            sigil, word = cls._word_and_sigil(remaining_words.pop(0))
-
-            _debug_sigils.append(sigil)
+        words = [
+            cls._word_and_sigil(word.strip()) for word in raw.split(" ") if word.strip()
+        ]
+        # how many regular words come after each word
+        regular_words_after = [0] * len(words)
+        for i in range(len(words) - 2, -1, -1):
+            regular_words_after[i] = regular_words_after[i + 1] + (not words[i + 1][0])
 
+        for (sigil, word), regular_words_left in zip(words, regular_words_after):
             if sigil and add_to_title:
-                title += f" {word}"
+                title.append(word)
 
             match sigil:
                 case "~":
-                    labels.add(word)
+                    labels.add(intern(word))
                 case ":":
                     key, value = word.split("=", 1) if "=" in word else (word, None)
                     fields[key] = value or None
                 case "%":
-                    milestone = word
+                    milestone = intern(word)
                 case "@":
-                    assignees.add(word)
+                    assignees.add(intern(word))
                 case "^":
                     parent = IssueReference("direct", int(word))
                 case "^.":
@@ -422,36 +689,48 @@ class Issue(NamedTuple):
                 case "#.":
                     reference = int(word)
                 case _:
-                    title += f" {word}"
+                    title.append(word)
                     # add to title if there are remaining regular words
-                    add_to_title = any(
-                        not sigil
-                        for (sigil, _) in map(cls._word_and_sigil, remaining_words)
-                    )
+                    add_to_title = regular_words_left > 0
 
         return (
             cls(
-                title=title.strip(),
+                title=" ".join(title).strip(),
                 description=description,
-                labels=labels,
+                labels=frozenset(labels),
                 fields=fields,
-                assignees=assignees,
+                assignees=frozenset(assignees),
                 milestone=milestone,
                 reference=reference,
                 parent=parent,
-                blocked_by=blocked_by,
+                blocked_by=frozenset(blocked_by),
             ),
             expects_description,
         )
 
 
-def tree_to_text(tree: dict[str, Any], recursion_depth=0) -> str:
-    result = ""
-    for line, children in tree.items():
-        result += TAB * recursion_depth + line.strip() + NEWLINE
-        if children is not None:
-            result += tree_to_text(children, recursion_depth + 1)
-    return result
+def github_created_issue_from_output(out: str | None) -> github.CreatedIssue | None:
+    # parse issue number from command output url: https://HOST/.+/issues/(\d+),
+    # HOST being github.com or a GitHub Enterprise Server instance
+    pattern = re.compile(r"https:\/\/[^\/\s]+\/.+\/issues\/(\d+)")
+
+    if out and (url := pattern.search(out)):
+        return github.CreatedIssue(url=url.group(0), number=int(url.group(1)))
+
+    # raise Exception(f"Could not parse issue number from {out!r}, looked for regex {pattern}")
+    return None
+
+
+def gitlab_issue_from_output(out: str | None) -> tuple[str | None, int | None]:
+    # parse issue number from command output url: https://.+/-/issues/(\d+)
+    if out and (url := re.search(r"https://.+/-/issues/(\d+)", out)):
+        return url.group(0), int(url.group(1))
+
+    # raise Exception(f"Could not parse issue number from {out!r}")
+    return None, None
+
+
+DESCRIPTION_MARKERS = re.compile(r"([>^]\.?)(\d+)")
 
 
 def process_description(description: str) -> Issue:
@@ -459,14 +738,14 @@ def process_description(description: str) -> Issue:
     Returns a Issue with the following fields set:
     - description: the original description, but with >N and >.N, ^N and ^.N replaced by #.N or #N
     - blocked_by: a set of IssueReferences for each >N and >.N in the description
-    - parent: an IssueReference for the first ^N or ^.N in the description
+    - parent: an IssueReference for the last ^N or ^.N in the description
     """
     blocked_by: set[IssueReference] = set()
     parent: IssueReference | None = None
 
-    # Find >N or >.N in the description
-    for match in re.finditer(r"([>^]\.?)(\d+)", description):
-        sigil, num = match.groups()
+    def replace(marker: re.Match[str]) -> str:
+        nonlocal parent
+        sigil, num = marker.groups()
 
         match sigil:
             case ">":
@@ -480,77 +759,88 @@ def process_description(description: str) -> Issue:
                 parent = IssueReference("reference", int(num))
 
         # Replace match with #.N or #N in the description
-        description = (
-            description[: match.start()]
-            + "#"
-            + sigil[1:]
-            + num
-            + description[match.end() :]
-        )
+        return "#" + sigil[1:] + num
+
+    # Collect and replace every marker in a single pass
+    description = DESCRIPTION_MARKERS.sub(replace, description)
 
     return Issue(
         description=description,
-        blocked_by=blocked_by,
+        blocked_by=frozenset(blocked_by),
         parent=parent,
     )
 
 
 def parse_issue_fragment(
     issue_fragment: str,
-    children: dict[str, Any],
+    children: list[Node],
     current_issue: Issue,
     recursion_depth=0,
     cli_options: dict[str, Any] | None = None,
+    line: int = 0,
 ) -> list[Issue]:
     if not cli_options:
         cli_options = {}
-    log = lambda *args, **kwargs: print(
-        f"[white]{issue_fragment[:50]: <50}[/white]\t{TAB * recursion_depth}",
-        *args,
-        **kwargs,
-    )
+
+    def log(message: Callable[[], str], level=DEBUG):
+        utils.log(
+            level,
+            lambda: f"[white]{issue_fragment[:50]: <50}[/white]\t{TAB * recursion_depth} {message()}",
+        )
 
     if issue_fragment.strip().startswith("//"):
-        log(f"[yellow bold]Skipping comment[/]")
+        log(lambda: f"[yellow bold]Skipping comment[/]")
         return []
-    log(f"Inheriting from {current_issue.display()}")
+    log(lambda: f"Inheriting from {current_issue.display()}")
 
     parsed, expecting_description = Issue.parse(issue_fragment)
 
     current_issue |= parsed
 
     if expecting_description:
-        log(f"[white dim]{parsed} expects a description[/]")
-        if children is None:
+        log(lambda: f"[white dim]{parsed} expects a description[/]")
+        if not children:
             raise ValueError(f"Expected a description after {issue_fragment!r}")
 
-        current_issue |= process_description(tree_to_text(children, 0))
+        current_issue |= process_description(Node.source_text(children))
 
     if current_issue.title:
-        log(f"Made {current_issue.display()}")
-        return [current_issue]
+        log(lambda: f"Made {current_issue.display()}")
+        return [current_issue._replace(line=line) if line else current_issue]
 
-    if not expecting_description and children is not None:
+    if not expecting_description and children:
         result = []
-        log(f"Making children from {current_issue.display()}")
-        for child, grandchildren in children.items():
+        log(lambda: f"Making children from {current_issue.display()}")
+        for child in children:
             result.extend(
                 parse_issue_fragment(
-                    child,
-                    grandchildren,
+                    child.text,
+                    child.children,
                     current_issue,
                     recursion_depth + 1,
                     cli_options,
+                    child.line_number,
                 )
             )
         return result
 
-    log(f"[red bold]Issue {issue_fragment!r} has no title and no children[/red bold]")
+    log(
+        lambda: f"[red bold]Issue {issue_fragment!r} has no title and no children[/red bold]",
+        level=NORMAL,
+    )
     return []
 
 
 def parse(raw: str) -> Iterable[Issue]:
-    for item in Node.to_dict(raw).items():
-        debug(f"Processing {item!r}")
-        for issue in parse_issue_fragment(*item, Issue("", "", set(), {}, set(), "")):
-            yield issue
+    return parse_lines(raw.splitlines())
+
+
+def parse_lines(lines: Iterable[str]) -> Iterator[Issue]:
+    """
+    Yields issues as soon as the top-level block they come from is complete, without waiting for the rest of the lines
+    """
+    for node in Node.blocks(lines):
+        debug(f"Processing {node.text!r}")
+        yield from parse_issue_fragment(
+            node.text, node.children, Issue(), line=node.line_number
+        )
@@ -2,7 +2,7 @@ import textwrap
 
 import pytest
 
-from .parser import Issue, IssueReference, parse
+from .parser import Issue, IssueReference, parse, parse_lines, process_description
 
 
 @pytest.mark.parametrize(
@@ -50,7 +50,7 @@ def test_parse_fragment(fragment, expected, description_expected):
     "lines, expected",
     [
         ("", []),
-        ("A simple issue", [Issue(title="A simple issue")]),
+        ("A simple issue", [Issue(title="A simple issue", line=1)]),
         ("~label @me", []),
         (
             """
@@ -62,11 +62,13 @@ def test_parse_fragment(fragment, expected, description_expected):
                     title="some labels to organize issues",
                     labels={"labels", "organize", "bug"},
                     assignees={"me"},
+                    line=2,
                 ),
                 Issue(
                     title="a milestone to keep track of stuff",
                     labels={"track"},
                     milestone="milestone",
+                    line=3,
                 ),
             ],
         ),
@@ -76,7 +78,7 @@ def test_parse_fragment(fragment, expected, description_expected):
             \tinside: not processed
             """,
             [
-                Issue(title="some stuff"),
+                Issue(title="some stuff", line=2),
             ],
         ),
         (
@@ -92,12 +94,14 @@ def test_parse_fragment(fragment, expected, description_expected):
                     title="right there",
                     labels={"common-tag", "other-tag"},
                     assignees={"someone"},
+                    line=3,
                 ),
                 Issue(
                     title="right",
                     labels={"common-tag"},
                     assignees={"someone-else", "someone"},
                     milestone="here",
+                    line=6,
                 ),
             ],
         ),
@@ -117,11 +121,13 @@ def test_parse_fragment(fragment, expected, description_expected):
                     labels={"issue"},
                     description="""This is the %description of the issue:
 // This is *not* a comment
-It has a
+It has a 
 - bullet list
+
 And
 \tIndentation
 """,
+                    line=1,
                 )
             ],
         ),
@@ -136,12 +142,14 @@ And
                     labels={"notsure"},
                     assignees={"me"},
                     milestone="milestone_test",
+                    line=2,
                 ),
                 Issue(
                     title="do that",
                     labels={"important"},
                     assignees={"me"},
                     milestone="milestone_test",
+                    line=3,
                 ),
             ],
         ),
@@ -157,10 +165,12 @@ An issue that references another ~blocked:
                     title="An issue that references another",
                     labels={"blocked"},
                     description="See #.1\n",
+                    line=2,
                 ),
                 Issue(
                     title="The other one ^w^",
                     reference=1,
+                    line=5,
                 ),
             ],
         ),
@@ -173,6 +183,7 @@ Thing:
                 Issue(
                     title="Thing",
                     description="See issue #.1, #.2\n",
+                    line=2,
                 )
             ],
         ),
@@ -190,28 +201,33 @@ This one has no parent
 ^45 This one has a direct-style parent
             """,
             [
-                Issue(title="The parent issue", reference=1),
+                Issue(title="The parent issue", reference=1, line=2),
                 Issue(
                     title="Child one",
                     parent=IssueReference("reference", 1),
                     labels={"feur"},
+                    line=5,
                 ),
                 Issue(
                     title="Child two",
                     parent=IssueReference("reference", 1),
                     labels={"feur"},
+                    line=6,
                 ),
                 Issue(
                     title="Wait no, this one is different!",
                     parent=IssueReference("direct", 3),
                     labels={"feur"},
+                    line=7,
                 ),
                 Issue(
                     title="This one has no parent",
+                    line=9,
                 ),
                 Issue(
                     title="This one has a direct-style parent",
                     parent=IssueReference("direct", 45),
+                    line=11,
                 ),
             ],
         ),
@@ -227,6 +243,7 @@ This one has no parent
                 Issue(
                     title="The blocking issue",
                     reference=1,
+                    line=2,
                 ),
                 Issue(
                     title="Another, itself blocked on",
@@ -236,6 +253,7 @@ This one has no parent
                         IssueReference("direct", 89),
                         IssueReference("direct", 43),
                     },
+                    line=3,
                 ),
                 Issue(
                     title="An issue that's blocked on",
@@ -245,6 +263,7 @@ This one has no parent
                         IssueReference("reference", 2),
                         IssueReference("reference", 1),
                     },
+                    line=6,
                 ),
             ],
         ),
@@ -259,14 +278,17 @@ This one has no parent
                 Issue(
                     title="Remove dead links",
                     fields={"Fake": "Yes", "Platform": "Web"},
+                    line=3,
                 ),
                 Issue(
                     title="Remove Platform=Mobile dead links",
                     fields={"Fake": "No", "Platform": "Mobile"},
+                    line=4,
                 ),
                 Issue(
                     title="Remove dead links everywhere",
                     fields={"Fake": "Yes"},
+                    line=5,
                 ),
             ],
         ),
@@ -309,3 +331,94 @@ def test_parse_issue_with_missing_description_fails():
         ValueError, match="Expected a description after 'An ~issue with a description:'"
     ):
         list(parse("An ~issue with a description:\nNo description here"))
+
+
+def test_parse_keeps_duplicate_lines():
+    issues = list(parse("Fix typo\nFix typo\nDescribed:\n\tSame line\n\tSame line\n"))
+    assert [issue.title for issue in issues] == ["Fix typo", "Fix typo", "Described"]
+    assert issues[2].description == "Same line\nSame line\n"
+
+
+def test_parse_deeply_nested_description():
+    nested = "\n".join("\t" * depth + "deeper" for depth in range(1, 5000))
+    [issue] = parse(f"Deep:\n{nested}")
+    assert issue.description.count("deeper") == 4999
+
+
+def test_parse_uneven_dedent_keeps_lines():
+    [issue] = parse("Uneven:\n        four\n    two\n")
+    assert issue.description == "    four\ntwo\n"
+
+
+def test_parse_description_keeps_source_indentation():
+    [issue, other] = parse(
+        "Spaces:\n    def f():\n        return 1\n\n\n    f()\n\nOther\n"
+    )
+    assert issue.description == "def f():\n    return 1\n\n\nf()\n"
+    assert other.title == "Other"
+
+
+def test_parse_lines_yields_issues_before_reading_everything():
+    read = []
+
+    def lines():
+        for line in ["~bug", "\tFirst", "\tSecond", "Third:", "\tdescription"]:
+            read.append(line)
+            yield line
+
+    issues = parse_lines(lines())
+    assert next(issues).title == "First"
+    assert next(issues).title == "Second"
+    assert read == ["~bug", "\tFirst", "\tSecond", "Third:"]
+    assert next(issues).description == "description\n"
+
+
+@pytest.mark.parametrize(
+    "fragment, title",
+    [
+        ("~a ~b Fix the ~thing here ~c ~d", "Fix the thing here"),
+        ("Fix @me the ~thing %v2", "Fix me the"),
+        ("~only ~sigils", ""),
+    ],
+)
+def test_parse_fragment_keeps_sigils_only_between_words(fragment, title):
+    assert Issue.parse(fragment)[0].title == title
+
+
+def test_parse_fragment_long_line():
+    issue, _ = Issue.parse(" ".join(["word", "~label"] * 50_000))
+    assert issue.title == " ".join(["word", "label"] * 50_000)[: -len(" label")]
+    assert issue.labels == {"label"}
+
+
+def test_process_description_markers():
+    processed = process_description("See >1 and >.2, part of ^3\nactually ^.4 >1")
+    assert processed.description == "See #1 and #.2, part of #3\nactually #.4 #1"
+    assert processed.blocked_by == {
+        IssueReference("direct", 1),
+        IssueReference("reference", 2),
+    }
+    assert processed.parent == IssueReference("reference", 4)
+
+
+def test_process_description_many_markers():
+    processed = process_description(" ".join(f">{n}" for n in range(20_000)))
+    assert processed.description == " ".join(f"#{n}" for n in range(20_000))
+    assert len(processed.blocked_by) == 20_000
+
+
+def test_resolve_references_does_not_touch_longer_references():
+    issue = Issue(title="Links", description="See #.1, #.12 and #.1a (#.1)")
+    assert (
+        issue.resolve_references({1: 100, 12: 120}).description
+        == "See #100, #120 and #.1a (#100)"
+    )
+    assert issue.references == {1, 12}
+
+
+def test_inherited_collections_are_shared():
+    first, second, third = parse("~common @team\n\tFirst\n\tSecond\n\tThird ~extra\n")
+    assert first.labels is second.labels
+    assert first.assignees is second.assignees
+    assert third.labels == {"common", "extra"}
+    assert isinstance(third.labels, frozenset)
@@ -0,0 +1,196 @@
+from typing import Iterable, NamedTuple
+
+from rich import print
+
+from issurge import github, gitlab
+from issurge.parser import Issue
+from issurge.profiling import timed
+from issurge.session import Session
+from issurge.utils import NORMAL, PER_PAGE, dry_running, log, pages
+
+# color of the labels created by --create-missing, the one forges use for new labels
+LABEL_COLOR = "ededed"
+
+
+class Metadata(NamedTuple):
+    """
+    Labels, milestones and assignees, by name
+    """
+
+    labels: set[str]
+    milestones: set[str]
+    assignees: set[str]
+
+    def __bool__(self):
+        return bool(self.labels or self.milestones or self.assignees)
+
+
+def used_by(issues: Iterable[Issue], issue_types: Iterable[str] = ()) -> Metadata:
+    """
+    Labels that name an issue type set that type instead of being added as labels, like when submitting
+    """
+    types = {issue_type.lower() for issue_type in issue_types}
+    used = Metadata(set(), set(), set())
+    for issue in issues:
+        used.labels.update(
+            label for label in issue.labels if label.lower() not in types
+        )
+        if issue.milestone:
+            used.milestones.add(issue.milestone)
+        # the authenticated user can always be assigned
+        used.assignees.update(issue.assignees - {"me"})
+    return used
+
+
+def github_metadata(session: Session) -> Metadata:
+    route = f"/repos/{session.owner}/{session.repo}"
+
+    def listing(what: str, key: str) -> set[str]:
+        return {
+            item[key]
+            for item in pages(
+                f"the {what.partition('?')[0]} of {session.slug}",
+                lambda page: github.call_api(
+                    "GET",
+                    f"{route}/{what}per_page={PER_PAGE}&page={page}",
+                    bypass_dry_run=True,
+                ),
+            )
+        }
+
+    return Metadata(
+        labels=listing("labels?", "name"),
+        milestones=listing("milestones?state=all&", "title"),
+        assignees=listing("assignees?", "login"),
+    )
+
+
+def gitlab_metadata(session: Session) -> Metadata:
+    def listing(what: str, key: str) -> set[str]:
+        return {
+            item[key]
+            for item in pages(
+                f"the {what.partition('?')[0]} of {session.slug}",
+                lambda page: gitlab.call_project_api(
+                    session.gitlab_project,
+                    "GET",
+                    f"{what}per_page={PER_PAGE}&page={page}",
+                    bypass_dry_run=True,
+                ),
+            )
+        }
+
+    return Metadata(
+        labels=listing("labels?include_ancestor_groups=true&", "name"),
+        milestones=listing("milestones?include_ancestors=true&", "title"),
+        # members of the project and of its parent groups
+        assignees=listing("members/all?", "username"),
+    )
+
+
+@timed("metadata: pre-flight")
+def available(session: Session) -> Metadata:
+    return (github_metadata if session.forge == "github" else gitlab_metadata)(session)
+
+
+def missing(used: Metadata, available: Metadata, forge: str) -> Metadata:
+    if forge == "github":
+        # GitHub labels and logins are case-insensitive
+        labels = {label.casefold() for label in available.labels}
+        assignees = {login.casefold() for login in available.assignees}
+        return Metadata(
+            labels={label for label in used.labels if label.casefold() not in labels},
+            milestones=used.milestones - available.milestones,
+            assignees={a for a in used.assignees if a.casefold() not in assignees},
+        )
+    return Metadata(
+        labels=used.labels - available.labels,
+        milestones=used.milestones - available.milestones,
+        assignees=used.assignees - available.assignees,
+    )
+
+
+def create(session: Session, labels: set[str], milestones: set[str]) -> bool:
+    """
+    Returns whether everything could be created
+    """
+    created = True
+    for label in sorted(labels):
+        log(NORMAL, f"Creating label [white bold]~{label}[/]")
+        if session.forge == "github":
+            response = github.call_api(
+                "POST",
+                f"/repos/{session.owner}/{session.repo}/labels",
+                name=label,
+                color=LABEL_COLOR,
+            )
+        else:
+            response = gitlab.call_project_api(
+                session.gitlab_project,
+                "POST",
+                "labels",
+                name=label,
+                color=f"#{LABEL_COLOR}",
+            )
+        created = created and (response is not None or bool(dry_running()))
+
+    for milestone in sorted(milestones):
+        log(NORMAL, f"Creating milestone [white bold]%{milestone}[/]")
+        if session.forge == "github":
+            response = github.call_api(
+                "POST",
+                f"/repos/{session.owner}/{session.repo}/milestones",
+                title=milestone,
+            )
+        else:
+            response = gitlab.call_project_api(
+                session.gitlab_project, "POST", "milestones", title=milestone
+            )
+        created = created and (response is not None or bool(dry_running()))
+
+    if milestones and session.forge == "github":
+        github.milestone_numbers.cache_clear()
+    return created
+
+
+def users_of(issues: list[Issue], kind: str, name: str) -> str:
+    titles = [
+        repr(issue.title)
+        for issue in issues
+        if (kind == "labels" and name in issue.labels)
+        or (kind == "milestones" and issue.milestone == name)
+        or (kind == "assignees" and name in issue.assignees)
+    ]
+    if len(titles) > 3:
+        return f"{', '.join(titles[:3])} and {len(titles) - 3} more"
+    return ", ".join(titles)
+
+
+def check(issues: list[Issue], session: Session, create_missing: bool) -> bool:
+    """
+    Makes sure that every label, milestone and assignee the issues use exists, before submitting any of them.
+    Prints every problem at once, and returns whether issues can be submitted.
+    With create_missing, missing labels and milestones are created first. Assignees can't be.
+    """
+    issue_types = github.available_issue_types() if session.forge == "github" else []
+    problems = missing(used_by(issues, issue_types), available(session), session.forge)
+    if create_missing and (problems.labels or problems.milestones):
+        if not create(session, problems.labels, problems.milestones):
+            print("[red]Could not create every missing label and milestone[/red]")
+            return False
+        problems = Metadata(set(), set(), problems.assignees)
+
+    if not problems:
+        return True
+
+    print("[red]Some labels, milestones or assignees don't exist:[/red]")
+    for kind, sigil, names in (
+        ("labels", "~", problems.labels),
+        ("milestones", "%", problems.milestones),
+        ("assignees", "@", problems.assignees),
+    ):
+        for name in sorted(names):
+            print(f"  {sigil}{name}, used by {users_of(issues, kind, name)}")
+    if problems.labels or problems.milestones:
+        print("Pass --create-missing to create the missing labels and milestones")
+    return False
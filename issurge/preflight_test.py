@@ -0,0 +1,90 @@
+import pytest
+
+from issurge import github, gitlab
+from issurge.parser import parse
+from issurge.preflight import Metadata, check, missing, used_by
+from issurge.session import Session
+
+GITHUB = Session.detect("gwennlbh/gh-api-playground")
+GITLAB = Session.detect("git.inpt.fr/net7/website")
+
+
+@pytest.fixture
+def forges_over_http(stub_api, monkeypatch):
+    monkeypatch.setenv("ISSURGE_HTTP", "1")
+    monkeypatch.setenv("ISSURGE_GITHUB_API_URL", stub_api.url)
+    monkeypatch.setenv("ISSURGE_GITLAB_API_URL", f"{stub_api.url}/api/v4")
+    monkeypatch.setenv("GH_TOKEN", "sekrit")
+    monkeypatch.setenv("GITLAB_TOKEN", "sekrit")
+    for cached in (github.client, github.token, gitlab.client, gitlab.token):
+        cached.cache_clear()
+    yield stub_api
+    github.client.cache_clear()
+    gitlab.client.cache_clear()
+
+
+def test_collects_what_issues_use():
+    assert used_by(parse("One ~bug %v1 @me\nTwo ~ui @someone\n\tDetails")) == (
+        {"bug", "ui"},
+        {"v1"},
+        {"someone"},
+    )
+
+
+def test_labels_naming_an_issue_type_are_not_labels():
+    assert used_by(parse("One ~bug ~ui\nTwo ~Feature"), ["Bug", "Feature"]) == (
+        {"ui"},
+        set(),
+        set(),
+    )
+
+
+def test_github_names_are_case_insensitive():
+    used = Metadata({"Bug", "ui"}, {"v1"}, {"Someone"})
+    available = Metadata({"bug"}, {"V1"}, {"someone"})
+
+    assert missing(used, available, "github") == ({"ui"}, {"v1"}, set())
+    assert missing(used, available, "gitlab") == ({"Bug", "ui"}, {"v1"}, {"Someone"})
+
+
+def test_reports_every_problem_at_once(forges_over_http, capsys, monkeypatch):
+    monkeypatch.setattr(github, "available_issue_types", lambda: ["Task"])
+    repo = "/repos/gwennlbh/gh-api-playground"
+    forges_over_http.routes |= {
+        ("GET", f"{repo}/labels"): (200, [{"name": "bug"}]),
+        ("GET", f"{repo}/milestones"): (200, [{"title": "v1"}]),
+        ("GET", f"{repo}/assignees"): (200, [{"login": "gwennlbh"}]),
+    }
+
+    assert not check(
+        list(parse("One ~bgu %v1\nTwo ~bgu %v2 @nobody\nThree ~bug ~task @gwennlbh")),
+        GITHUB,
+        create_missing=False,
+    )
+
+    assert capsys.readouterr().out.splitlines()[1:] == [
+        "  ~bgu, used by 'One', 'Two'",
+        "  %v2, used by 'Two'",
+        "  @nobody, used by 'Two'",
+        "Pass --create-missing to create the missing labels and milestones",
+    ]
+    assert len(forges_over_http.requests) == 3
+
+
+def test_creates_missing_labels_and_milestones(forges_over_http):
+    project = "/api/v4/projects/net7%2Fwebsite"
+    forges_over_http.routes |= {
+        ("GET", f"{project}/labels"): (200, [{"name": "bug"}]),
+        ("GET", f"{project}/milestones"): (200, []),
+        ("GET", f"{project}/members/all"): (200, [{"username": "someone"}]),
+        ("POST", f"{project}/labels"): (201, {"id": 1}),
+        ("POST", f"{project}/milestones"): (201, {"id": 2}),
+    }
+
+    assert check(list(parse("One ~bug ~new %v1 @someone")), GITLAB, create_missing=True)
+
+    created = [r for r in forges_over_http.requests if r.method == "POST"]
+    assert [(r.path, r.body) for r in created] == [
+        (f"{project}/labels", {"name": "new", "color": "#ededed"}),
+        (f"{project}/milestones", {"title": "v1"}),
+    ]
@@ -0,0 +1,206 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+# durations, in seconds, of every time a phase ran
+_durations: dict[str, list[float]] = {}
+_lock = threading.Lock()
+
+
+class Measure:
+    """
+    Phases that ran while submitting a single issue, in order, for --report
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.phases: list[tuple[str, float]] = []
+
+
+# the issue being submitted in the current thread or task, if --report is passed
+_measure: ContextVar[Measure | None] = ContextVar("measure", default=None)
+# measures of submitted issues, by id() of the issue, until the report gets them
+_measures: dict[int, Measure] = {}
+
+
+def enabled():
+    return os.environ.get("ISSURGE_PROFILE")
+
+
+def reporting():
+    return os.environ.get("ISSURGE_REPORT")
+
+
+def record(name: str, seconds: float):
+    with _lock:
+        _durations.setdefault(name, []).append(seconds)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Times what runs inside, when --profile is passed, or for the issue being measured with --report.
+    Phases can be nested, in which case their times overlap.
+    """
+    measure = _measure.get()
+    if not enabled() and measure is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if enabled():
+            record(name, seconds)
+        if measure is not None:
+            measure.phases.append((name, seconds))
+
+
+@contextmanager
+def measuring(issue: object) -> Iterator[None]:
+    """
+    Attributes the phases that run inside to issue, including in threads and tasks started from here
+    """
+    if not reporting():
+        yield
+        return
+    measure = Measure()
+    token = _measure.set(measure)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        measure.seconds = time.perf_counter() - start
+        _measure.reset(token)
+        with _lock:
+            _measures[id(issue)] = measure
+
+
+def attribute(name: str, seconds: float):
+    """
+    Adds a phase that ran for many issues at once to the issue being measured
+    """
+    if measure := _measure.get():
+        measure.phases.append((name, seconds))
+
+
+def measured(issue: object) -> Measure:
+    """
+    Takes the measure of a submitted issue. Issues that were not submitted get an empty one.
+    """
+    with _lock:
+        return _measures.pop(id(issue), None) or Measure()
+
+
+def timed(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    def decorator(function: Callable[..., T]) -> Callable[..., T]:
+        @wraps(function)
+        def wrapper(*args, **kwargs) -> T:
+            with phase(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_iterator(name: str, items: Iterable[T]) -> Iterator[T]:
+    """
+    Times how long each item takes to come out, e.g. to time a generator without the time spent by its consumer
+    """
+    iterator = iter(items)
+    while True:
+        with phase(name):
+            item = next(iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item  # pyright: ignore[reportReturnType]
+
+
+def percentile(sorted_durations: list[float], ratio: float) -> float:
+    return sorted_durations[
+        min(len(sorted_durations) - 1, int(len(sorted_durations) * ratio))
+    ]
+
+
+def breakdown() -> list[tuple[str, int, float, float, float]]:
+    """
+    Name, count, total, p50 and p95 of each phase, slowest first
+    """
+    with _lock:
+        durations = {name: sorted(times) for name, times in _durations.items()}
+    return sorted(
+        (
+            (
+                name,
+                len(times),
+                sum(times),
+                percentile(times, 0.5),
+                percentile(times, 0.95),
+            )
+            for name, times in durations.items()
+        ),
+        key=lambda row: row[2],
+        reverse=True,
+    )
+
+
+def report() -> str:
+    lines = [f"{'Phase':<45} {'Count':>7} {'Total':>10} {'p50':>10} {'p95':>10}"]
+    for name, count, total, p50, p95 in breakdown():
+        lines.append(
+            f"{name:<45} {count:>7} {milliseconds(total):>10} {milliseconds(p50):>10} {milliseconds(p95):>10}"
+        )
+    return "\n".join(lines)
+
+
+def milliseconds(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}ms"
+
+
+def reset():
+    with _lock:
+        _durations.clear()
+
+
+@contextmanager
+def profiled(pstats_file: str | None) -> Iterator[None]:
+    """
+    Prints the time spent in each phase at the end of a --profile run,
+    and writes cProfile statistics to pstats_file if given (those only cover the main thread).
+    """
+    if not enabled():
+        yield
+        return
+
+    reset()
+    profile = None
+    if pstats_file:
+        import cProfile
+
+        profile = cProfile.Profile()
+        profile.enable()
+    try:
+        with phase("total"):
+            yield
+    finally:
+        if profile:
+            profile.disable()
+            profile.dump_stats(pstats_file)
+
+        # not through rich, which would wrap the table on narrow terminals
+        sys.stdout.write(report() + "\n")
+        if pstats_file:
+            sys.stdout.write(
+                f"Wrote profile statistics to {pstats_file}, see python -m pstats\n"
+            )
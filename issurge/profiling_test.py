@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from issurge.profiling import breakdown, phase, reset, timed_iterator
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setenv("ISSURGE_PROFILE", "1")
+    reset()
+    yield
+    reset()
+
+
+def test_phases_are_only_timed_when_profiling(monkeypatch):
+    monkeypatch.delenv("ISSURGE_PROFILE", raising=False)
+    reset()
+    with phase("nothing"):
+        pass
+    assert breakdown() == []
+
+
+def test_breakdown(profiling):
+    for duration in [0.01] * 19 + [0.05]:
+        with phase("slow"):
+            time.sleep(duration)
+    with phase("fast"):
+        pass
+
+    (slow, count, total, p50, p95), fast = breakdown()
+    assert (slow, count, fast[0]) == ("slow", 20, "fast")
+    assert total >= 0.24
+    assert 0.01 <= p50 < 0.05 <= p95
+
+
+def test_timed_iterator_does_not_time_the_consumer(profiling):
+    def produce():
+        yield 1
+        yield 2
+
+    for _ in timed_iterator("produce", produce()):
+        time.sleep(0.02)
+
+    [(name, count, total, _, _)] = breakdown()
+    assert (name, count) == ("produce", 3)
+    assert total < 0.02
@@ -0,0 +1,54 @@
+import json
+from contextlib import nullcontext
+from typing import Any, ContextManager, TextIO
+
+from issurge.parser import Issue
+from issurge.profiling import Measure, measured
+
+CREATION_PHASES = {"create issue", "create batch"}
+FOLLOW_UP_PREFIX = "follow-up "
+COMMANDS = {"gh", "glab"}
+
+
+def open_report(path: str | None) -> ContextManager[TextIO | None]:
+    if not path:
+        return nullcontext(None)
+    return open(path, "w", encoding="utf-8")
+
+
+def record(issue: Issue, url: str | None, number: int | None, measure: Measure):
+    """
+    What --report writes for an issue. Issues that were not submitted (e.g. with --dry-run) have no timings.
+    In --batch mode, the request that created the issue was shared with the rest of its batch.
+    """
+    created = [seconds for name, seconds in measure.phases if name in CREATION_PHASES]
+    return {
+        "line": issue.line or None,
+        "title": issue.title,
+        "reference": issue.reference,
+        "number": number,
+        "url": url,
+        "seconds": measure.seconds,
+        "create_seconds": sum(created) if created else None,
+        "follow_ups": [
+            {"call": name.removeprefix(FOLLOW_UP_PREFIX), "seconds": seconds}
+            for name, seconds in measure.phases
+            if name.startswith(FOLLOW_UP_PREFIX)
+        ],
+        "subprocesses": sum(
+            name.partition(" ")[0] in COMMANDS for name, _ in measure.phases
+        ),
+        "http_requests": sum(
+            name.startswith("HTTP ") or name == "create batch"
+            for name, _ in measure.phases
+        ),
+    }
+
+
+def write_entry(report: TextIO, issue: Issue, url: str | None, number: int | None):
+    """
+    Writes one JSON line, right away so that the report can be followed while issues are submitted
+    """
+    entry: dict[str, Any] = record(issue, url, number, measured(issue))
+    report.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    report.flush()
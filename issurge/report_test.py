@@ -0,0 +1,38 @@
+from issurge.parser import Issue
+from issurge.profiling import Measure
+from issurge.report import record
+
+
+def test_record_sorts_phases_out():
+    measure = Measure()
+    measure.seconds = 1.5
+    measure.phases = [
+        ("metadata: issue types", 0.3),
+        ("gh repo view", 0.2),
+        ("gh issue new", 0.4),
+        ("create issue", 0.4),
+        ("HTTP POST", 0.1),
+        ("follow-up POST issues/N/sub_issues", 0.1),
+    ]
+
+    entry = record(Issue(title="Child", reference=2, line=7), None, 12, measure)
+
+    assert entry == {
+        "line": 7,
+        "title": "Child",
+        "reference": 2,
+        "number": 12,
+        "url": None,
+        "seconds": 1.5,
+        "create_seconds": 0.4,
+        "follow_ups": [{"call": "POST issues/N/sub_issues", "seconds": 0.1}],
+        "subprocesses": 2,
+        "http_requests": 1,
+    }
+
+
+def test_record_of_an_issue_that_was_not_submitted():
+    entry = record(Issue(title="Skipped"), None, None, Measure())
+    assert entry["line"] is None
+    assert entry["create_seconds"] is None
+    assert entry["subprocesses"] == entry["http_requests"] == 0
@@ -0,0 +1,183 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from heapq import heapify, heappop, heappush
+from typing import Iterable
+
+from rich import print
+
+from issurge.parser import Issue
+from issurge.session import Session
+from issurge.utils import DEBUG, dry_running, log
+
+
+def dependency_graph(
+    issues: list[Issue], already_resolved: Iterable[int] = ()
+) -> list[set[int]]:
+    """
+    Returns, for each issue, the indices of the issues that define the references (#.N, ^.N, >.N) it uses.
+    References may be defined after the issues that use them, or be already resolved (e.g. by a previous run, with --resume).
+    """
+    already_resolved = set(already_resolved)
+    defined_at: dict[int, int] = {}
+    for i, issue in enumerate(issues):
+        if not issue.reference:
+            continue
+        if issue.reference in defined_at:
+            raise ValueError(
+                f"Reference #.{issue.reference} is defined more than once: "
+                f"by {issues[defined_at[issue.reference]].title!r} and by {issue.title!r}"
+            )
+        defined_at[issue.reference] = i
+
+    undefined = {
+        f"#.{reference} (used by {issue.title!r})"
+        for issue in issues
+        for reference in issue.required_references
+        if reference not in defined_at and reference not in already_resolved
+    }
+    if undefined:
+        raise ValueError(
+            f"References are never defined: {', '.join(sorted(undefined))}"
+        )
+
+    return [
+        {
+            defined_at[reference]
+            for reference in issue.required_references
+            if reference in defined_at
+        }
+        for issue in issues
+    ]
+
+
+def critical_path_lengths(
+    issues: list[Issue], dependencies: list[set[int]], dependents: list[list[int]]
+) -> list[int]:
+    """
+    Returns, for each issue, the number of issues in the longest chain of issues that wait on it (itself included).
+    Raises if issues depend on each other in a cycle.
+    """
+    waiting_on = [len(d) for d in dependencies]
+    order = [i for i, count in enumerate(waiting_on) if not count]
+    for i in order:
+        for dependent in dependents[i]:
+            waiting_on[dependent] -= 1
+            if not waiting_on[dependent]:
+                order.append(dependent)
+
+    if len(order) < len(dependencies):
+        stuck = [issues[i].title for i, count in enumerate(waiting_on) if count]
+        raise ValueError(
+            f"Issues depend on each other in a cycle (or on issues that do): {', '.join(map(repr, stuck))}"
+        )
+
+    lengths = [1] * len(dependencies)
+    for i in reversed(order):
+        if dependents[i]:
+            lengths[i] = 1 + max(lengths[d] for d in dependents[i])
+    return lengths
+
+
+class SubmissionPlan:
+    """
+    Keeps track of which issues can be submitted, given the references they use and the issues already created.
+    Ready issues come out with the longest chains of other issues waiting on them first.
+    """
+
+    def __init__(self, issues: Iterable[Issue], references_resolutions: dict[int, int]):
+        self.issues = list(issues)
+        self.references_resolutions = references_resolutions
+        self.dependencies = dependency_graph(self.issues, references_resolutions)
+        self.dependents: list[list[int]] = [[] for _ in self.issues]
+        for i, depends_on in enumerate(self.dependencies):
+            for dependency in depends_on:
+                self.dependents[dependency].append(i)
+
+        self.priorities = critical_path_lengths(
+            self.issues, self.dependencies, self.dependents
+        )
+        self.waiting_on = [len(d) for d in self.dependencies]
+        self.failed: set[int] = set()
+        self.ready = [
+            (-self.priorities[i], i)
+            for i, count in enumerate(self.waiting_on)
+            if not count
+        ]
+        heapify(self.ready)
+
+    def next_ready(self) -> int:
+        _, i = heappop(self.ready)
+        return i
+
+    def start(self, i: int) -> Issue | None:
+        """
+        Returns the issue to submit, with its references resolved,
+        or None if it can't be submitted because it uses a reference to an issue that failed to be created.
+        """
+        if self.dependencies[i] & self.failed:
+            print(
+                f"[red]Skipping {self.issues[i].display()}[/red]: it uses a reference to an issue that could not be created"
+            )
+            self.finish(i, None)
+            return None
+
+        self.issues[i] = self.issues[i].resolve_references(
+            self.references_resolutions, strict=not dry_running()
+        )
+        log(DEBUG, lambda: f"Submitting {self.issues[i].display()}")
+        return self.issues[i]
+
+    def finish(self, i: int, number: int | None):
+        if number and self.issues[i].reference:
+            self.references_resolutions[self.issues[i].reference] = number
+        elif not number and not dry_running():
+            self.failed.add(i)
+
+        for dependent in self.dependents[i]:
+            self.waiting_on[dependent] -= 1
+            if not self.waiting_on[dependent]:
+                heappush(self.ready, (-self.priorities[dependent], dependent))
+
+
+def submit_concurrently(
+    issues: Iterable[Issue],
+    references_resolutions: dict[int, int],
+    submitter_args: list[str],
+    jobs: int,
+    session: Session | None = None,
+) -> Iterable[tuple[Issue, str | None, int | None]]:
+    """
+    Submits up to `jobs` issues at the same time. An issue is submitted as soon as all of the references it uses are resolved,
+    and issues that have the longest chains of other issues waiting on them go first.
+    Yields issues as they get created, which might not be in file order.
+    """
+    plan = SubmissionPlan(issues, references_resolutions)
+    session = session or Session.detect()
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running: dict[Future[tuple[str | None, int | None]], int] = {}
+        try:
+            while plan.ready or running:
+                while plan.ready and len(running) < jobs:
+                    i = plan.next_ready()
+                    if issue := plan.start(i):
+                        running[pool.submit(issue.submit, submitter_args, session)] = i
+                    else:
+                        yield plan.issues[i], None, None
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    url, number = future.result()
+                    plan.finish(i, number)
+                    yield plan.issues[i], url, number
+        except KeyboardInterrupt:
+            # issues being submitted can't be stopped halfway:
+            # let them finish and hand them out, so that they are known to be created, then stop
+            for future in list(running):
+                i = running.pop(future)
+                url, number = future.result()
+                yield plan.issues[i], url, number
+            raise
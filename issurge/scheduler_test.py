@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+from issurge.parser import Issue, parse
+from issurge.scheduler import submit_concurrently
+from issurge.session import Session
+
+GITHUB = Session.detect("gwennlbh/gh-api-playground")
+
+
+@pytest.fixture
+def submitted_titles(monkeypatch):
+    titles = []
+    lock = threading.Lock()
+
+    def submit(self, submitter_args, session=None):
+        with lock:
+            titles.append(self.title)
+            number = 100 + len(titles)
+        return f"https://github.com/gwennlbh/gh-api-playground/issues/{number}", number
+
+    monkeypatch.setattr(Issue, "submit", submit)
+    return titles
+
+
+def test_references_get_resolved(submitted_titles):
+    resolutions = {}
+    submitted = {
+        issue.title: issue
+        for issue, _, _ in submit_concurrently(
+            parse("Uses it:\n\tSee #.1\n^.1 Child\n#.1 Defined last"),
+            resolutions,
+            [],
+            jobs=4,
+            session=GITHUB,
+        )
+    }
+
+    assert submitted_titles[0] == "Defined last"
+    assert resolutions == {1: 101}
+    assert submitted["Uses it"].description == "See #101\n"
+    assert submitted["Child"].parent == ("direct", 101)
+
+
+def test_longest_chains_go_first(submitted_titles):
+    list(
+        submit_concurrently(
+            parse(
+                "Independent\n#.1 Head of the chain\n#.2 Middle >.1\n^.2 End of the chain\n"
+            ),
+            {},
+            [],
+            jobs=1,
+            session=GITHUB,
+        )
+    )
+
+    assert submitted_titles == [
+        "Head of the chain",
+        "Middle",
+        "Independent",
+        "End of the chain",
+    ]
+
+
+def test_submits_in_parallel(monkeypatch):
+    all_running = threading.Barrier(3, timeout=5)
+
+    def submit(self, submitter_args, session=None):
+        all_running.wait()
+        return "https://github.com/gwennlbh/gh-api-playground/issues/1", 1
+
+    monkeypatch.setattr(Issue, "submit", submit)
+
+    # would time out on the barrier if issues were not submitted 3 at a time
+    assert (
+        len(list(submit_concurrently(parse("A\nB\nC"), {}, [], jobs=3, session=GITHUB)))
+        == 3
+    )
+
+
+def test_dependents_of_failed_issues_are_skipped(monkeypatch):
+    def submit(self, submitter_args, session=None):
+        if self.title == "Fails":
+            return None, None
+        return "https://github.com/gwennlbh/gh-api-playground/issues/1", 1
+
+    monkeypatch.setattr(Issue, "submit", submit)
+
+    submitted = list(
+        submit_concurrently(
+            parse("#.1 Fails\n^.1 Child\nOther"), {}, [], jobs=2, session=GITHUB
+        )
+    )
+
+    assert {issue.title: number for issue, _, number in submitted} == {
+        "Fails": None,
+        "Child": None,
+        "Other": 1,
+    }
+
+
+def test_already_resolved_references_are_not_waited_for(submitted_titles):
+    submitted = {
+        issue.title: issue
+        for issue, _, _ in submit_concurrently(
+            parse("^.1 Child\nBlocked >.1"), {1: 7}, [], jobs=2, session=GITHUB
+        )
+    }
+
+    assert sorted(submitted_titles) == ["Blocked", "Child"]
+    assert submitted["Child"].parent == ("direct", 7)
+    assert submitted["Blocked"].blocked_by == {("direct", 7)}
+
+
+def test_interrupting_still_hands_out_issues_being_submitted(monkeypatch):
+    started = threading.Barrier(2, timeout=5)
+
+    def submit(self, submitter_args, session=None):
+        if self.title == "Slow":
+            started.wait()
+            # still being submitted when the interrupt comes
+            time.sleep(0.3)
+            return "https://github.com/gwennlbh/gh-api-playground/issues/2", 2
+        started.wait()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(Issue, "submit", submit)
+
+    submitted = []
+    with pytest.raises(KeyboardInterrupt):
+        for issue, _, number in submit_concurrently(
+            parse("Interrupted\nSlow\nNever"), {}, [], jobs=2, session=GITHUB
+        ):
+            submitted.append((issue.title, number))
+
+    assert submitted == [("Slow", 2)]
+
+
+@pytest.mark.parametrize(
+    "lines, error",
+    [
+        ("^.3 Orphan", r"References are never defined: #\.3 \(used by 'Orphan'\)"),
+        ("#.1 One\n#.1 Two", r"Reference #\.1 is defined more than once"),
+        (
+            "#.1 One >.2\n#.2 Two >.1\nWaiting >.2\nFine",
+            r"cycle \(or on issues that do\): 'One', 'Two', 'Waiting'$",
+        ),
+    ],
+)
+def test_rejects_invalid_dependencies(submitted_titles, lines, error):
+    with pytest.raises(ValueError, match=error):
+        list(submit_concurrently(parse(lines), {}, [], jobs=2, session=GITHUB))
+
+    assert submitted_titles == []
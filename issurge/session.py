@@ -0,0 +1,121 @@
+import subprocess
+from typing import Literal, NamedTuple
+from urllib.parse import ParseResult, urlparse
+
+from issurge.gitlab import ProjectInfo
+
+type Forge = Literal["github", "gitlab"]
+
+FORGES: tuple[Forge, ...] = ("github", "gitlab")
+
+
+class Session(NamedTuple):
+    """
+    Where issues of a run get submitted to. Resolved once, then passed to every submission.
+    """
+
+    forge: Forge
+    host: str
+    # on GitLab, the full namespace, e.g. group/subgroup
+    owner: str
+    repo: str
+    # whether the repository comes from the origin remote of the current checkout.
+    # if not, gh and glab need to be told which repository to use
+    from_remote: bool = True
+
+    def __rich_repr__(self):
+        yield "forge", self.forge
+        yield "host", self.host
+        yield "owner", self.owner
+        yield "repo", self.repo
+        yield "from_remote", self.from_remote, True
+
+    @property
+    def slug(self) -> str:
+        """
+        [HOST/]OWNER/REPO, as understood by gh's -R and GH_REPO
+        """
+        if self.host == "github.com":
+            return f"{self.owner}/{self.repo}"
+        return f"{self.host}/{self.owner}/{self.repo}"
+
+    @property
+    def url(self) -> str:
+        return f"https://{self.host}/{self.owner}/{self.repo}"
+
+    @property
+    def gitlab_project(self) -> ProjectInfo:
+        return ProjectInfo(host=self.host, path=f"{self.owner}/{self.repo}")
+
+    @classmethod
+    def from_remote_url(
+        cls, remote_url: ParseResult, forge: Forge | None = None, from_remote=True
+    ) -> "Session":
+        path = remote_url.path.strip().strip("/").removesuffix(".git")
+        owner, _, repo = path.rpartition("/")
+        if not remote_url.hostname or not owner or not repo:
+            raise ValueError(
+                f"Could not determine the repository from URL {remote_url.geturl()!r}"
+            )
+        return cls(
+            forge=forge or forge_of(remote_url.hostname),
+            host=remote_url.hostname,
+            owner=owner,
+            repo=repo,
+            from_remote=from_remote,
+        )
+
+    @classmethod
+    def from_spec(cls, spec: str, forge: Forge | None = None) -> "Session":
+        """
+        Parses a [HOST/]OWNER/REPO repository, or the URL of one.
+        Without a host, the repository is on github.com, or on gitlab.com if forge is gitlab.
+        """
+        if "://" in spec or spec.startswith("git@"):
+            return cls.from_remote_url(
+                remote_url_from_origin(spec), forge, from_remote=False
+            )
+
+        host, _, path = spec.strip("/").partition("/")
+        # hosts have dots in them, GitHub users and GitLab groups can't
+        if "." not in host:
+            host, path = ("gitlab.com" if forge == "gitlab" else "github.com"), spec
+        return cls.from_remote_url(
+            urlparse(f"https://{host}/{path}"), forge, from_remote=False
+        )
+
+    @classmethod
+    def detect(cls, repo: str | None = None, forge: str | None = None) -> "Session":
+        """
+        Uses the given repository if any, otherwise the origin remote of the current checkout.
+        """
+        if forge and forge not in FORGES:
+            raise ValueError(
+                f"Unknown forge {forge!r}, expected one of {', '.join(FORGES)}"
+            )
+        if repo:
+            return cls.from_spec(repo, forge)
+        return cls.from_remote_url(origin_remote_url(), forge)
+
+
+def forge_of(host: str) -> Forge:
+    return "github" if host == "github.com" else "gitlab"
+
+
+def origin_remote_url() -> ParseResult:
+    try:
+        origin = subprocess.run(
+            ["git", "remote", "get-url", "origin"], capture_output=True, check=True
+        ).stdout.decode()
+        return remote_url_from_origin(origin)
+    except subprocess.CalledProcessError as e:
+        raise ValueError(
+            "Could not determine remote url, make sure that you are inside of a git repository that has a remote named 'origin', or pass --repo"
+        ) from e
+
+
+def remote_url_from_origin(origin: str) -> ParseResult:
+    # fake an HTTPs URL from a SSH one
+    if origin.startswith("git@"):
+        origin = origin.replace(":", "/").replace("git@", "https://")
+    return urlparse(origin.strip())
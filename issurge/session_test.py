@@ -0,0 +1,80 @@
+from unittest.mock import Mock
+from urllib.parse import urlparse
+
+import pytest
+
+import issurge.session
+from issurge.parser import Issue
+from issurge.session import Session
+
+
+@pytest.mark.parametrize(
+    "repo, forge, expected",
+    [
+        (
+            "gwennlbh/gh-api-playground",
+            None,
+            Session("github", "github.com", "gwennlbh", "gh-api-playground", False),
+        ),
+        (
+            "gwennlbh/gh-api-playground",
+            "gitlab",
+            Session("gitlab", "gitlab.com", "gwennlbh", "gh-api-playground", False),
+        ),
+        (
+            "git.inpt.fr/net7/sub/group/project",
+            None,
+            Session("gitlab", "git.inpt.fr", "net7/sub/group", "project", False),
+        ),
+        (
+            "github.example.com/gwennlbh/issurge",
+            "github",
+            Session("github", "github.example.com", "gwennlbh", "issurge", False),
+        ),
+        (
+            "git@gitlab.com:gwennlbh/gh-api-playground.git",
+            None,
+            Session("gitlab", "gitlab.com", "gwennlbh", "gh-api-playground", False),
+        ),
+    ],
+)
+def test_explicit_repository(monkeypatch, repo, forge, expected):
+    monkeypatch.setattr(issurge.session, "origin_remote_url", Mock())
+    assert Session.detect(repo, forge) == expected
+    issurge.session.origin_remote_url.assert_not_called()
+
+
+def test_detects_origin_remote(monkeypatch):
+    monkeypatch.setattr(
+        issurge.session,
+        "origin_remote_url",
+        Mock(return_value=urlparse("https://github.com/gwennlbh/gh-api-playground\n")),
+    )
+    assert Session.detect() == Session(
+        "github", "github.com", "gwennlbh", "gh-api-playground"
+    )
+
+
+@pytest.mark.parametrize(
+    "repo, forge, error",
+    [
+        ("gwennlbh", None, "Could not determine the repository"),
+        ("gwennlbh/issurge", "bitbucket", "Unknown forge 'bitbucket'"),
+    ],
+)
+def test_rejects_invalid_repositories(repo, forge, error):
+    with pytest.raises(ValueError, match=error):
+        Session.detect(repo, forge)
+
+
+def test_glab_is_told_the_repository_when_outside_of_a_checkout():
+    command = Issue(title="Hello")._gitlab_create_command(
+        [], Session.detect("git.inpt.fr/net7/website")
+    )
+    assert command[:5] == [
+        "glab",
+        "issue",
+        "new",
+        "-R",
+        "https://git.inpt.fr/net7/website",
+    ]
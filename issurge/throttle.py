@@ -0,0 +1,173 @@
+import re
+import threading
+import time
+from functools import cache
+from typing import Mapping
+
+# how many times a call that hit a rate limit is made before giving up on it
+MAX_ATTEMPTS = 5
+
+# seconds to wait after hitting a rate limit that doesn't say for how long, doubled on each attempt
+BACKOFF = 2.0
+MAX_BACKOFF = 60.0
+
+# once less than this fraction of the rate limit is left, requests are spread evenly until it resets
+LOW_REMAINING = 0.1
+
+# what gh and glab print when the API rejected them because of a rate limit
+RATE_LIMITED_OUTPUT = re.compile(
+    r"rate limit|too many requests|HTTP 429|abuse detection", re.IGNORECASE
+)
+
+
+def header(headers: Mapping[str, str], name: str) -> float | None:
+    """
+    Numeric value of an X-RateLimit-* (GitHub) or RateLimit-* (GitLab) header, headers having lowercase names
+    """
+    value = headers.get(f"x-{name}") or headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def rate_limited_response(status: int, headers: Mapping[str, str], body: str) -> bool:
+    if status == 429:
+        return True
+    return status == 403 and (
+        "retry-after" in headers
+        or header(headers, "ratelimit-remaining") == 0
+        or "rate limit" in body.lower()
+    )
+
+
+def rate_limited_output(stderr: bytes | str) -> bool:
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode(errors="replace")
+    return bool(RATE_LIMITED_OUTPUT.search(stderr))
+
+
+class Throttle:
+    """
+    Paces the calls made to the forge so that they stay within its rate limits.
+
+    Calls wait for a token from a bucket, refilled at the rate the rate limit headers leave room for,
+    and for a slot among the calls in flight. That number is unbounded until a call gets rate limited,
+    then halves on each rate limit and grows back by one every few successful calls (AIMD).
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        # how many calls may be in flight, None until a call got rate limited
+        self.concurrency: float | None = None
+        # tokens added to the bucket per second, None to not pace calls at all
+        self.rate: float | None = None
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        # no call starts before then, e.g. because of a Retry-After
+        self.paused_until = 0.0
+        self.rate_limited = 0
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self._tokens = min(
+                1.0, self._tokens + (now - self._refilled_at) * self.rate
+            )
+        self._refilled_at = now
+
+    def _wait(self, now: float) -> float | None:
+        """
+        How long to wait before a call can start, None to wait for a call in flight to end
+        """
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.concurrency is not None and self.in_flight >= int(self.concurrency):
+            return None
+        if self.rate is not None and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait(now)
+                if wait == 0:
+                    break
+                self._condition.wait(wait)
+            self.in_flight += 1
+            if self.rate is not None:
+                self._tokens -= 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def succeeded(self, headers: Mapping[str, str] = {}):
+        with self._condition:
+            # additive increase, as long as the limit is what holds calls back
+            if self.concurrency is not None and self.in_flight >= int(self.concurrency):
+                self.concurrency += 1 / self.concurrency
+            self._observe(headers)
+            self._condition.notify_all()
+
+    def limited(self, headers: Mapping[str, str] = {}, attempt: int = 1) -> float:
+        """
+        Records that a call in flight got rate limited. Returns how many seconds calls are paused for.
+        """
+        with self._condition:
+            now = time.monotonic()
+            self.rate_limited += 1
+            # multiplicative decrease, once for all the calls in flight that get rejected together
+            if now >= self.paused_until:
+                self.concurrency = max(
+                    1.0,
+                    (
+                        self.in_flight
+                        if self.concurrency is None
+                        else min(self.concurrency, self.in_flight)
+                    )
+                    / 2,
+                )
+
+            wait = header(headers, "retry-after")
+            if wait is None and header(headers, "ratelimit-remaining") == 0:
+                wait = self._until_reset(headers)
+            if wait is None:
+                wait = min(MAX_BACKOFF, BACKOFF * 2 ** (attempt - 1))
+
+            self.paused_until = max(self.paused_until, now + wait)
+            self._observe(headers)
+            self._condition.notify_all()
+            return wait
+
+    def _until_reset(self, headers: Mapping[str, str]) -> float | None:
+        reset = header(headers, "ratelimit-reset")
+        if reset is None:
+            return None
+        return max(0.0, reset - time.time())
+
+    def _observe(self, headers: Mapping[str, str]):
+        remaining = header(headers, "ratelimit-remaining")
+        limit = header(headers, "ratelimit-limit")
+        until_reset = self._until_reset(headers)
+        if remaining is None or until_reset is None:
+            return
+
+        if remaining == 0:
+            self.paused_until = max(self.paused_until, time.monotonic() + until_reset)
+        elif limit and remaining < limit * LOW_REMAINING:
+            self.rate = remaining / max(1.0, until_reset)
+        else:
+            self.rate = None
+
+
+@cache
+def shared() -> Throttle:
+    """
+    The throttle every gh, glab and HTTP call goes through
+    """
+    return Throttle()
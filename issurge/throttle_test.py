@@ -0,0 +1,155 @@
+import asyncio
+import subprocess
+import threading
+import time
+
+import pytest
+
+from issurge import github, throttle, utils
+from issurge.throttle import Throttle, rate_limited_output, rate_limited_response
+from issurge.transport import HTTPClient, call
+
+
+def test_recognizes_rate_limits():
+    assert rate_limited_response(429, {}, "")
+    assert rate_limited_response(403, {"retry-after": "3"}, "")
+    assert rate_limited_response(403, {"x-ratelimit-remaining": "0"}, "")
+    assert rate_limited_response(
+        403, {}, '{"message": "You have exceeded a secondary rate limit"}'
+    )
+    assert not rate_limited_response(403, {}, '{"message": "Must have admin rights"}')
+    assert rate_limited_output(b"API rate limit exceeded for user ID 1. (HTTP 403)")
+    assert not rate_limited_output(b"could not add label: 'bgu' not found")
+
+
+def test_paces_requests_when_few_are_left():
+    throttled = Throttle()
+    reset = str(int(time.time()) + 100)
+
+    throttled.succeeded({"x-ratelimit-limit": "5000", "x-ratelimit-remaining": "4000"})
+    assert throttled.rate is None
+
+    throttled.succeeded(
+        {
+            "x-ratelimit-limit": "5000",
+            "x-ratelimit-remaining": "200",
+            "x-ratelimit-reset": reset,
+        }
+    )
+    assert throttled.rate == pytest.approx(2, rel=0.05)
+
+    throttled.succeeded(
+        {"ratelimit-limit": "600", "ratelimit-remaining": "0", "ratelimit-reset": reset}
+    )
+    assert throttled.paused_until > time.monotonic() + 90
+
+
+def test_halves_concurrency_when_rate_limited_then_grows_it_back():
+    throttled = Throttle()
+    for _ in range(8):
+        throttled.acquire()
+
+    # every call in flight is rejected at once, that's one decrease
+    for _ in range(8):
+        assert throttled.limited({"retry-after": "0.1"}) == 0.1
+        throttled.release()
+    assert throttled.concurrency == 4
+
+    start = time.monotonic()
+    for _ in range(4):
+        throttled.acquire()
+    assert time.monotonic() - start >= 0.09
+
+    throttled.succeeded()
+    assert throttled.concurrency == 4.25
+
+
+def test_http_calls_are_retried_after_a_rate_limit(stub_api, monkeypatch):
+    replies = iter(
+        [
+            (429, {"message": "Too many requests"}),
+            (200, {"ok": True}),
+        ]
+    )
+    stub_api.routes[("GET", "/thing")] = lambda request: next(replies)
+    # without a Retry-After header, the throttle backs off on its own
+    monkeypatch.setattr(throttle, "BACKOFF", 0.01)
+
+    assert call(lambda: HTTPClient(stub_api.url), "GET", "/thing") == '{"ok": true}'
+    assert len(stub_api.requests) == 2
+    assert throttle.shared().rate_limited == 1
+
+
+def test_commands_are_retried_after_a_rate_limit(monkeypatch):
+    outcomes = iter(
+        [
+            subprocess.CalledProcessError(
+                1, ["gh"], stderr=b"HTTP 429: Too Many Requests"
+            ),
+            subprocess.CompletedProcess(["gh"], 0, stdout=b"done", stderr=b""),
+        ]
+    )
+
+    def fake_run(command, **_):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    monkeypatch.setattr(throttle, "BACKOFF", 0.01)
+
+    assert utils.run(["gh", "api", "/user"]) == "\ndone"
+    assert throttle.shared().rate_limited == 1
+
+
+def test_fetching_a_token_does_not_wait_on_the_first_call(stub_api, monkeypatch):
+    monkeypatch.setenv("ISSURGE_GITHUB_API_URL", stub_api.url)
+    monkeypatch.delenv("GH_TOKEN", raising=False)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.setattr(
+        subprocess,
+        "run",
+        lambda command, **_: subprocess.CompletedProcess(
+            command, 0, stdout=b"sekrit\n", stderr=b""
+        ),
+    )
+    github.client.cache_clear()
+    github.token.cache_clear()
+    stub_api.routes[("GET", "/user")] = (200, {"login": "gwennlbh"})
+    # after a rate limit, only one call at a time
+    throttle.shared().concurrency = 1
+
+    done = threading.Event()
+    result = []
+    threading.Thread(
+        target=lambda: (result.append(call(github.client, "GET", "/user")), done.set()),
+        daemon=True,
+    ).start()
+
+    try:
+        assert done.wait(5), "the call waited on the token it needed"
+        assert result == ['{"login": "gwennlbh"}']
+        assert stub_api.requests[0].headers["authorization"] == "Bearer sekrit"
+    finally:
+        github.client.cache_clear()
+        github.token.cache_clear()
+
+
+def test_cancelling_a_command_waiting_for_the_throttle_gives_its_slot_back():
+    throttled = throttle.shared()
+    throttled.concurrency = 1
+    throttled.acquire()
+
+    async def cancel_while_waiting():
+        waiting = asyncio.create_task(utils.run_async(["true"]))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        await asyncio.sleep(0.05)
+        # the slot the command was waiting for frees up after it got cancelled
+        throttled.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(cancel_while_waiting())
+    assert throttled.in_flight == 0
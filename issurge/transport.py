@@ -0,0 +1,224 @@
+import http.client
+import json
+import threading
+from itertools import count
+from queue import Empty, LifoQueue
+from typing import Any, Callable
+from urllib.parse import urlencode, urlsplit
+
+from rich import print
+
+from issurge import throttle
+from issurge.profiling import phase
+from issurge.utils import (
+    NEWLINE,
+    TAB,
+    HTTPMethod,
+    debugging,
+    dry_running,
+    retrying,
+)
+
+# Errors that mean the server closed a kept-alive connection while it was idle.
+# We get those on the first request made with a pooled connection that went stale.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class HTTPError(Exception):
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        status: int,
+        body: str,
+        headers: dict[str, str] | None = None,
+    ):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.body = body
+        # with lowercase names
+        self.headers = headers or {}
+        super().__init__(f"{method} {url} failed with status {status}: {body}")
+
+
+class Response:
+    def __init__(self, status: int, headers: dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def text(self) -> str:
+        return self.body.decode("utf-8")
+
+    def json(self) -> Any:
+        if not self.body.strip():
+            return None
+        return json.loads(self.body)
+
+
+class HTTPClient:
+    """
+    Minimal JSON-over-HTTP(S) client that keeps connections alive and reuses them
+    across requests (and across threads), so that a run only pays for the TLS handshake
+    once per pooled connection instead of once per API call.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str] | None = None,
+        pool_size: int = 8,
+        timeout: float = 30,
+    ):
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme for {base_url!r}")
+
+        self.scheme = url.scheme
+        self.host = url.hostname or ""
+        self.port = url.port
+        self.base_path = url.path.rstrip("/")
+        self.headers = {
+            "Accept": "application/json",
+            "User-Agent": "issurge",
+            **(headers or {}),
+        }
+        self.timeout = timeout
+        self._pool: LifoQueue[http.client.HTTPConnection] = LifoQueue(pool_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_opened += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._pool.get_nowait(), True
+        except Empty:
+            return self._new_connection(), False
+
+    def _release(self, connection: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(connection)
+        except Exception:
+            connection.close()
+
+    def url(self, route: str, query: dict[str, Any] | None = None) -> str:
+        path = route if route.startswith("/") else f"/{route}"
+        if query:
+            path += "?" + urlencode(query, doseq=True)
+        return self.base_path + path
+
+    def request(
+        self,
+        method: str,
+        route: str,
+        body: Any = None,
+        query: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        url = self.url(route, query)
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        all_headers = self.headers | (headers or {})
+        if payload is not None:
+            all_headers["Content-Type"] = "application/json"
+
+        connection, reused = self._acquire()
+        try:
+            try:
+                connection.request(method, url, body=payload, headers=all_headers)
+                raw = connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # The server dropped the idle connection, nothing was processed: retry on a fresh one
+                connection.close()
+                connection = self._new_connection()
+                connection.request(method, url, body=payload, headers=all_headers)
+                raw = connection.getresponse()
+
+            response = Response(
+                status=raw.status,
+                headers={k.lower(): v for k, v in raw.getheaders()},
+                body=raw.read(),
+            )
+        except Exception:
+            connection.close()
+            raise
+
+        if raw.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+
+        if response.status >= 400:
+            raise HTTPError(
+                method, url, response.status, response.text(), response.headers
+            )
+
+        return response
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                return
+
+
+def call(
+    get_client: Callable[[], HTTPClient],
+    method: HTTPMethod,
+    route: str,
+    bypass_dry_run=False,
+    body: dict[str, Any] | None = None,
+) -> str | None:
+    """
+    Returns the raw response body, or None if the call failed or was not made (dry-run).
+    Mirrors what utils.run does for commands.
+    """
+    if dry_running() or debugging():
+        print(
+            f"{'Would call' if dry_running() and not bypass_dry_run else 'Calling'} [white bold]{method} {route}[/]"
+        )
+    if dry_running() and not bypass_dry_run:
+        return None
+
+    # getting the client the first time may run gh or glab for a token, which goes through the throttle too:
+    # do it before taking a slot, not to wait on ourselves
+    client = get_client()
+    for attempt in count(1):
+        throttled = throttle.shared()
+        throttled.acquire()
+        try:
+            with phase(f"HTTP {method}"):
+                response = client.request(method, route, body=body or None)
+            throttled.succeeded(response.headers)
+            return response.text()
+        except HTTPError as e:
+            if attempt < throttle.MAX_ATTEMPTS and throttle.rate_limited_response(
+                e.status, e.headers, e.body
+            ):
+                retrying(f"{method} {route}", throttled.limited(e.headers, attempt))
+                continue
+            print(
+                f"Calling [white bold]{method} {route}[/] failed with status [white bold]{e.status}[/]:\n{NEWLINE.join(TAB + line for line in e.body.splitlines())}"
+            )
+            return None
+        except (OSError, http.client.HTTPException) as e:
+            # connection refused, timed out, reset, garbled response...: like a command that could not run
+            print(f"Calling [white bold]{method} {route}[/] failed: {e}")
+            return None
+        finally:
+            throttled.release()
@@ -0,0 +1,74 @@
+import pytest
+
+from issurge.transport import HTTPClient, HTTPError, call
+
+
+def test_sends_json_and_parses_json(stub_api):
+    stub_api.routes[("POST", "/api/things")] = lambda request: (
+        201,
+        {"received": request.body},
+    )
+    client = HTTPClient(f"{stub_api.url}/api", headers={"Authorization": "Bearer x"})
+
+    response = client.request(
+        "POST", "things", body={"title": "hello", "labels": ["a"]}
+    )
+
+    assert response.status == 201
+    assert response.json() == {"received": {"title": "hello", "labels": ["a"]}}
+    [request] = stub_api.requests
+    assert request.path == "/api/things"
+    assert request.headers["authorization"] == "Bearer x"
+    assert request.headers["content-type"] == "application/json"
+
+
+def test_reuses_connections(stub_api):
+    stub_api.routes[("GET", "/thing")] = (200, {"ok": True})
+    client = HTTPClient(stub_api.url)
+
+    for _ in range(10):
+        client.request("GET", "/thing")
+
+    assert client.connections_opened == 1
+    assert len({request.client_port for request in stub_api.requests}) == 1
+
+
+def test_reconnects_when_pooled_connection_went_stale(stub_api):
+    stub_api.routes[("GET", "/thing")] = (200, {"ok": True})
+    client = HTTPClient(stub_api.url)
+    stub_api.drop_connections = True
+    client.request("GET", "/thing")
+    stub_api.drop_connections = False
+
+    assert client.request("GET", "/thing").json() == {"ok": True}
+    assert client.connections_opened == 2
+
+
+def test_query_parameters(stub_api):
+    stub_api.routes[("GET", "/search")] = (200, [])
+    client = HTTPClient(stub_api.url)
+
+    client.request("GET", "/search", query={"state": "all", "labels": ["a", "b"]})
+
+    assert stub_api.requests[0].path == "/search?state=all&labels=a&labels=b"
+
+
+def test_raises_on_error_status(stub_api):
+    client = HTTPClient(stub_api.url)
+
+    with pytest.raises(HTTPError, match="GET /nope failed with status 404") as error:
+        client.request("GET", "/nope")
+
+    assert error.value.status == 404
+    # the connection is still usable after an error response
+    stub_api.routes[("GET", "/thing")] = (200, {"ok": True})
+    client.request("GET", "/thing")
+    assert client.connections_opened == 1
+
+
+def test_call_reports_connection_errors(stub_api, capsys):
+    url = stub_api.url
+    stub_api.close()
+
+    assert call(lambda: HTTPClient(url), "GET", "/thing") is None
+    assert "Calling GET /thing failed" in capsys.readouterr().out
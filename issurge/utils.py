@@ -1,11 +1,18 @@
 import io
+import json
 import os
+import signal
 import subprocess
-from typing import Any
+import threading
+from contextlib import contextmanager
+from itertools import count
+from typing import Any, Callable, Iterator, Literal
 
-import rich
 from rich import print
 
+from issurge import throttle
+from issurge.profiling import phase
+
 
 def debugging():
     return os.environ.get("ISSURGE_DEBUG")
@@ -15,29 +22,188 @@ def dry_running():
     return os.environ.get("ISSURGE_DRY_RUN")
 
 
+def using_http():
+    return os.environ.get("ISSURGE_HTTP")
+
+
+def quiet():
+    return os.environ.get("ISSURGE_QUIET")
+
+
+# verbosity levels: messages are printed when the verbosity is at least their level
+QUIET, NORMAL, DEBUG = 0, 1, 2
+
+
+def verbosity() -> int:
+    if debugging():
+        return DEBUG
+    if quiet():
+        return QUIET
+    return NORMAL
+
+
+def log(level: int, message: str | Callable[[], str], **kwargs):
+    """
+    Prints the message if the verbosity is high enough.
+    Pass a function returning the message to only build it when it gets printed.
+    """
+    if verbosity() >= level:
+        print(message() if callable(message) else message, **kwargs)
+
+
 def debug(*args, **kwargs):
     if os.environ.get("ISSURGE_DEBUG"):
         print(*args, **kwargs)
 
 
 def run(command, bypass_dry_run=False):
+    announce(command, bypass_dry_run)
+    if dry_running() and not bypass_dry_run:
+        return None
+
+    for attempt in count(1):
+        throttled = throttle.shared()
+        throttled.acquire()
+        try:
+            with phase(command_phase(command)):
+                out = subprocess.run(
+                    command, check=True, capture_output=True, process_group=0
+                )
+            throttled.succeeded()
+            return out.stderr.decode() + "\n" + out.stdout.decode()
+        except subprocess.CalledProcessError as e:
+            if attempt < throttle.MAX_ATTEMPTS and throttle.rate_limited_output(
+                e.stderr
+            ):
+                retrying(command_phase(command), throttled.limited(attempt=attempt))
+                continue
+            report_failure(e.cmd, e.returncode, e.stderr)
+            return None
+        finally:
+            throttled.release()
+
+
+async def run_async(command, bypass_dry_run=False):
+    """
+    Same as run, but does not block the event loop while the command runs
+    """
+    import asyncio
+
+    announce(command, bypass_dry_run)
+    if dry_running() and not bypass_dry_run:
+        return None
+
+    for attempt in count(1):
+        throttled = throttle.shared()
+        # waiting for the throttle blocks, keep it off the event loop
+        acquiring = asyncio.ensure_future(asyncio.to_thread(throttled.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # the thread can't be stopped, and takes a slot once it gets one: give that slot back
+            await acquiring
+            throttled.release()
+            raise
+        try:
+            with phase(command_phase(command)):
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    process_group=0,
+                )
+                stdout, stderr = await process.communicate()
+            if not process.returncode:
+                throttled.succeeded()
+                return stderr.decode() + "\n" + stdout.decode()
+            if attempt < throttle.MAX_ATTEMPTS and throttle.rate_limited_output(stderr):
+                retrying(command_phase(command), throttled.limited(attempt=attempt))
+                continue
+            report_failure(command, process.returncode, stderr)
+            return None
+        finally:
+            throttled.release()
+
+
+@contextmanager
+def deferring_interrupts() -> Iterator[threading.Event]:
+    """
+    Ctrl-C sets the yielded event instead of stopping what runs inside, e.g. an issue being created.
+    Pressing it a second time stops right away.
+    Commands run in their own process group, so that Ctrl-C in a terminal does not reach them either.
+    """
+    interrupted = threading.Event()
+    # signal handlers can only be changed from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        yield interrupted
+        return
+
+    def interrupt(*_):
+        if interrupted.is_set():
+            raise KeyboardInterrupt
+        interrupted.set()
+        print(
+            "[yellow]Interrupted[/yellow], finishing the issue being created. Press Ctrl-C again to stop right away"
+        )
+
+    previous = signal.signal(signal.SIGINT, interrupt)
+    try:
+        yield interrupted
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def command_phase(command: list[str]) -> str:
+    """
+    e.g. gh issue new, or gh api, without the arguments that change from one call to the next
+    """
+    return " ".join(command[:2] if command[1:2] == ["api"] else command[:3])
+
+
+def announce(command, bypass_dry_run: bool):
     if dry_running() or debugging():
         print(
             f"{'Would run' if dry_running() and not bypass_dry_run else 'Running'} [white bold]{subprocess.list2cmdline(command)}[/]"
         )
-    if not dry_running() or bypass_dry_run:
-        try:
-            out = subprocess.run(command, check=True, capture_output=True)
-            return out.stderr.decode() + "\n" + out.stdout.decode()
-        except subprocess.CalledProcessError as e:
-            print(
-                f"Calling [white bold]{e.cmd}[/] failed with code [white bold]{e.returncode}[/]:\n{NEWLINE.join(TAB + line for line in e.stderr.decode().splitlines())}"
-            )
+
+
+def retrying(what: str, seconds: float):
+    log(
+        NORMAL,
+        f"[yellow]Rate limited[/yellow] on [white bold]{what}[/], retrying in {seconds:.1f}s",
+    )
+
+
+def report_failure(command, returncode: int, stderr: bytes):
+    print(
+        f"Calling [white bold]{command}[/] failed with code [white bold]{returncode}[/]:\n{NEWLINE.join(TAB + line for line in stderr.decode().splitlines())}"
+    )
 
 
 TAB = "\t"
 NEWLINE = "\n"
 
+type HTTPMethod = Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+
+# number of items asked for in each request to paginated API routes, the most both forges allow
+PER_PAGE = 100
+
+
+def pages(what: str, fetch: Callable[[int], str | None]) -> Iterator[Any]:
+    """
+    Items of every page of a paginated list of what, fetch gets the page number, starting at 1.
+    Raises if a page could not be fetched: a partial list would look like things are missing.
+    """
+    for page in count(1):
+        response = fetch(page)
+        if response is None:
+            raise Exception(f"Could not list {what} (page {page}), see the error above")
+        items = json.loads(response or "[]")
+        yield from items
+        if len(items) < PER_PAGE:
+            return
+
 
 def lines_between(start, end, text):
     inside = False
@@ -51,6 +217,8 @@ def lines_between(start, end, text):
 
 
 def render_to_ansi(renderable: Any) -> str:
-    console = rich.console.Console(file=io.StringIO())
+    from rich.console import Console
+
+    console = Console(file=io.StringIO())
     console.print(renderable)
     return console.file.getvalue()  # pyright: ignore[reportAttributeAccessIssue]
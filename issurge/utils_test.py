@@ -4,7 +4,7 @@ from unittest.mock import Mock
 import pytest
 
 import issurge.utils
-from issurge.utils import debug, debugging, dry_running
+from issurge.utils import DEBUG, NORMAL, debug, debugging, dry_running, log
 
 
 def test_debugging_is_false_by_default():
@@ -34,3 +34,26 @@ def test_debug_only_prints_when_debugging_is_true():
     assert len(issurge.utils.print.mock_calls) == 1
     assert issurge.utils.print.mock_calls[0].args[0] == "debug"
     del os.environ["ISSURGE_DEBUG"]
+
+
+@pytest.mark.parametrize(
+    "env, shown",
+    [
+        ({}, [NORMAL]),
+        ({"ISSURGE_DEBUG": "1"}, [NORMAL, DEBUG]),
+        ({"ISSURGE_QUIET": "1"}, []),
+    ],
+)
+def test_log_builds_messages_only_when_shown(monkeypatch, env, shown):
+    monkeypatch.setattr(issurge.utils, "print", Mock())
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    built = []
+    for level in (NORMAL, DEBUG):
+        log(level, lambda: built.append(level) or f"level {level}")
+
+    assert built == shown
+    assert [c.args[0] for c in issurge.utils.print.mock_calls] == [
+        f"level {level}" for level in shown
+    ]